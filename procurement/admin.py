@@ -2,10 +2,12 @@ from django.contrib import admin, messages
 from django.core.mail import send_mail
 from django.urls import path
 from django.shortcuts import render, redirect
+from django.utils import timezone
 import yaml
 from django.conf import settings
 import os
-from .models import User, Contact, Shop, Category, Product, Basket, Order
+from .cache import bump_catalog_version
+from .models import User, Contact, Shop, Category, Product, Basket, Reservation, Order, OrderItem, ImportJob
 from .utils import import_products_from_yaml
 
 
@@ -38,15 +40,24 @@ def reset_user_password(modeladmin, request, queryset):
             messages.error(request, f"Failed to send password reset email to {user.email}: {str(e)}")
 
 
+def set_shops_state(queryset, state):
+    # Resolve the ids first: the changelist queryset may filter on state,
+    # and would match nothing once the shops are updated
+    ids = list(queryset.values_list('pk', flat=True))
+    Shop.objects.filter(pk__in=ids).update(state=state, updated_at=timezone.now())
+    Product.objects.filter(shop_id__in=ids).update(shop_active=state)
+    bump_catalog_version('shops')
+
+
 @admin.action(description="Activate selected shops")
 def activate_shops(modeladmin, request, queryset):
-    queryset.update(state=True)
+    set_shops_state(queryset, True)
     messages.success(request, "Selected shops have been activated.")
 
 
 @admin.action(description="Deactivate selected shops")
 def deactivate_shops(modeladmin, request, queryset):
-    queryset.update(state=False)
+    set_shops_state(queryset, False)
     messages.success(request, "Selected shops have been deactivated.")
 
 
@@ -91,8 +102,9 @@ class ContactAdmin(admin.ModelAdmin):
 
 
 class ShopAdmin(admin.ModelAdmin):
-    list_display = ['name', 'state']
+    list_display = ['name', 'owner', 'state']
     list_filter = ['state']
+    raw_id_fields = ['owner']
     actions = [activate_shops, deactivate_shops, upload_price_list]
 
     def get_urls(self):
@@ -135,7 +147,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'shop', 'price', 'quantity']
+    list_display = ['name', 'category', 'shop', 'price', 'quantity', 'reserved']
     list_filter = ['category', 'shop']
     search_fields = ['name']
 
@@ -145,12 +157,30 @@ class BasketAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'product__name']
 
 
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ['product', 'shop']
+
+
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'status', 'created_at']
+    list_display = ['id', 'user', 'status', 'item_count', 'total_sum', 'created_at']
     list_filter = ['status']
+    inlines = [OrderItemInline]
     actions = [mark_orders_as_delivered]
 
 
+class ReservationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'product', 'quantity', 'expires_at']
+    raw_id_fields = ['user', 'product']
+
+
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'shop', 'status', 'processed_rows', 'rows_per_second', 'created_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
 # Register all models
 admin.site.register(User, UserAdmin)
 admin.site.register(Contact, ContactAdmin)
@@ -158,4 +188,6 @@ admin.site.register(Shop, ShopAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Product, ProductAdmin)
 admin.site.register(Basket, BasketAdmin)
+admin.site.register(Reservation, ReservationAdmin)
 admin.site.register(Order, OrderAdmin)
+admin.site.register(ImportJob, ImportJobAdmin)
@@ -12,3 +12,11 @@ class ProcurementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'procurement'
 
+    def ready(self) -> None:
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import metrics, signals
+
+        post_migrate.connect(signals.create_search_index, sender=self)
+        connection_created.connect(metrics.instrument_connection)
@@ -0,0 +1,141 @@
+"""
+Native async variants of the catalog list and basket views.
+
+Served when settings.ASYNC_VIEWS is on and the project runs under ASGI:
+authentication, cache lookups and the read queries are awaited on the
+event loop instead of holding a worker thread per request. Writes and the
+code paths without an async ORM counterpart run through sync_to_async.
+"""
+from inspect import isawaitable
+from typing import Any, Tuple
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseBase
+from rest_framework import exceptions
+from rest_framework.response import Response
+
+from .cache import acatalog_versions
+from .conditional import conditional_get
+from .models import Basket
+from .serializers import BasketSerializer
+from .views import (
+    BASKET_AVAILABLE, BASKET_RELATIONS, BASKET_STATE, BasketView, CategoryListView, ProductListView, ShopListView,
+    _expanded_relations, basket_scopes, basket_validators,
+)
+
+
+class AsyncViewMixin:
+    """
+    APIView dispatch awaiting authentication and coroutine handlers.
+
+    Mirrors APIView.dispatch; authenticators with an ``aauthenticate``
+    coroutine are awaited, others run in a worker thread. Views that need
+    I/O before the handler provide an ``ainitial`` coroutine, which then
+    replaces initial().
+    """
+    async def dispatch(self, request: Any, *args, **kwargs) -> HttpResponseBase:
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.aperform_authentication(request)
+            if hasattr(self, 'ainitial'):
+                await self.ainitial(request, *args, **kwargs)
+            else:
+                self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aperform_authentication(self, request: Any) -> None:
+        """
+        Async version of Request._authenticate, run before initial().
+        """
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+
+class AsyncCatalogListMixin(AsyncViewMixin):
+    """
+    Async get() for the cached catalog list views.
+    """
+    @conditional_get
+    async def get(self, request: Any, *args, **kwargs) -> Response:
+        return await self.alist(request, *args, **kwargs)
+
+
+class AsyncShopListView(AsyncCatalogListMixin, ShopListView):
+    """
+    Async ShopListView.
+    """
+
+
+class AsyncCategoryListView(AsyncCatalogListMixin, CategoryListView):
+    """
+    Async CategoryListView.
+    """
+
+
+class AsyncProductListView(AsyncCatalogListMixin, ProductListView):
+    """
+    Async ProductListView.
+    """
+
+
+class AsyncBasketView(AsyncViewMixin, BasketView):
+    """
+    BasketView with an async read path; changes to the basket run the sync
+    handlers in a worker thread.
+    """
+    async def aget_validators(self, request: Any) -> Tuple[str, int]:
+        state = await Basket.objects.filter(user=request.user).aaggregate(**BASKET_STATE)
+        return basket_validators(request, state, await acatalog_versions(basket_scopes(request.user)))
+
+    @conditional_get
+    async def get(self, request: Any) -> Response:
+        basket = (
+            Basket.objects.filter(user=request.user)
+            .select_related(*_expanded_relations(request, BASKET_RELATIONS))
+            .annotate(available=BASKET_AVAILABLE)
+            .order_by('id')
+        )
+        serializer = BasketSerializer([item async for item in basket], many=True, context={'request': request})
+        return Response(serializer.data)
+
+    async def post(self, request: Any) -> Response:
+        return await sync_to_async(super().post)(request)
+
+    async def put(self, request: Any) -> Response:
+        return await sync_to_async(super().put)(request)
+
+    async def delete(self, request: Any) -> Response:
+        return await sync_to_async(super().delete)(request)
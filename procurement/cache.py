@@ -0,0 +1,147 @@
+import hashlib
+import time
+from typing import Any, Iterable, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+CATALOG_SCOPES = ('shops', 'categories', 'products')
+VERSION_KEY = 'catalog:version:{}'
+# Scope of reserved stock (Product.available), advanced lazily, see catalog_versions
+STOCK_SCOPE = 'stock'
+STOCK_PENDING_KEY = 'catalog:stock:pending'
+
+
+def basket_scope(user_id: int) -> str:
+    """
+    Scope versioning the basket of one user; bumped whenever it changes.
+    """
+    return f'basket:{user_id}'
+
+
+def catalog_versions(scopes: Iterable[str]) -> dict:
+    """
+    Return the current version of each catalog scope.
+
+    Versions are nanosecond timestamps of the last change; a scope that has
+    never been bumped (or was evicted) starts a new version. The stock scope
+    moves on here, at most every CATALOG_STOCK_TIMEOUT seconds, when
+    mark_stock_changed recorded a change since its current version.
+    """
+    keys = {scope: VERSION_KEY.format(scope) for scope in scopes}
+    versions = cache.get_many([*keys.values(), STOCK_PENDING_KEY])
+    result = {}
+    for scope, key in keys.items():
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+        result[scope] = versions[key]
+    if _stock_due(result, versions):
+        cache.delete(STOCK_PENDING_KEY)
+        result[STOCK_SCOPE] = time.time_ns()
+        cache.set(keys[STOCK_SCOPE], result[STOCK_SCOPE], None)
+    return result
+
+
+async def acatalog_versions(scopes: Iterable[str]) -> dict:
+    """
+    Async version of catalog_versions.
+    """
+    keys = {scope: VERSION_KEY.format(scope) for scope in scopes}
+    versions = await cache.aget_many([*keys.values(), STOCK_PENDING_KEY])
+    result = {}
+    for scope, key in keys.items():
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), None)
+            versions[key] = await cache.aget(key)
+        result[scope] = versions[key]
+    if _stock_due(result, versions):
+        await cache.adelete(STOCK_PENDING_KEY)
+        result[STOCK_SCOPE] = time.time_ns()
+        await cache.aset(keys[STOCK_SCOPE], result[STOCK_SCOPE], None)
+    return result
+
+
+def _stock_due(result: dict, cached: dict) -> bool:
+    return (
+        STOCK_SCOPE in result and STOCK_PENDING_KEY in cached
+        and time.time_ns() - result[STOCK_SCOPE] >= settings.CATALOG_STOCK_TIMEOUT * 10 ** 9
+    )
+
+
+def bump_catalog_version(*scopes: str) -> None:
+    """
+    Invalidate cached catalog responses of the given scopes once the current
+    transaction commits.
+    """
+    def bump() -> None:
+        cache.set_many({VERSION_KEY.format(scope): time.time_ns() for scope in scopes}, None)
+
+    transaction.on_commit(bump)
+
+
+def mark_stock_changed() -> None:
+    """
+    Record a change of reserved stock once the current transaction commits.
+
+    Holds change with every basket update, so instead of invalidating the
+    product lists each time, the stock scope they depend on is advanced by
+    the next reader once CATALOG_STOCK_TIMEOUT seconds have passed.
+    """
+    transaction.on_commit(lambda: cache.set(STOCK_PENDING_KEY, True, None))
+
+
+def catalog_signature(request: Any, versions: dict) -> str:
+    """
+    Digest of the endpoint, its query parameters and the scope versions.
+    """
+    signature = "|".join([
+        request.get_host(),
+        request.path,
+        "&".join(f"{key}={value}" for key, value in sorted(request.query_params.lists())),
+        *(f"{scope}:{version}" for scope, version in sorted(versions.items())),
+    ])
+    return hashlib.md5(signature.encode('utf-8')).hexdigest()
+
+
+class CachedListMixin:
+    """
+    Read-through cache for list views of the catalog.
+
+    Responses are keyed by endpoint, query parameters and the versions of
+    ``cache_scopes``, so bumping a scope invalidates every dependent page.
+    The same digest doubles as the ETag for conditional requests and the
+    newest scope version as Last-Modified. Async views use the ``a``-prefixed
+    counterparts.
+    """
+    cache_scopes: tuple = ()
+
+    def get_validators(self, request: Any) -> Tuple[str, int]:
+        versions = catalog_versions(self.cache_scopes)
+        return catalog_signature(request, versions), max(versions.values()) // 10 ** 9
+
+    def list(self, request: Any, *args, **kwargs) -> Response:
+        key = 'catalog:response:' + catalog_signature(request, catalog_versions(self.cache_scopes))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    async def aget_validators(self, request: Any) -> Tuple[str, int]:
+        versions = await acatalog_versions(self.cache_scopes)
+        return catalog_signature(request, versions), max(versions.values()) // 10 ** 9
+
+    async def alist(self, request: Any, *args, **kwargs) -> Response:
+        key = 'catalog:response:' + catalog_signature(request, await acatalog_versions(self.cache_scopes))
+        data = await cache.aget(key)
+        if data is not None:
+            return Response(data)
+        response = await super().alist(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,87 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import basket_scope, bump_catalog_version
+from .importers import forget_feed_hashes
+from .models import Basket, Contact, Order, OrderItem, Product, Reservation, User
+from .reservations import by_key, delete_released, lock_products
+
+
+class OutOfStockError(Exception):
+    """
+    Raised inside the checkout transaction when a product lacks stock.
+    """
+
+
+def place_order(user: User, contact: Contact) -> Order:
+    """
+    Turn the user's basket into an order in a single transaction.
+
+    Stock for all products is decremented by one conditional UPDATE that
+    also consumes the user's own holds, so it only competes for stock that
+    is not reserved by other baskets and concurrent checkouts can never
+    oversell; products that were deactivated or whose shop closed are not
+    updated either, so they reject the order. Where the database supports it, rows are first locked with
+    SELECT ... FOR UPDATE in primary-key order to avoid deadlocks.
+    Order lines snapshot the current prices and are written in one batch.
+    """
+    items = list(Basket.objects.filter(user=user).values_list('id', 'product_id', 'quantity'))
+    if not items:
+        raise serializers.ValidationError({"error": "Basket is empty, cannot create an order."})
+
+    wanted = defaultdict(int)
+    for _, product_id, quantity in items:
+        wanted[product_id] += quantity
+    product_ids = sorted(wanted)
+    amount = by_key('id', wanted)
+    held = Coalesce(
+        Subquery(Reservation.objects.filter(user=user, product=OuterRef('pk')).values('quantity')[:1]), Value(0),
+        output_field=IntegerField(),
+    )
+
+    try:
+        with transaction.atomic():
+            lock_products(product_ids)
+            updated = Product.objects.filter(
+                id__in=product_ids, is_active=True, shop_active=True, quantity__gte=F('reserved') - held + amount
+            ).update(quantity=F('quantity') - amount, reserved=F('reserved') - held, updated_at=timezone.now())
+            if updated != len(product_ids):
+                raise OutOfStockError
+            delete_released(Reservation.objects.filter(user=user, product_id__in=product_ids))
+
+            lines = [
+                OrderItem(product_id=product_id, shop_id=shop_id, quantity=wanted[product_id], price=price)
+                for product_id, shop_id, price in Product.objects.filter(id__in=product_ids).order_by('id')
+                .values_list('id', 'shop_id', 'price')
+            ]
+            order = Order.objects.create(
+                user=user,
+                contact=contact,
+                total_sum=sum(line.price * line.quantity for line in lines),
+                item_count=sum(line.quantity for line in lines),
+            )
+            for line in lines:
+                line.order = order
+                line.created_at = order.created_at
+            OrderItem.objects.bulk_create(lines)
+            forget_feed_hashes({line.shop_id for line in lines})
+            Basket.objects.filter(id__in=[item_id for item_id, _, _ in items]).delete()
+            bump_catalog_version('products', basket_scope(user.id))
+    except OutOfStockError:
+        products = {product.id: product for product in Product.objects.filter(id__in=product_ids).annotate(
+            held=held
+        )}
+        for product_id in product_ids:
+            product = products.get(product_id)
+            if product is None or not (product.is_active and product.shop_active):
+                raise serializers.ValidationError({"error": f"Product {product_id} is no longer available."})
+            if product.available + product.held < wanted[product_id]:
+                raise serializers.ValidationError({"error": f"Not enough stock for product {product.name}."})
+        raise serializers.ValidationError({"error": "Stock changed during checkout, please try again."})
+
+    return order
@@ -0,0 +1,69 @@
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Any, Callable, Optional, Tuple
+
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def _validate(request: Any, etag: Optional[str], last_modified: Optional[int]) -> Tuple[Optional[str], Any]:
+    if etag is not None:
+        etag = quote_etag(etag)
+    return etag, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def _set_validators(view: Any, response: HttpResponseBase, etag: Optional[str],
+                    last_modified: Optional[int]) -> HttpResponseBase:
+    if etag is not None:
+        response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    vary_headers = getattr(view, 'vary_headers', ())
+    if vary_headers:
+        patch_vary_headers(response, vary_headers)
+    return response
+
+
+def conditional_get(method: Callable) -> Callable:
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before a view's get() runs.
+
+    The view provides ``get_validators(request)`` returning an ETag and a
+    Last-Modified Unix timestamp computed without serializing anything, and
+    may list request headers the representation depends on in ``vary_headers``.
+    Coroutine handlers await ``aget_validators(request)`` instead.
+    """
+    if iscoroutinefunction(method):
+        @wraps(method)
+        async def async_wrapper(self, request: Any, *args, **kwargs) -> HttpResponseBase:
+            etag, last_modified = await self.aget_validators(request)
+            etag, response = _validate(request, etag, last_modified)
+            if response is None:
+                response = await method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return _set_validators(self, response, etag, last_modified)
+
+        return async_wrapper
+
+    @wraps(method)
+    def wrapper(self, request: Any, *args, **kwargs) -> HttpResponseBase:
+        etag, last_modified = self.get_validators(request)
+        etag, response = _validate(request, etag, last_modified)
+        if response is None:
+            response = method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return _set_validators(self, response, etag, last_modified)
+
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """
+    Apply conditional_get to the get() handler of a generic view.
+    """
+    @conditional_get
+    def get(self, request: Any, *args, **kwargs) -> HttpResponseBase:
+        return super().get(request, *args, **kwargs)
@@ -0,0 +1,63 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Optional
+
+from django.db.models import Count, Q
+from django.db.models.query import QuerySet
+
+from .models import ProductParameter
+
+PRICE_BUCKETS = [0, 100, 500, 1000, 5000, 10000, 50000]
+PARAMETER_KEYS = 10
+PARAMETER_VALUES = 20
+
+
+def _bucket(index: int) -> tuple:
+    low = PRICE_BUCKETS[index]
+    high: Optional[int] = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+    return low, high
+
+
+def facet_counts(queryset: QuerySet) -> dict:
+    """
+    Count the products of `queryset` per category, shop, price bucket and
+    common parameter value, with one grouped query per facet.
+    """
+    products = queryset.order_by()
+
+    categories = products.values('category_id', 'category__name').annotate(count=Count('id')).order_by(
+        '-count', 'category_id'
+    )
+    shops = products.values('shop_id', 'shop__name').annotate(count=Count('id')).order_by('-count', 'shop_id')
+
+    buckets = {}
+    for index in range(len(PRICE_BUCKETS)):
+        low, high = _bucket(index)
+        condition = Q(price__gte=Decimal(low)) if high is None else Q(price__gte=Decimal(low), price__lt=Decimal(high))
+        buckets[f'price_{index}'] = Count('id', filter=condition)
+    prices = products.aggregate(total=Count('id'), **buckets)
+
+    pairs = (
+        ProductParameter.objects.filter(product_id__in=products.values('id'))
+        .values('key', 'value')
+        .annotate(count=Count('product_id', distinct=True))
+        .order_by('-count', 'key', 'value')[:PARAMETER_KEYS * PARAMETER_VALUES]
+    )
+    parameters = defaultdict(list)
+    for pair in pairs:
+        if len(parameters[pair['key']]) < PARAMETER_VALUES:
+            parameters[pair['key']].append({"value": pair['value'], "count": pair['count']})
+    common = sorted(parameters.items(), key=lambda item: -sum(value['count'] for value in item[1]))
+
+    return {
+        "count": prices['total'],
+        "categories": [
+            {"id": row['category_id'], "name": row['category__name'], "count": row['count']} for row in categories
+        ],
+        "shops": [{"id": row['shop_id'], "name": row['shop__name'], "count": row['count']} for row in shops],
+        "price": [
+            {"min": _bucket(index)[0], "max": _bucket(index)[1], "count": prices[f'price_{index}']}
+            for index in range(len(PRICE_BUCKETS)) if prices[f'price_{index}']
+        ],
+        "parameters": [{"key": key, "values": values} for key, values in common[:PARAMETER_KEYS]],
+    }
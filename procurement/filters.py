@@ -0,0 +1,149 @@
+import math
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from django.db.models import F
+from django.db.models.query import QuerySet
+from rest_framework.exceptions import ValidationError
+
+from .models import LISTED, Product, ProductParameter
+
+MAX_VALUE_LENGTH = 255
+SORT_FIELDS = {
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+}
+
+
+def parameter_value(value: Any) -> Tuple[str, Optional[float]]:
+    """
+    Normalize a parameter value to its text form and, if numeric, its number.
+    """
+    if isinstance(value, bool):
+        return ('true' if value else 'false'), None
+    if isinstance(value, (int, float)):
+        number = float(value)
+        if not math.isfinite(number):
+            return str(value), None
+        return (str(int(number)) if number.is_integer() else str(number)), number
+    text = str(value).strip()
+    try:
+        number = float(text.replace(',', '.'))
+    except ValueError:
+        return text[:MAX_VALUE_LENGTH], None
+    return text[:MAX_VALUE_LENGTH], number if math.isfinite(number) else None
+
+
+def iter_parameters(product: Product) -> Iterator[ProductParameter]:
+    """
+    Flatten product.parameters into side-table rows, one per list element.
+    """
+    for key, value in (product.parameters or {}).items():
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if item is None or isinstance(item, (dict, list)):
+                continue
+            text, number = parameter_value(item)
+            yield ProductParameter(product_id=product.id, key=str(key)[:MAX_VALUE_LENGTH], value=text,
+                                   numeric_value=number)
+
+
+def sync_parameters(products: Iterable[Product], batch_size: int = 1000) -> None:
+    """
+    Replace the ProductParameter rows of the given products.
+    """
+    products = list(products)
+    if not products:
+        return
+    ProductParameter.objects.filter(product_id__in=[product.id for product in products]).delete()
+    ProductParameter.objects.bulk_create(
+        [row for product in products for row in iter_parameters(product)], batch_size=batch_size
+    )
+
+
+def catalog_products() -> QuerySet:
+    """
+    Products visible in the catalog: active, from an active shop.
+    """
+    return Product.objects.filter(LISTED)
+
+
+def _split(raw: str, name: str) -> Tuple[str, str]:
+    key, separator, value = raw.partition(':')
+    if not separator or not key or not value:
+        raise ValidationError({"error": f"Invalid {name} '{raw}', expected key:value."})
+    return key, value
+
+
+def _number(raw: str, name: str) -> float:
+    try:
+        return float(raw)
+    except ValueError:
+        raise ValidationError({"error": f"Invalid {name} value '{raw}', expected a number."})
+
+
+def _price(raw: str, name: str) -> Decimal:
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise ValidationError({"error": f"Invalid {name} '{raw}', expected a number."})
+    if not value.is_finite():
+        raise ValidationError({"error": f"Invalid {name} '{raw}', expected a number."})
+    return value
+
+
+def filter_products(queryset: QuerySet, params: Any) -> QuerySet:
+    """
+    Apply the catalog filters shared by the product list, search and facets.
+
+    `shop_id` and `category_id` match exactly, `min_price` / `max_price`
+    bound the price and `in_stock=true` keeps products with unreserved stock.
+    `param=key:value` matches a parameter value and `param_min=key:n` /
+    `param_max=key:n` bound numeric parameters. Parameter filters run as
+    subqueries on the ProductParameter indexes; filters on different keys
+    are combined with AND.
+    """
+    shop_id = params.get('shop_id')
+    category_id = params.get('category_id')
+    if shop_id:
+        queryset = queryset.filter(shop_id=shop_id)
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    if params.get('min_price'):
+        queryset = queryset.filter(price__gte=_price(params['min_price'], 'min_price'))
+    if params.get('max_price'):
+        queryset = queryset.filter(price__lte=_price(params['max_price'], 'max_price'))
+    if str(params.get('in_stock', '')).lower() in ('1', 'true', 'yes', 'on'):
+        queryset = queryset.filter(quantity__gt=F('reserved'))
+
+    for raw in params.getlist('param'):
+        key, value = _split(raw, 'param')
+        queryset = queryset.filter(
+            id__in=ProductParameter.objects.filter(key=key, value=value).values('product_id')
+        )
+
+    ranges: Dict[str, dict] = {}
+    for name, lookup in (('param_min', 'numeric_value__gte'), ('param_max', 'numeric_value__lte')):
+        for raw in params.getlist(name):
+            key, value = _split(raw, name)
+            ranges.setdefault(key, {})[lookup] = _number(value, name)
+    for key, bounds in ranges.items():
+        queryset = queryset.filter(
+            id__in=ProductParameter.objects.filter(key=key, **bounds).values('product_id')
+        )
+    return queryset
+
+
+def sort_products(queryset: QuerySet, params: Any) -> QuerySet:
+    """
+    Order by `ordering` (price, -price, name, -name); the id tie-breaker
+    keeps keyset pages stable.
+    """
+    ordering = params.get('ordering')
+    if not ordering:
+        return queryset
+    if ordering not in SORT_FIELDS:
+        raise ValidationError({"error": f"Invalid ordering '{ordering}', use one of: {', '.join(SORT_FIELDS)}."})
+    return queryset.order_by(*SORT_FIELDS[ordering])
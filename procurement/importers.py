@@ -0,0 +1,387 @@
+import hashlib
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import CATALOG_SCOPES, bump_catalog_version
+from .filters import sync_parameters
+from .models import Shop, Category, Product, User
+from .search import index_categories, index_products
+
+BATCH_SIZE = 1000
+
+PRODUCT_FIELDS = [
+    'category', 'shop', 'model', 'name', 'price', 'price_rrc', 'quantity', 'parameters',
+    'is_active', 'shop_active', 'updated_at',
+]
+REQUIRED_PRODUCT_KEYS = ['name', 'price', 'price_rrc', 'quantity']
+# Columns a price list sets, in the order they are fingerprinted
+HASHED_FIELDS = ['category_id', 'shop_id', 'model', 'name', 'price', 'price_rrc', 'quantity', 'parameters']
+
+
+class PriceListError(Exception):
+    """
+    Raised when a price list cannot be imported.
+    """
+    status_code = 400
+
+
+class CategoryNotFoundError(PriceListError):
+    """
+    Raised when a product references an unknown category.
+    """
+    status_code = 404
+
+
+class ShopOwnershipError(PriceListError):
+    """
+    Raised when a price list targets a shop the partner does not own.
+    """
+    status_code = 403
+
+
+class ImportStats:
+    """
+    Counters collected while importing a price list.
+    """
+    def __init__(self) -> None:
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deactivated = 0
+        self.skipped = False
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def processed(self) -> int:
+        return self.inserted + self.updated + self.unchanged
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return round(self.processed / elapsed, 1) if elapsed > 0 else 0.0
+
+    def finish(self) -> 'ImportStats':
+        self.finished_at = time.perf_counter()
+        return self
+
+    def as_dict(self) -> dict:
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'deactivated': self.deactivated,
+            'skipped': self.skipped,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': self.rows_per_second,
+        }
+
+
+def _to_decimal(value: Any, field: str, product_id: Any) -> Decimal:
+    try:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise PriceListError(f"Invalid {field} '{value}' for product {product_id}.")
+
+
+def _to_int(value: Any, field: str, product_id: Any) -> int:
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise PriceListError(f"Invalid {field} '{value}' for product {product_id}.")
+    if number < 0:
+        raise PriceListError(f"Negative {field} '{value}' for product {product_id}.")
+    return number
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Return the SHA-256 of a price-list file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feed_key(feed_hash: str, deactivate_missing: bool) -> str:
+    """
+    Value stored in Shop.price_list_hash for a feed imported with the given options.
+    """
+    return hashlib.sha256(f"{feed_hash}:{int(deactivate_missing)}".encode('utf-8')).hexdigest()
+
+
+def forget_feed_hashes(shop_ids: Iterable[int]) -> None:
+    """
+    Make the next import of these shops' feeds run even if the file is
+    unchanged, after their products were changed outside an import.
+    """
+    Shop.objects.filter(pk__in=shop_ids).exclude(price_list_hash='').update(price_list_hash='')
+
+
+def fingerprint(values: Iterable) -> str:
+    """
+    Hash of imported column values, in HASHED_FIELDS order.
+    """
+    payload = [str(value) if isinstance(value, Decimal) else value for value in values]
+    return hashlib.sha1(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def product_hash(product: Product) -> str:
+    """
+    Fingerprint of the imported fields of a product.
+    """
+    return fingerprint(getattr(product, field) for field in HASHED_FIELDS)
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class PriceListImporter:
+    """
+    Bulk import engine shared by the partner, supplier and admin price-list uploads.
+
+    Existing rows are loaded once per batch and diffed in memory by content hash,
+    so only new or changed products are written, with one statement per batch.
+    When ``feed_hash`` and ``deactivate_missing`` match the last import of the
+    shop the feed is skipped entirely; the stored hash is cleared whenever the
+    shop's products change otherwise (see forget_feed_hashes).
+    ``deactivate_missing`` hides products that are no longer listed.
+    An ``owner`` may only import into shops assigned to them; shops the feed
+    names that do not exist yet are created for the owner.
+    """
+    def __init__(self, shop: Optional[Shop] = None, batch_size: int = BATCH_SIZE,
+                 update_category_names: bool = True, create_missing_categories: bool = False,
+                 progress: Optional[Callable[[ImportStats], None]] = None,
+                 feed_hash: Optional[str] = None, deactivate_missing: bool = False,
+                 owner: Optional[User] = None) -> None:
+        self.shop = shop
+        self.owner = owner
+        self.batch_size = batch_size
+        self.update_category_names = update_category_names
+        self.create_missing_categories = create_missing_categories
+        self.progress = progress
+        self.feed_hash = feed_hash
+        self.deactivate_missing = deactivate_missing
+        self.seen_ids: set = set()
+        self.stats = ImportStats()
+        self.category_names: dict = {}
+        self.known_categories: set = set()
+
+    def run(self, shop_name: Optional[str] = None, categories: Iterable[dict] = (),
+            goods: Iterable[dict] = ()) -> ImportStats:
+        """
+        Import a whole price list inside a single transaction.
+        """
+        entries = chain(
+            [('shop', shop_name)] if shop_name else [],
+            (('category', row) for row in categories),
+            (('good', row) for row in goods),
+        )
+        return self.run_stream(entries)
+
+    def run_stream(self, entries: Iterable[Tuple[str, Any]]) -> ImportStats:
+        """
+        Import ('shop' | 'category' | 'good', value) entries, e.g. from
+        procurement.parsers.iter_price_list, writing them in bounded batches.
+        """
+        categories: list = []
+        goods: list = []
+        with transaction.atomic():
+            if self.shop is not None:
+                self._check_owner(self.shop)
+            if self._feed_unchanged():
+                return self.stats.finish()
+            for kind, value in entries:
+                if kind == 'shop':
+                    if self.shop is None and value:
+                        self.sync_shop(value)
+                        if self._feed_unchanged():
+                            return self.stats.finish()
+                    continue
+                if not isinstance(value, dict):
+                    raise PriceListError(f"Invalid {kind} entry in price list.")
+                if kind == 'category':
+                    categories.append(value)
+                    if len(categories) >= self.batch_size:
+                        self.sync_categories(categories)
+                        categories = []
+                elif kind == 'good':
+                    if categories:
+                        self.sync_categories(categories)
+                        categories = []
+                    goods.append(value)
+                    if len(goods) >= self.batch_size:
+                        self.sync_goods(goods)
+                        goods = []
+            self.sync_categories(categories)
+            self.sync_goods(goods)
+            bump_catalog_version(*CATALOG_SCOPES)
+            if self.shop is not None:
+                if self.deactivate_missing:
+                    self._deactivate_missing()
+                if self.feed_hash:
+                    Shop.objects.filter(pk=self.shop.pk).update(
+                        price_list_hash=feed_key(self.feed_hash, self.deactivate_missing)
+                    )
+        return self.stats.finish()
+
+    def _feed_unchanged(self) -> bool:
+        if (self.feed_hash and self.shop is not None
+                and self.shop.price_list_hash == feed_key(self.feed_hash, self.deactivate_missing)):
+            self.stats.skipped = True
+            return True
+        return False
+
+    def _deactivate_missing(self) -> None:
+        active = Product.objects.filter(shop=self.shop, is_active=True).values_list('id', flat=True)
+        missing = [pk for pk in active.iterator() if pk not in self.seen_ids]
+        for batch in _chunks(missing, self.batch_size):
+            self.stats.deactivated += Product.objects.filter(id__in=batch).update(
+                is_active=False, updated_at=timezone.now()
+            )
+
+    def sync_shop(self, name: str) -> Shop:
+        shop, _ = Shop.objects.get_or_create(name=name, defaults={'owner': self.owner})
+        self._check_owner(shop)
+        self.shop = shop
+        return self.shop
+
+    def _check_owner(self, shop: Shop) -> None:
+        if self.owner is None or shop.owner_id == self.owner.pk:
+            return
+        if shop.owner_id is None:
+            raise ShopOwnershipError(f"Shop '{shop.name}' has no owner; it must be assigned by an administrator.")
+        raise ShopOwnershipError(f"Shop '{shop.name}' belongs to another partner.")
+
+    def sync_categories(self, categories: Iterable[dict]) -> None:
+        for batch in _chunks(categories, self.batch_size):
+            incoming = {}
+            for row in batch:
+                if 'id' not in row or 'name' not in row:
+                    raise PriceListError("Category entries require 'id' and 'name'.")
+                try:
+                    incoming[int(str(row['id']).strip())] = row['name']
+                except ValueError:
+                    raise PriceListError(f"Invalid category id '{row['id']}'.")
+            self.category_names.update(incoming)
+
+            existing = dict(Category.objects.filter(id__in=incoming).values_list('id', 'name'))
+            new = [Category(id=pk, name=name) for pk, name in incoming.items() if pk not in existing]
+            changed = [
+                Category(id=pk, name=name, updated_at=timezone.now()) for pk, name in incoming.items()
+                if pk in existing and existing[pk] != name
+            ]
+            Category.objects.bulk_create(new, batch_size=self.batch_size, ignore_conflicts=True)
+            if self.update_category_names and changed:
+                Category.objects.bulk_update(changed, ['name', 'updated_at'], batch_size=self.batch_size)
+                index_categories(category.id for category in changed)
+            self.known_categories.update(incoming)
+
+    def sync_goods(self, goods: Iterable[dict]) -> None:
+        for batch in _chunks(goods, self.batch_size):
+            if self.shop is None:
+                raise PriceListError("Shop name is missing in the price list.")
+            self._write_goods(batch)
+            if self.progress:
+                self.progress(self.stats)
+
+    def _resolve_categories(self, category_ids: set) -> None:
+        missing = category_ids - self.known_categories
+        if not missing:
+            return
+        self.known_categories.update(Category.objects.filter(id__in=missing).values_list('id', flat=True))
+        missing -= self.known_categories
+        if not missing:
+            return
+        if not self.create_missing_categories:
+            raise CategoryNotFoundError(f"Category with id {min(missing)} not found.")
+        Category.objects.bulk_create(
+            [Category(id=pk, name=self.category_names.get(pk, "Unnamed")) for pk in missing],
+            ignore_conflicts=True,
+        )
+        self.known_categories.update(missing)
+
+    def _build_product(self, row: dict) -> Product:
+        product_id = row.get('id')
+        if product_id is None:
+            raise PriceListError("Missing product ID in price list.")
+        if not row.get('category'):
+            raise PriceListError("Missing category ID in price list.")
+        for key in REQUIRED_PRODUCT_KEYS:
+            if row.get(key) is None:
+                raise PriceListError(f"Missing '{key}' for product {product_id}.")
+        return Product(
+            id=_to_int(product_id, 'id', product_id),
+            category_id=_to_int(row['category'], 'category', product_id),
+            shop=self.shop,
+            shop_active=self.shop.state,
+            model=row.get('model') or '',
+            name=row['name'],
+            price=_to_decimal(row['price'], 'price', product_id),
+            price_rrc=_to_decimal(row['price_rrc'], 'price_rrc', product_id),
+            quantity=_to_int(row['quantity'], 'quantity', product_id),
+            parameters=row.get('parameters') or {},
+        )
+
+    def _write_goods(self, batch: list) -> None:
+        products = {}
+        for row in batch:
+            product = self._build_product(row)
+            products[product.id] = product
+        self._resolve_categories({product.category_id for product in products.values()})
+
+        # Hash the stored columns rather than keeping a hash per row: checkouts,
+        # the admin and bulk updates change quantity and prices behind the importer's back
+        existing = {
+            row[0]: (fingerprint(row[1:-2]), *row[-2:])
+            for row in Product.objects.filter(id__in=products).values_list(
+                'id', *HASHED_FIELDS, 'is_active', 'shop_active'
+            )
+        }
+        to_write = []
+        for product in products.values():
+            current = existing.get(product.id)
+            if current is None:
+                self.stats.inserted += 1
+                to_write.append(product)
+            elif current != (product_hash(product), True, product.shop_active):
+                self.stats.updated += 1
+                to_write.append(product)
+            else:
+                self.stats.unchanged += 1
+        if self.deactivate_missing:
+            self.seen_ids.update(products)
+
+        if to_write:
+            Product.objects.bulk_create(
+                to_write,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=PRODUCT_FIELDS,
+            )
+            index_products(product.id for product in to_write)
+            sync_parameters(to_write, batch_size=self.batch_size)
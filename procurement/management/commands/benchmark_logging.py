@@ -0,0 +1,91 @@
+import logging
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from procurement_automation.log import QueueListenerHandler
+
+LOGGERS = ('django', 'procurement')
+
+
+@contextmanager
+def logging_mode(mode, level):
+    """
+    Configure the project loggers for one benchmark run.
+
+    'off' disables logging, 'queue' uses settings.LOGGING as is and 'sync'
+    attaches the queue's target handlers directly to the loggers, as the
+    previous FileHandler setup did.
+    """
+    loggers = [logging.getLogger(name) for name in LOGGERS]
+    saved = [(logger, logger.level, list(logger.handlers)) for logger in loggers]
+    debug_cursor = connection.force_debug_cursor
+    try:
+        if mode == 'off':
+            logging.disable(logging.CRITICAL)
+        for logger in loggers:
+            logger.setLevel(level)
+            if mode == 'sync':
+                logger.handlers = [
+                    target for handler in logger.handlers
+                    for target in (handler.target_handlers() if isinstance(handler, QueueListenerHandler)
+                                   else [handler])
+                ]
+        # SQL queries are only logged with a debug cursor
+        connection.force_debug_cursor = level <= logging.DEBUG
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+        connection.force_debug_cursor = debug_cursor
+        for logger, logger_level, handlers in saved:
+            logger.setLevel(logger_level)
+            logger.handlers = handlers
+            for handler in handlers:
+                handler.flush()
+
+
+class Command(BaseCommand):
+    """
+    Measure request latency of an endpoint with logging off, through the
+    queue listener and with synchronous file writes.
+    """
+    help = "Benchmark request latency with logging off, queued and synchronous."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None, help="Path to request (default: the product list).")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per mode.")
+        parser.add_argument('--level', default='DEBUG', help="Level of the django and procurement loggers.")
+
+    def handle(self, *args, **options):
+        url = options['url'] or reverse('product-list')
+        level = logging.getLevelName(options['level'].upper())
+        client = Client(HTTP_HOST='localhost')
+        status = client.get(url).status_code
+        if status >= 400:
+            raise CommandError(f"GET {url} answered {status}.")
+        results = {}
+        for mode in ('off', 'queue', 'sync'):
+            with logging_mode(mode, level):
+                timings = []
+                for _ in range(options['requests']):
+                    # Measure the uncached path, which runs (and logs) SQL
+                    cache.clear()
+                    started = time.perf_counter()
+                    client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[mode] = statistics.mean(timings)
+            self.stdout.write(
+                f"{mode:>5}: mean {results[mode]:.2f} ms | p50 {timings[len(timings) // 2]:.2f} ms | "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Queued logging costs {results['queue'] - results['off']:.2f} ms per request, "
+            f"synchronous logging {results['sync'] - results['off']:.2f} ms."
+        ))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from procurement.filters import catalog_products
+from procurement.models import AVAILABLE, Category
+from procurement.renderers import FastJSONRenderer, orjson
+from procurement.rows import ValuesRows
+from procurement.serializers import CategorySerializer, ProductSerializer
+
+
+class Command(BaseCommand):
+    """
+    Compare ModelSerializer + JSONRenderer with ValuesRows + FastJSONRenderer
+    on the current catalog, checking both produce the same bytes.
+    """
+    help = "Benchmark the .values() serialization path of the product and category lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help="Rows rendered per run.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per path; the best one is reported.")
+        parser.add_argument('--expand', default='', help="Comma-separated relations to expand, e.g. shop,category.")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        expand = [name for name in options['expand'].split(',') if name]
+        self.stdout.write(f"Encoder: {'orjson' if orjson else 'json'}")
+        self._compare(
+            "products",
+            catalog_products().select_related(*expand).order_by('id')[:rows],
+            lambda *args, **kwargs: ProductSerializer(*args, expand=expand, **kwargs),
+            {'available': AVAILABLE},
+            repeat,
+        )
+        self._compare("categories", Category.objects.order_by('id')[:rows], CategorySerializer, {}, repeat)
+
+    def _compare(self, label, queryset, serializer_class, expressions, repeat):
+        plan = ValuesRows(serializer_class(), expressions)
+
+        def serializer_path():
+            return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+        def values_path():
+            return FastJSONRenderer().render(plan.render(plan.values(queryset.all())))
+
+        count = len(queryset)
+        if not count:
+            self.stdout.write(f"{label}: no rows to render")
+            return
+        expected = serializer_path()
+        if values_path() != expected:
+            raise CommandError(f"The values path renders {label} differently from the serializer.")
+        slow, fast = _best(serializer_path, repeat), _best(values_path, repeat)
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: {count} rows, {len(expected)} bytes | serializer {count / slow:,.0f} rows/s | "
+            f"values {count / fast:,.0f} rows/s | {slow / fast:.1f}x"
+        ))
+
+
+def _best(run, repeat):
+    timings = []
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+
+from procurement.models import Basket
+from procurement.reservations import by_key
+
+
+class Command(BaseCommand):
+    """
+    Merge duplicate (user, product) basket rows before the unique constraint is applied.
+    """
+    help = "Merge duplicate basket rows into one row per user and product, summing quantities."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Duplicate groups merged per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        merged = removed = 0
+        while True:
+            groups = list(
+                Basket.objects.values('user_id', 'product_id')
+                .annotate(rows=Count('id'), total=Sum('quantity'), keep=Min('id'))
+                .filter(rows__gt=1)
+                .order_by('user_id', 'product_id')[:batch_size]
+            )
+            if not groups:
+                break
+            with transaction.atomic():
+                keep = [group['keep'] for group in groups]
+                Basket.objects.filter(id__in=keep).update(
+                    quantity=by_key('id', {group['keep']: group['total'] for group in groups})
+                )
+                duplicates = Q()
+                for group in groups:
+                    duplicates |= Q(user_id=group['user_id'], product_id=group['product_id'])
+                deleted, _ = Basket.objects.filter(duplicates).exclude(id__in=keep).delete()
+            merged += len(groups)
+            removed += deleted
+            self.stdout.write(f"Merged {merged} duplicate groups so far.")
+
+        self.stdout.write(self.style.SUCCESS(f"Merged {merged} groups, removed {removed} duplicate rows."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from procurement.filters import sync_parameters
+from procurement.models import Product
+
+
+class Command(BaseCommand):
+    """
+    Fill the ProductParameter side table for products imported before it existed.
+    """
+    help = "Rebuild the ProductParameter rows used by parameter filters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Products processed per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = last_id = 0
+        while True:
+            batch = list(Product.objects.filter(id__gt=last_id).order_by('id').only('id', 'parameters')[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                sync_parameters(batch, batch_size=batch_size)
+            total += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt parameters of {total} products."))
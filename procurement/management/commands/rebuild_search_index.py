@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from procurement.cache import bump_catalog_version
+from procurement.models import Product
+from procurement.search import create_search_index, index_products
+
+
+class Command(BaseCommand):
+    """
+    Build the product search index for data imported before it existed.
+    """
+    help = "Rebuild the full-text product search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Products indexed per statement.")
+
+    def handle(self, *args, **options):
+        create_search_index()
+        batch_size = options['batch_size']
+        total = last_id = 0
+        while True:
+            batch = list(
+                Product.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            index_products(batch)
+            total += len(batch)
+            last_id = batch[-1]
+        bump_catalog_version('products')
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} products."))
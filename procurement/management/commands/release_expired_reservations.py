@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from procurement.reservations import release_expired
+
+
+class Command(BaseCommand):
+    """
+    Periodic sweeper returning expired basket holds to available stock.
+    """
+    help = "Release expired stock reservations in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Reservations released per transaction.")
+
+    def handle(self, *args, **options):
+        released = release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservations."))
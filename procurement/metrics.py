@@ -0,0 +1,270 @@
+"""
+Per-request performance metrics in the Prometheus text format.
+
+MetricsMiddleware times every request and records, per URL name and
+method, the latency, the number and duration of database queries, the
+time spent in serializers and rendering, and the response size. Series
+are aggregated in-process; with METRICS_DIR set each process also writes
+snapshots there, and the metrics endpoint merges the snapshots of all
+processes (gunicorn/uvicorn workers).
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    'procurement_http_request_duration_seconds': ("Request latency.", LATENCY_BUCKETS),
+    'procurement_http_db_queries': ("Database queries per request.", QUERY_BUCKETS),
+    'procurement_http_db_duration_seconds': ("Time spent in database queries per request.", LATENCY_BUCKETS),
+    'procurement_http_serializer_duration_seconds': ("Time spent in serializers per request.", LATENCY_BUCKETS),
+    'procurement_http_render_duration_seconds': ("Time spent rendering responses per request.", LATENCY_BUCKETS),
+    'procurement_http_response_size_bytes': ("Response body size.", SIZE_BUCKETS),
+}
+
+
+class RequestMetrics:
+    """
+    Counters of the request being handled; phases are accumulated seconds.
+    """
+    def __init__(self) -> None:
+        self.queries = 0
+        self.phases = {'db': 0.0, 'serialize': 0.0, 'render': 0.0}
+        self.timing = False
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar('request_metrics', default=None)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to `phase` of the current request.
+    Nested timed blocks are counted once, by the outermost block.
+    """
+    stats = _current.get()
+    if stats is None or stats.timing:
+        yield
+        return
+    stats.timing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timing = False
+        stats.phases[phase] += time.perf_counter() - started
+
+
+def record_query(execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+    """
+    Database execute wrapper counting queries of the current request.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.phases['db'] += time.perf_counter() - started
+
+
+def instrument_connection(sender: Any, connection: Any, **kwargs) -> None:
+    """
+    connection_created receiver installing record_query once per connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Registry:
+    """
+    Thread-safe histogram series keyed by metric name and label values.
+
+    Each series holds per-bucket counts (the last one is +Inf), the sum and
+    the count of observations.
+    """
+    def __init__(self) -> None:
+        self.series: dict = {}
+        self.lock = threading.Lock()
+        self.flushed = 0.0
+        self.path: Optional[Path] = None
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            series = self.series.get((name, labels))
+            if series is None:
+                series = self.series[(name, labels)] = [[0] * (len(buckets) + 1), 0.0]
+            index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> list:
+        with self.lock:
+            return [[name, list(labels), list(counts), total] for (name, labels), (counts, total) in self.series.items()]
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Write this process' series to METRICS_DIR, at most every
+        METRICS_FLUSH_SECONDS unless forced.
+        """
+        directory = settings.METRICS_DIR
+        if not directory or (not force and time.monotonic() - self.flushed < settings.METRICS_FLUSH_SECONDS):
+            return
+        self.flushed = time.monotonic()
+        if self.path is None:
+            # Unique per process lifetime, so a reused pid never overwrites a dead worker's totals
+            self.path = Path(directory) / f'{os.getpid()}-{time.time_ns()}.json'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, self.path)
+
+    def collect(self) -> dict:
+        """
+        Series of every process writing to METRICS_DIR, or of this process.
+        """
+        if not settings.METRICS_DIR:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush(force=True)
+            snapshots = []
+            for path in Path(settings.METRICS_DIR).glob('*.json'):
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+        merged: dict = {}
+        for snapshot in snapshots:
+            for name, labels, counts, total in snapshot:
+                if name not in HISTOGRAMS:
+                    continue
+                series = merged.setdefault((name, tuple(map(tuple, labels))), [[0] * len(counts), 0.0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+        return merged
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: tuple, extra: Optional[tuple] = None) -> str:
+    pairs = labels + ((extra,) if extra else ())
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render_metrics() -> str:
+    """
+    All collected series in the Prometheus text exposition format.
+    """
+    series = registry.collect()
+    lines = []
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        for (series_name, labels), (counts, total) in sorted(series.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip((*map(str, buckets), '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, ("le", bound))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {total!r}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Record the metrics of every request, labelled with the URL name (or
+    "unmatched"), method and status. With DEBUG on, the request's phases
+    are also returned in a Server-Timing header.
+
+    Rendering is timed through process_template_response, so place this
+    middleware first to measure the whole request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: Any) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestMetrics()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request: Any) -> HttpResponse:
+        stats = RequestMetrics()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    def process_template_response(self, request: Any, response: Any) -> Any:
+        stats = _current.get()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response: Any) -> None:
+                stats.phases['render'] += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request: Any, response: HttpResponse, stats: RequestMetrics, duration: float) -> HttpResponse:
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match is not None else None) or 'unmatched'
+        labels = (('view', view), ('method', request.method))
+        registry.observe('procurement_http_request_duration_seconds',
+                         labels + (('status', str(response.status_code)),), duration)
+        registry.observe('procurement_http_db_queries', labels, stats.queries)
+        registry.observe('procurement_http_db_duration_seconds', labels, stats.phases['db'])
+        registry.observe('procurement_http_serializer_duration_seconds', labels, stats.phases['serialize'])
+        registry.observe('procurement_http_render_duration_seconds', labels, stats.phases['render'])
+        if not response.streaming:
+            registry.observe('procurement_http_response_size_bytes', labels, len(response.content))
+        registry.flush()
+
+        if settings.DEBUG:
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={stats.phases["db"] * 1000:.2f};desc="{stats.queries} queries"',
+                f'serialize;dur={stats.phases["serialize"] * 1000:.2f}',
+                f'render;dur={stats.phases["render"] * 1000:.2f}',
+                f'total;dur={duration * 1000:.2f}',
+            ])
+        return response
@@ -1,6 +1,8 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from typing import Optional
 import uuid
 
@@ -95,8 +97,11 @@ class Shop(models.Model):
     Shop model.
     """
     name = models.CharField(max_length=255, unique=True)
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='shops')
     url = models.URLField(blank=True, null=True)
     state = models.BooleanField(default=True)
+    price_list_hash = models.CharField(max_length=64, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['id']
@@ -111,6 +116,7 @@ class Category(models.Model):
     """
     id = models.PositiveIntegerField(primary_key=True)
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['id']
@@ -119,6 +125,11 @@ class Category(models.Model):
         return self.name
 
 
+LISTED = models.Q(is_active=True, shop_active=True)
+# Database counterpart of Product.available
+AVAILABLE = Greatest(models.F('quantity') - models.F('reserved'), models.Value(0), output_field=models.IntegerField())
+
+
 class Product(models.Model):
     """
     Product model.
@@ -131,14 +142,49 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     price_rrc = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField()
+    reserved = models.PositiveIntegerField(default=0)  # sum of active Reservation holds
     parameters = models.JSONField(default=dict)
+    is_active = models.BooleanField(default=True)
+    shop_active = models.BooleanField(default=True)  # copy of Shop.state, kept in sync by signals and admin
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['id']
+        # Partial indexes over the listed catalog only (active products of active shops)
+        indexes = [
+            models.Index(fields=['category', 'price'], condition=LISTED, name='product_listed_category_price'),
+            models.Index(fields=['shop', 'price'], condition=LISTED, name='product_listed_shop_price'),
+            models.Index(fields=['price'], condition=LISTED, name='product_listed_price'),
+            models.Index(fields=['name'], condition=LISTED, name='product_listed_name'),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
+    @property
+    def available(self) -> int:
+        return max(self.quantity - self.reserved, 0)
+
+
+class ProductParameter(models.Model):
+    """
+    One Product.parameters entry flattened for indexed filtering.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='parameter_values')
+    key = models.CharField(max_length=255)
+    value = models.CharField(max_length=255)
+    numeric_value = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        # product is part of both indexes so filters never touch the table itself
+        indexes = [
+            models.Index(fields=['key', 'value', 'product']),
+            models.Index(fields=['key', 'numeric_value', 'product']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.key}={self.value}"
+
 
 class Basket(models.Model):
     """
@@ -147,11 +193,36 @@ class Basket(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='basket')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='basket_items')
     quantity = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # The unique index also serves every basket lookup by user
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_basket_user_product'),
+        ]
 
     def __str__(self) -> str:
         return f"Basket item: {self.product.name} (x{self.quantity})"
 
 
+class Reservation(models.Model):
+    """
+    Stock held for a basket line until it expires.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_reservation_user_product'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.quantity} x {self.product_id} held until {self.expires_at}"
+
+
 class Order(models.Model):
     """
     User's order.
@@ -159,6 +230,8 @@ class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     contact = models.ForeignKey(Contact, on_delete=models.SET_NULL, null=True)
     status = models.CharField(max_length=50, default='created')
+    total_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -166,3 +239,61 @@ class Order(models.Model):
 
     def __str__(self) -> str:
         return f"Order #{self.id} - {self.status}"
+
+
+class OrderItem(models.Model):
+    """
+    Product line of an order with the price at checkout time.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='order_items')
+    shop = models.ForeignKey(Shop, on_delete=models.SET_NULL, null=True, related_name='order_items')
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)  # copy of Order.created_at for partner reports
+
+    class Meta:
+        indexes = [models.Index(fields=['shop', 'created_at'])]
+
+    def __str__(self) -> str:
+        return f"{self.product_id} x {self.quantity} in order #{self.order_id}"
+
+
+class ImportJob(models.Model):
+    """
+    Background price-list import.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    shop = models.ForeignKey(Shop, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    source = models.CharField(max_length=500)
+    delete_source = models.BooleanField(default=False)
+    deactivate_missing = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    processed_rows = models.PositiveIntegerField(default=0)
+    inserted = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+    deactivated = models.PositiveIntegerField(default=0)
+    skipped = models.BooleanField(default=False)
+    rows_per_second = models.FloatField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:
+        return f"Import job #{self.id} - {self.status}"
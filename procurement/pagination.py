@@ -0,0 +1,89 @@
+from typing import Any, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.db.models.query import QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination following the queryset's ordering, or the model's
+    Meta.ordering when the view did not sort it.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_ordering(self, request: Any, queryset: QuerySet, view: Any = None) -> tuple:
+        return tuple(queryset.query.order_by or queryset.model._meta.ordering)
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Sending ``?cursor=`` (empty for the first page) switches to keyset
+    pagination, so deep pages cost the same as the first one and no COUNT(*)
+    is issued. Clients may pick the page size with ``?page_size=``.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = KeysetPagination.cursor_query_param
+
+    def __init__(self) -> None:
+        self.keyset: Optional[KeysetPagination] = None
+
+    def paginate_queryset(self, queryset: QuerySet, request: Any, view: Any = None) -> Optional[list]:
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: list) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view: Any) -> list:
+        return (
+            super().get_schema_operation_parameters(view)
+            + KeysetPagination().get_schema_operation_parameters(view)[:1]
+        )
+
+
+async def apaginate_queryset(pagination: BasePagination, queryset: QuerySet, request: Any,
+                             view: Any = None) -> Optional[list]:
+    """
+    Async counterpart of ``pagination.paginate_queryset``.
+
+    Page-number pages are counted with acount() and fetched by async
+    iteration; keyset pages and other paginators run in a worker thread.
+    """
+    keyset = isinstance(pagination, OptionalCursorPagination) and (
+        pagination.cursor_query_param in request.query_params
+    )
+    if keyset or not isinstance(pagination, PageNumberPagination):
+        return await sync_to_async(pagination.paginate_queryset)(queryset, request, view)
+
+    pagination.request = request
+    page_size = pagination.get_page_size(request)
+    if not page_size:
+        return None
+
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    paginator.count = await queryset.acount()
+    page_number = pagination.get_page_number(request, paginator)
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+    if paginator.num_pages > 1 and pagination.template is not None:
+        pagination.display_page_controls = True
+
+    pagination.page.object_list = [row async for row in pagination.page.object_list]
+    return list(pagination.page)
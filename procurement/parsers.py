@@ -0,0 +1,116 @@
+from typing import IO, Iterator, Tuple
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+from .importers import PriceListError
+
+SECTIONS = {
+    'categories': 'category',
+    'goods': 'good',
+}
+
+
+def _compose(loader: SafeLoader, anchors: dict) -> yaml.Node:
+    """
+    Build a single node from the event stream, mirroring PyYAML's composer.
+    """
+    event = loader.get_event()
+    if isinstance(event, yaml.AliasEvent):
+        if event.anchor not in anchors:
+            raise yaml.composer.ComposerError(
+                None, None, f"found undefined alias {event.anchor!r}", event.start_mark
+            )
+        return anchors[event.anchor]
+
+    if isinstance(event, yaml.ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+        node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        return node
+
+    if isinstance(event, yaml.SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.SequenceNode, None, event.implicit)
+        node = yaml.SequenceNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        while not loader.check_event(yaml.SequenceEndEvent):
+            node.value.append(_compose(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+        return node
+
+    if isinstance(event, yaml.MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.MappingNode, None, event.implicit)
+        node = yaml.MappingNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = _compose(loader, anchors)
+            node.value.append((key, _compose(loader, anchors)))
+        node.end_mark = loader.get_event().end_mark
+        return node
+
+    raise yaml.composer.ComposerError(None, None, f"unexpected event {event}", event.start_mark)
+
+
+def _load_next(loader: SafeLoader, anchors: dict):
+    return loader.construct_document(_compose(loader, anchors))
+
+
+def _iter_sequence(loader: SafeLoader, anchors: dict) -> Iterator:
+    if not loader.check_event(yaml.SequenceStartEvent):
+        value = _load_next(loader, anchors)
+        if value is None:
+            return
+        raise PriceListError("Price list sections must be lists.")
+    loader.get_event()
+    while not loader.check_event(yaml.SequenceEndEvent):
+        yield _load_next(loader, anchors)
+    loader.get_event()
+
+
+def iter_price_list(stream: IO) -> Iterator[Tuple[str, object]]:
+    """
+    Stream a YAML price list as ('shop' | 'category' | 'good', value) entries.
+
+    Both the partner format (a mapping with shop, categories and goods) and the
+    supplier format (a plain list of goods) are supported. Only one entry is
+    materialized at a time, so memory use does not depend on the file size.
+    """
+    loader = SafeLoader(stream)
+    anchors: dict = {}
+    try:
+        loader.get_event()  # StreamStart
+        if loader.check_event(yaml.StreamEndEvent):
+            raise PriceListError("Price list is empty.")
+        loader.get_event()  # DocumentStart
+
+        if loader.check_event(yaml.SequenceStartEvent):
+            for item in _iter_sequence(loader, anchors):
+                yield 'good', item
+        elif loader.check_event(yaml.MappingStartEvent):
+            loader.get_event()
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = _load_next(loader, anchors)
+                if key in SECTIONS:
+                    for item in _iter_sequence(loader, anchors):
+                        yield SECTIONS[key], item
+                elif key == 'shop':
+                    yield 'shop', _load_next(loader, anchors)
+                else:
+                    _compose(loader, anchors)
+        else:
+            raise PriceListError("Price list must be a mapping or a list of products.")
+    finally:
+        loader.dispose()
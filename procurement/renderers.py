@@ -0,0 +1,39 @@
+import re
+from typing import Any, Optional
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson writes exponents as 1e16 / 1e-5 where json.dumps writes 1e+16 / 1e-05
+EXPONENT = re.compile(rb'\de-?\d')
+# Leave these to the DRF encoder, which formats them differently
+PASSTHROUGH = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it is installed.
+
+    The output is byte-identical to JSONRenderer: types orjson does not know
+    go through the same encoder, \\u2028 and \\u2029 are escaped the same way,
+    and anything orjson would format differently (pretty printing, exponent
+    floats, big integers, non-string keys) is re-rendered with json.dumps.
+    The one difference is NaN and Infinity, which orjson renders as null
+    where STRICT_JSON would raise.
+    """
+    def render(self, data: Any, accepted_media_type: Optional[str] = None,
+               renderer_context: Optional[dict] = None) -> bytes:
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=PASSTHROUGH)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        if EXPONENT.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
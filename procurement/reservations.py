@@ -0,0 +1,167 @@
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.query import QuerySet
+from django.utils import timezone
+
+from .cache import basket_scope, bump_catalog_version, mark_stock_changed
+from .models import Product, Reservation, User
+
+
+class InsufficientStockError(Exception):
+    """
+    Raised when a product does not have enough unreserved stock.
+    """
+    def __init__(self, product_id: int) -> None:
+        super().__init__(f"Not enough stock for product {product_id}")
+        self.product_id = product_id
+
+
+def by_key(field: str, values: dict) -> Case:
+    """
+    Build a CASE expression picking a per-row value by `field`.
+    """
+    return Case(
+        *[When(**{field: key}, then=Value(value)) for key, value in values.items()],
+        output_field=IntegerField(),
+    )
+
+
+def lock_products(product_ids: Iterable[int]) -> None:
+    """
+    Lock product rows in primary-key order where the database supports it.
+    """
+    if connection.features.has_select_for_update:
+        list(Product.objects.select_for_update().filter(id__in=product_ids).order_by('id')
+             .values_list('id', flat=True))
+
+
+# Set while deleting holds whose quantity was already taken off Product.reserved
+_released: ContextVar[bool] = ContextVar('holds_released', default=False)
+
+
+def delete_released(queryset: QuerySet) -> None:
+    """
+    Delete Reservation rows after their quantity was subtracted from
+    Product.reserved, so release_deleted leaves the counter alone.
+    """
+    token = _released.set(True)
+    try:
+        queryset.delete()
+    finally:
+        _released.reset(token)
+
+
+def release_deleted(reservation: Reservation) -> None:
+    """
+    Return the stock of a hold deleted any other way, e.g. together with its
+    user or from the admin. Called from a pre_delete receiver.
+    """
+    if _released.get():
+        return
+    Product.objects.filter(pk=reservation.product_id).update(reserved=F('reserved') - reservation.quantity)
+    mark_stock_changed()
+
+
+def reservation_expiry() -> datetime:
+    return timezone.now() + timedelta(seconds=settings.RESERVATION_TTL)
+
+
+def hold(user: User, quantities: Dict[int, int]) -> None:
+    """
+    Make the user's holds equal {product_id: quantity}, refreshing their TTL.
+
+    Only the difference to the current holds is reserved or released, through
+    the Product.reserved counter, so availability never sums over holds.
+    Cached product lists, which show availability, pick the change up within
+    CATALOG_STOCK_TIMEOUT seconds; the user's basket version is bumped.
+    Must run inside a transaction; raises InsufficientStockError.
+    """
+    if not quantities:
+        return
+    bump_catalog_version(basket_scope(user.id))
+    lock_products(quantities)
+    current = dict(
+        Reservation.objects.filter(user=user, product_id__in=quantities).values_list('product_id', 'quantity')
+    )
+    more = {key: value - current.get(key, 0) for key, value in quantities.items() if value > current.get(key, 0)}
+    less = {key: current[key] - value for key, value in quantities.items() if value < current.get(key, 0)}
+
+    if more:
+        amount = by_key('id', more)
+        reserved = Product.objects.filter(
+            id__in=more, is_active=True, shop_active=True, quantity__gte=F('reserved') + amount
+        ).update(reserved=F('reserved') + amount)
+        if reserved != len(more):
+            available = dict(
+                Product.objects.filter(id__in=more).values_list('id', F('quantity') - F('reserved'))
+            )
+            raise InsufficientStockError(min(key for key in more if available.get(key, 0) < more[key]))
+    if less:
+        Product.objects.filter(id__in=less).update(reserved=F('reserved') - by_key('id', less))
+    if more or less:
+        mark_stock_changed()
+
+    expires_at = reservation_expiry()
+    if current:
+        Reservation.objects.filter(user=user, product_id__in=current).update(
+            quantity=by_key('product_id', {key: quantities[key] for key in current}), expires_at=expires_at
+        )
+    Reservation.objects.bulk_create([
+        Reservation(user=user, product_id=key, quantity=value, expires_at=expires_at)
+        for key, value in quantities.items() if key not in current
+    ])
+
+
+def release(user: User, product_ids: Iterable[int]) -> None:
+    """
+    Drop the user's holds on the given products and bump the user's basket
+    version. Must run inside a transaction.
+    """
+    bump_catalog_version(basket_scope(user.id))
+    product_ids = list(product_ids)
+    lock_products(product_ids)
+    holds = dict(
+        Reservation.objects.filter(user=user, product_id__in=product_ids).values_list('product_id', 'quantity')
+    )
+    if holds:
+        Product.objects.filter(id__in=holds).update(reserved=F('reserved') - by_key('id', holds))
+        delete_released(Reservation.objects.filter(user=user, product_id__in=holds))
+        mark_stock_changed()
+
+
+def release_expired(batch_size: int = 1000, now: Optional[datetime] = None) -> int:
+    """
+    Release expired holds in batches and return how many were removed.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        product_ids = set(
+            Reservation.objects.filter(expires_at__lte=now).order_by('expires_at')
+            .values_list('product_id', flat=True)[:batch_size]
+        )
+        if not product_ids:
+            return released
+        with transaction.atomic():
+            lock_products(product_ids)
+            # Re-read after locking: a checkout may have consumed some of the holds meanwhile
+            expired = list(
+                Reservation.objects.filter(expires_at__lte=now, product_id__in=product_ids)
+                .values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            totals = defaultdict(int)
+            for _, product_id, quantity in expired:
+                totals[product_id] += quantity
+            if totals:
+                Product.objects.filter(id__in=totals).update(reserved=F('reserved') - by_key('id', totals))
+                delete_released(Reservation.objects.filter(id__in=[pk for pk, _, _ in expired]))
+                mark_stock_changed()
+        released += len(expired)
+        if not expired:
+            return released
@@ -0,0 +1,164 @@
+import threading
+from contextvars import ContextVar
+from itertools import count
+from typing import Any, Callable, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = 'replica:pin:{}'
+
+
+class RequestState:
+    """
+    Per-request routing state: whether the view allows replica reads, the
+    replica picked for it and whether it has written to the primary.
+    """
+    def __init__(self) -> None:
+        self.read_only = False
+        self.wrote = False
+        self.replica: Optional[str] = None
+
+
+_state: ContextVar[Optional[RequestState]] = ContextVar('replica_state', default=None)
+_lock = threading.Lock()
+_turns = count()
+_in_flight: dict = {}
+
+
+def _pick_replica() -> str:
+    replicas = settings.DATABASE_REPLICAS
+    with _lock:
+        if settings.REPLICA_SELECTION == 'least_loaded':
+            alias = min(replicas, key=lambda name: _in_flight.get(name, 0))
+        else:
+            alias = replicas[next(_turns) % len(replicas)]
+        _in_flight[alias] = _in_flight.get(alias, 0) + 1
+    return alias
+
+
+def _release_replica(alias: str) -> None:
+    with _lock:
+        _in_flight[alias] -= 1
+
+
+def use_replica(user: Any = None) -> None:
+    """
+    Let the current request read from a replica, unless `user` wrote
+    within the last REPLICA_PIN_SECONDS and must see their own writes.
+    """
+    state = _state.get()
+    if state is None or not settings.DATABASE_REPLICAS:
+        return
+    if user is not None and user.is_authenticated and cache.get(PIN_KEY.format(user.pk)):
+        return
+    state.read_only = True
+
+
+async def ause_replica(user: Any = None) -> None:
+    """
+    Async version of use_replica, reading the pin with cache.aget.
+    """
+    state = _state.get()
+    if state is None or not settings.DATABASE_REPLICAS:
+        return
+    if user is not None and user.is_authenticated and await cache.aget(PIN_KEY.format(user.pk)):
+        return
+    state.read_only = True
+
+
+class ReplicaRouter:
+    """
+    Send reads of views that opted in with ReplicaReadMixin to a replica
+    from DATABASE_REPLICAS, chosen round-robin or by fewest requests in
+    flight (REPLICA_SELECTION). Every write goes to the primary and pins
+    the rest of the request there.
+    """
+    def db_for_read(self, model: Any, **hints) -> Optional[str]:
+        state = _state.get()
+        if state is None or not state.read_only or state.wrote:
+            return None
+        if state.replica is None:
+            state.replica = _pick_replica()
+        return state.replica
+
+    def db_for_write(self, model: Any, **hints) -> str:
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints) -> Optional[bool]:
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Track routing state per request. After a request that wrote, the user's
+    reads stay on the primary for REPLICA_PIN_SECONDS (read-your-writes).
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: Any) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+            if state.replica is not None:
+                _release_replica(state.replica)
+        user = getattr(request, 'user', None)
+        if state.wrote and user is not None and user.is_authenticated and settings.DATABASE_REPLICAS:
+            cache.set(PIN_KEY.format(user.pk), True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request: Any) -> HttpResponse:
+        state = RequestState()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+            if state.replica is not None:
+                _release_replica(state.replica)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            # request.user may be a lazy session user that still needs a query
+            user = await sync_to_async(getattr)(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                await cache.aset(PIN_KEY.format(user.pk), True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe requests of a read-only view from a replica.
+    """
+    def initial(self, request: Any, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            use_replica(request.user)
+
+    async def ainitial(self, request: Any, *args, **kwargs) -> None:
+        """
+        initial() for async views, without blocking the event loop on the cache.
+        """
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            await ause_replica(request.user)
@@ -0,0 +1,141 @@
+from typing import Any, Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.query import QuerySet
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .metrics import timed
+from .pagination import apaginate_queryset
+from .renderers import FastJSONRenderer
+
+# Fields whose representation of a database value is the value itself
+PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.PrimaryKeyRelatedField)
+
+
+class UnsupportedField(Exception):
+    """
+    Raised when a serializer field cannot be read from a `.values()` column.
+    """
+
+
+class ValuesRows:
+    """
+    Render `.values()` rows exactly like a read-only serializer renders model
+    instances, without building models or resolving attributes field by field.
+
+    Plain model fields map to columns, nested model serializers to joined
+    ``relation__field`` columns, and ``expressions`` supply fields that are
+    not columns (e.g. properties). Use ``compile`` to get None instead of an
+    error for serializers that cannot be rendered this way.
+    """
+    def __init__(self, serializer: serializers.Serializer, expressions: Optional[dict] = None) -> None:
+        self.expressions = dict(expressions or {})
+        self.columns: dict = {}
+        self.steps = self._compile(serializer, '')
+
+    @classmethod
+    def compile(cls, serializer: serializers.Serializer, expressions: Optional[dict] = None) -> Optional['ValuesRows']:
+        try:
+            return cls(serializer, expressions)
+        except UnsupportedField:
+            return None
+
+    def _compile(self, serializer: serializers.Serializer, prefix: str) -> list:
+        meta = serializer.Meta.model._meta
+        steps = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise UnsupportedField(name)
+            column = prefix + field.source
+            if isinstance(field, serializers.ModelSerializer):
+                pk = f'{column}__{field.Meta.model._meta.pk.name}'
+                self.columns[pk] = None
+                steps.append((name, pk, self._compile(field, column + '__')))
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                raise UnsupportedField(name)
+            if not prefix and field.source in self.expressions:
+                self.columns[column] = None
+            else:
+                try:
+                    model_field = meta.get_field(field.source)
+                except FieldDoesNotExist:
+                    raise UnsupportedField(name)
+                if not model_field.concrete or model_field.many_to_many:
+                    raise UnsupportedField(name)
+                self.columns[column] = None
+            passthrough = type(field) in PASSTHROUGH_FIELDS or (
+                type(field) is serializers.JSONField and not field.binary
+            )
+            steps.append((name, column, None if passthrough else field.to_representation))
+        return steps
+
+    def values(self, queryset: QuerySet) -> QuerySet:
+        """
+        Select the plan's columns, plus the ordering columns pagination reads.
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        columns = dict(self.columns)
+        columns.update((field.lstrip('-'), None) for field in ordering if isinstance(field, str))
+        names = [column for column in columns if column not in self.expressions]
+        return queryset.values(*names, **{name: self.expressions[name] for name in columns if name in self.expressions})
+
+    def render(self, rows: Iterable[dict]) -> list:
+        with timed('serialize'):
+            return [self._render(self.steps, row) for row in rows]
+
+    def _render(self, steps: list, row: dict) -> dict:
+        data = {}
+        for name, column, convert in steps:
+            value = row[column]
+            if value is None:
+                data[name] = None
+            elif convert is None:
+                data[name] = value
+            elif isinstance(convert, list):
+                data[name] = self._render(convert, row)
+            else:
+                data[name] = convert(value)
+        return data
+
+
+class ValuesListMixin:
+    """
+    List handler serializing `.values()` rows instead of model instances.
+
+    The view's serializer, already narrowed by ?fields= and ?expand=, is
+    compiled into a ValuesRows plan and the page is encoded with
+    FastJSONRenderer; serializers the plan cannot express use the regular
+    list handler. ``values_expressions`` provides non-column fields.
+    """
+    renderer_classes = [FastJSONRenderer]
+    values_expressions: dict = {}
+
+    def list(self, request: Any, *args, **kwargs) -> Response:
+        rows = ValuesRows.compile(self.get_serializer(), self.values_expressions)
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.render(page))
+        return Response(rows.render(queryset))
+
+    async def alist(self, request: Any, *args, **kwargs) -> Response:
+        """
+        Async version of list(); the serializer fallback runs in a worker thread.
+        """
+        rows = ValuesRows.compile(self.get_serializer(), self.values_expressions)
+        if rows is None:
+            return await sync_to_async(super().list)(request, *args, **kwargs)
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+        page = None
+        if self.paginator is not None:
+            page = await apaginate_queryset(self.paginator, queryset, request, view=self)
+        if page is not None:
+            return self.get_paginated_response(rows.render(page))
+        return Response(rows.render([row async for row in queryset]))
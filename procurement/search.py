@@ -0,0 +1,133 @@
+import re
+from typing import Iterable, List
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
+
+SEARCH_TABLE = 'procurement_product_search'
+PRODUCT_TABLE = 'procurement_product'
+CATEGORY_TABLE = 'procurement_category'
+MAX_TERMS = 10
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query: str) -> List[str]:
+    """
+    Split user input into plain word tokens, dropping query syntax.
+    """
+    return TOKEN_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def _vendor(using: str) -> str:
+    return connections[using].vendor
+
+
+def create_search_index(using: str = 'default') -> None:
+    """
+    Create the text index: an FTS5 table on SQLite, a GIN-indexed tsvector on PostgreSQL.
+    """
+    vendor = _vendor(using)
+    with connections[using].cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                f"USING fts5(name, model, category, tokenize='unicode61 remove_diacritics 2')"
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                f"product_id integer PRIMARY KEY REFERENCES {PRODUCT_TABLE} (id) ON DELETE CASCADE, "
+                f"document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+            )
+
+
+def index_products(product_ids: Iterable[int], using: str = 'default') -> None:
+    """
+    (Re)index the given products with a single set-based statement per backend.
+    """
+    product_ids = list(product_ids)
+    vendor = _vendor(using)
+    if not product_ids or vendor not in ('sqlite', 'postgresql'):
+        return
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connections[using].cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", product_ids)
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, name, model, category) "
+                f"SELECT p.id, p.name, p.model, c.name FROM {PRODUCT_TABLE} p "
+                f"JOIN {CATEGORY_TABLE} c ON c.id = p.category_id WHERE p.id IN ({placeholders})",
+                product_ids,
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (product_id, document) "
+                f"SELECT p.id, setweight(to_tsvector('simple', p.name), 'A') || "
+                f"setweight(to_tsvector('simple', p.model), 'B') || "
+                f"setweight(to_tsvector('simple', c.name), 'C') FROM {PRODUCT_TABLE} p "
+                f"JOIN {CATEGORY_TABLE} c ON c.id = p.category_id WHERE p.id IN ({placeholders}) "
+                f"ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                product_ids,
+            )
+
+
+def index_categories(category_ids: Iterable[int], using: str = 'default') -> None:
+    """
+    Reindex the products of renamed categories.
+    """
+    from .models import Product
+
+    ids = list(Product.objects.using(using).filter(category_id__in=list(category_ids)).values_list('id', flat=True))
+    for start in range(0, len(ids), 500):
+        index_products(ids[start:start + 500], using=using)
+
+
+def unindex_products(product_ids: Iterable[int], using: str = 'default') -> None:
+    product_ids = list(product_ids)
+    if not product_ids or _vendor(using) != 'sqlite':
+        return  # PostgreSQL rows go away through ON DELETE CASCADE
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", product_ids)
+
+
+def search_products(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Restrict `queryset` to products matching every word of `query` as a
+    prefix, best matches first.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    vendor = _vendor(queryset.db)
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match]),
+        ).annotate(rank=RawSQL(
+            f"SELECT bm25({SEARCH_TABLE}, 10.0, 5.0, 1.0) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE}.rowid = {PRODUCT_TABLE}.id AND {SEARCH_TABLE} MATCH %s",
+            [match], output_field=FloatField(),
+        )).order_by('rank', 'id')
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT product_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', %s)", [tsquery]
+            ),
+        ).annotate(rank=RawSQL(
+            f"SELECT -ts_rank(document, to_tsquery('simple', %s)) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE}.product_id = {PRODUCT_TABLE}.id",
+            [tsquery], output_field=FloatField(),
+        )).order_by('rank', 'id')
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(model__icontains=term) | Q(category__name__icontains=term)
+    return queryset.filter(condition).order_by('id')
@@ -1,7 +1,66 @@
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import User, Contact, Shop, Category, Product, Basket, Order
+from .metrics import timed
+from .models import User, Contact, Shop, Category, Product, Basket, Order, OrderItem, ImportJob
+from .tasks import get_progress
+
+
+def query_list(request: Any, name: str) -> Optional[Set[str]]:
+    """
+    Parse a comma-separated query parameter such as ?fields= or ?expand=.
+    """
+    if request is None or name not in request.query_params:
+        return None
+    return {value.strip() for value in request.query_params[name].split(',') if value.strip()}
+
+
+class ExpandableFieldsMixin:
+    """
+    Sparse fieldsets (``?fields=id,name``) and opt-in nesting (``?expand=shop``).
+
+    Relations listed in ``expandable`` render as IDs unless expanded; those
+    in ``nested`` are always nested. Dotted paths (``expand=product.shop``)
+    are forwarded to nested serializers. Omitted fields are removed before
+    serialization, so they cost nothing. Query parameters only apply to
+    output-only serializers (no ``data``) at the top level.
+    """
+    expandable: Dict[str, Tuple[type, dict]] = {}
+    nested: Dict[str, Tuple[type, dict]] = {}
+
+    def __init__(self, *args, fields: Optional[Iterable[str]] = None, expand: Optional[Iterable[str]] = None,
+                 **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None and 'data' not in kwargs:
+            request = self.context.get('request')
+            fields = query_list(request, 'fields')
+            expand = query_list(request, 'expand')
+        expand = set(expand or ())
+        roots = {path.split('.')[0] for path in expand}
+
+        for name, (serializer_class, options) in {**self.expandable, **self.nested}.items():
+            if name not in self.fields or (name in self.expandable and name not in roots):
+                continue
+            forwarded = {path[len(name) + 1:] for path in expand if path.startswith(name + '.')}
+            self.fields[name] = serializer_class(read_only=True, fields=(), expand=forwarded, **options)
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def to_representation(self, instance: Any) -> dict:
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+def expanded(request: Any) -> Set[str]:
+    """
+    Relations requested with ?expand=, including the parents of dotted paths.
+    """
+    paths = query_list(request, 'expand') or set()
+    return {'__'.join(path.split('.')[:depth]) for path in paths for depth in range(1, path.count('.') + 2)}
 
 
 # User Serializers
@@ -124,46 +183,54 @@ class ContactSerializer(serializers.ModelSerializer):
 
 
 # Shop, Category, Product Serializers
-class ShopSerializer(serializers.ModelSerializer):
+class ShopSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for shops.
     """
     class Meta:
         model = Shop
-        fields = '__all__'
+        fields = ['id', 'name', 'url', 'state']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for categories.
     """
     class Meta:
         model = Category
-        fields = '__all__'
+        fields = ['id', 'name']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer for products.
+    Serializer for products; `category` and `shop` are IDs unless expanded.
+    Bookkeeping columns (reservations, listing flags) stay private.
     """
-    category = CategorySerializer(read_only=True)
-    shop = ShopSerializer(read_only=True)
+    expandable = {'category': (CategorySerializer, {}), 'shop': (ShopSerializer, {})}
+
+    category = serializers.PrimaryKeyRelatedField(read_only=True)
+    shop = serializers.PrimaryKeyRelatedField(read_only=True)
+    available = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Product
-        fields = '__all__'
+        fields = ['id', 'category', 'shop', 'model', 'name', 'price', 'price_rrc', 'quantity', 'available', 'parameters']
 
 
 # Basket Serializers
-class BasketSerializer(serializers.ModelSerializer):
+class BasketSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer for basket items.
+    Serializer for basket items; `product` is an ID unless expanded.
+    `available` is false for products that can no longer be ordered.
     """
-    product = ProductSerializer(read_only=True)
+    expandable = {'product': (ProductSerializer, {})}
+
+    product = serializers.PrimaryKeyRelatedField(read_only=True)
+    available = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Basket
-        fields = ['id', 'user', 'product', 'quantity']
+        fields = ['id', 'user', 'product', 'quantity', 'available']
 
     def validate_quantity(self, value: int) -> int:
         """
@@ -175,16 +242,31 @@ class BasketSerializer(serializers.ModelSerializer):
 
 
 # Order Serializers
-class OrderSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer for orders.
+    Serializer for order lines; `product` and `shop` are IDs unless expanded.
     """
+    expandable = {'product': (ProductSerializer, {}), 'shop': (ShopSerializer, {})}
+
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'shop', 'quantity', 'price']
+        read_only_fields = fields
+
+
+class OrderSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for orders; `items.product` and `items.shop` can be expanded.
+    """
+    nested = {'items': (OrderItemSerializer, {'many': True})}
+
     contact = serializers.PrimaryKeyRelatedField(queryset=Contact.objects.all())
+    items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = Order
-        fields = ['id', 'user', 'contact', 'status', 'created_at']
-        read_only_fields = ['user', 'status', 'created_at']
+        fields = ['id', 'user', 'contact', 'status', 'total_sum', 'item_count', 'items', 'created_at']
+        read_only_fields = ['user', 'status', 'total_sum', 'item_count', 'created_at']
 
     def create(self, validated_data: dict) -> Order:
         """
@@ -192,3 +274,36 @@ class OrderSerializer(serializers.ModelSerializer):
         """
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class PartnerOrderSerializer(OrderSerializer):
+    """
+    Serializer for orders seen by a partner; totals cover the partner's own
+    lines only (annotated by PartnerOrdersView).
+    """
+    total_sum = serializers.DecimalField(max_digits=12, decimal_places=2, source='shop_total_sum', read_only=True)
+    item_count = serializers.IntegerField(source='shop_item_count', read_only=True)
+
+
+# Import Job Serializers
+class ImportJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for price-list import jobs.
+    """
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'shop', 'status', 'processed_rows', 'inserted', 'updated', 'unchanged',
+            'deactivated', 'skipped', 'rows_per_second', 'errors', 'created_at', 'started_at',
+            'finished_at',
+        ]
+        read_only_fields = fields
+
+    def to_representation(self, instance: ImportJob) -> dict:
+        """
+        Overlay live progress published by the worker while the job is running.
+        """
+        data = super().to_representation(instance)
+        if instance.status == ImportJob.STATUS_RUNNING:
+            data.update(get_progress(instance.id) or {})
+        return data
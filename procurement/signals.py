@@ -0,0 +1,90 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .filters import sync_parameters
+from .importers import forget_feed_hashes
+from .models import Shop, Category, Product, Reservation
+from .reservations import release_deleted
+from . import search
+
+SCOPES = {
+    Shop: 'shops',
+    Category: 'categories',
+    Product: 'products',
+}
+
+
+@receiver([post_save, post_delete], sender=Shop)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog_cache(sender, **kwargs) -> None:
+    """
+    Invalidate cached catalog pages when a shop, category or product is saved.
+    """
+    bump_catalog_version(SCOPES[sender])
+
+
+@receiver(post_save, sender=Shop)
+def sync_shop_active(sender, instance: Shop, created: bool, **kwargs) -> None:
+    """
+    Copy Shop.state to its products so catalog reads need no join.
+    """
+    if not created:
+        instance.products.exclude(shop_active=instance.state).update(shop_active=instance.state)
+
+
+@receiver(pre_save, sender=Product)
+def copy_shop_active(sender, instance: Product, **kwargs) -> None:
+    """
+    Take shop_active from the product's shop, so products created in or moved
+    to a closed shop stay hidden.
+    """
+    if sender._meta.get_field('shop').is_cached(instance):
+        instance.shop_active = instance.shop.state
+    else:
+        instance.shop_active = Shop.objects.filter(pk=instance.shop_id).values_list('state', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance: Product, using: str, **kwargs) -> None:
+    """
+    Keep the search index and parameter rows in sync with products saved
+    outside the importer.
+    """
+    search.index_products([instance.pk], using=using)
+    sync_parameters([instance])
+
+
+@receiver([post_save, post_delete], sender=Product)
+def forget_shop_feed_hash(sender, instance: Product, **kwargs) -> None:
+    """
+    Let the next import of the shop's feed restore products edited by hand.
+    """
+    forget_feed_hashes([instance.shop_id])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance: Product, using: str, **kwargs) -> None:
+    search.unindex_products([instance.pk], using=using)
+
+
+@receiver(pre_delete, sender=Reservation)
+def release_reservation(sender, instance: Reservation, **kwargs) -> None:
+    """
+    Give back the stock of holds removed by a cascade or the admin.
+    """
+    release_deleted(instance)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance: Category, created: bool, using: str, **kwargs) -> None:
+    if not created:
+        search.index_categories([instance.pk], using=using)
+
+
+def create_search_index(sender, using: str = 'default', **kwargs) -> None:
+    """
+    Create the product search index after migrations (connected in apps.py).
+    """
+    search.create_search_index(using=using)
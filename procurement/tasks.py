@@ -0,0 +1,145 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import yaml
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .importers import ImportStats, PriceListImporter, PriceListError, hash_file
+from .models import ImportJob
+from .parsers import iter_price_list
+from .reservations import release_expired
+
+try:
+    from celery import shared_task
+except ImportError:
+    shared_task = None
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY = 'import-job:{}:progress'
+PROGRESS_TIMEOUT = 60 * 60
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _progress_key(job_id: int) -> str:
+    return PROGRESS_KEY.format(job_id)
+
+
+def get_progress(job_id: int) -> Optional[dict]:
+    """
+    Return live counters of a running job.
+
+    The import itself runs in a single transaction, so progress is published
+    through the cache where pollers on other connections can see it.
+    """
+    return cache.get(_progress_key(job_id))
+
+
+def run_import_job(job_id: int) -> None:
+    """
+    Execute an import job and store its outcome.
+    """
+    job = ImportJob.objects.select_related('shop', 'user').get(id=job_id)
+    job.status = ImportJob.STATUS_RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    def report(stats: ImportStats) -> None:
+        cache.set(_progress_key(job_id), {
+            'processed_rows': stats.processed,
+            'inserted': stats.inserted,
+            'updated': stats.updated,
+            'unchanged': stats.unchanged,
+            'rows_per_second': stats.rows_per_second,
+        }, PROGRESS_TIMEOUT)
+
+    importer = PriceListImporter(
+        shop=job.shop, owner=job.user, progress=report, deactivate_missing=job.deactivate_missing
+    )
+    try:
+        importer.feed_hash = hash_file(job.source)
+        with open(job.source, 'rb') as file:
+            importer.run_stream(iter_price_list(file))
+        job.status = ImportJob.STATUS_DONE
+    except yaml.YAMLError as e:
+        logger.error("YAML parsing error in import job %s: %s", job_id, e)
+        job.status = ImportJob.STATUS_FAILED
+        job.errors = ["Invalid YAML file format."]
+    except PriceListError as e:
+        job.status = ImportJob.STATUS_FAILED
+        job.errors = [str(e)]
+    except Exception as e:
+        logger.exception("Import job %s crashed", job_id)
+        job.status = ImportJob.STATUS_FAILED
+        job.errors = [f"Unexpected error: {e}"]
+    finally:
+        if job.delete_source and os.path.exists(job.source):
+            os.remove(job.source)
+
+    stats = importer.stats.finish()
+    if job.status == ImportJob.STATUS_DONE:
+        job.processed_rows = stats.processed
+        job.inserted = stats.inserted
+        job.updated = stats.updated
+        job.unchanged = stats.unchanged
+        job.deactivated = stats.deactivated
+        job.skipped = stats.skipped
+        job.rows_per_second = stats.rows_per_second
+        if job.shop is None:
+            job.shop = importer.shop
+    job.finished_at = timezone.now()
+    job.save()
+    cache.delete(_progress_key(job_id))
+    logger.info("Import job %s finished with status %s", job_id, job.status,
+                extra={'job_id': job_id, 'stats': stats.as_dict()})
+
+
+def _run_in_thread(job_id: int) -> None:
+    try:
+        run_import_job(job_id)
+    finally:
+        close_old_connections()
+
+
+if shared_task is not None:
+    run_import_job_task = shared_task(name='procurement.run_import_job')(run_import_job)
+    # Scheduled by CELERY_BEAT_SCHEDULE; without Celery run the release_expired_reservations command from cron
+    release_expired_reservations_task = shared_task(name='procurement.release_expired_reservations')(
+        release_expired
+    )
+else:
+    run_import_job_task = None
+    release_expired_reservations_task = None
+
+
+def enqueue_import_job(job: ImportJob) -> None:
+    """
+    Hand a job to the backend configured by IMPORT_JOBS_BACKEND.
+
+    'sync' runs the job in-process before returning, 'thread' uses a local
+    thread pool and 'celery' sends it to a Celery worker.
+    """
+    global _executor
+    backend = settings.IMPORT_JOBS_BACKEND
+
+    if backend == 'sync':
+        run_import_job(job.id)
+    elif backend == 'thread':
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMPORT_JOBS_WORKERS, thread_name_prefix='import-job'
+            )
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread, job.id))
+    elif backend == 'celery':
+        if run_import_job_task is None:
+            raise ImproperlyConfigured("IMPORT_JOBS_BACKEND is 'celery' but Celery is not installed.")
+        transaction.on_commit(lambda: run_import_job_task.delay(job.id))
+    else:
+        raise ImproperlyConfigured(f"Unknown IMPORT_JOBS_BACKEND '{backend}'.")
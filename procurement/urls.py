@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     UserRegisterView, EmailVerificationView, UserLoginView,
@@ -5,9 +6,16 @@ from .views import (
     ContactListView, ContactDetailView, ShopListView,
     CategoryListView, ProductListView, BasketView,
     OrderListView, PartnerUpdateView, PartnerStateView,
-    PartnerOrdersView, SupplierUploadPricelistView
+    PartnerOrdersView, SupplierUploadPricelistView, PartnerUpdateJobView,
+    ProductSearchView, ProductFacetsView, MetricsView
 )
 
+if settings.ASYNC_VIEWS:
+    from .async_views import (  # noqa: F811
+        AsyncShopListView as ShopListView, AsyncCategoryListView as CategoryListView,
+        AsyncProductListView as ProductListView, AsyncBasketView as BasketView,
+    )
+
 urlpatterns = [
     # User Endpoints
     path('user/register', UserRegisterView.as_view(), name='user-register'),
@@ -23,6 +31,8 @@ urlpatterns = [
     path('shops', ShopListView.as_view(), name='shop-list'),
     path('categories', CategoryListView.as_view(), name='category-list'),
     path('products', ProductListView.as_view(), name='product-list'),
+    path('products/search', ProductSearchView.as_view(), name='product-search'),
+    path('products/facets', ProductFacetsView.as_view(), name='product-facets'),
     path('api/v1/shop/<int:shop_id>/upload-pricelist/', SupplierUploadPricelistView.as_view(), name='upload-pricelist'),
 
     # Basket Endpoints
@@ -33,6 +43,10 @@ urlpatterns = [
 
     # Partner Endpoints
     path('partner/update', PartnerUpdateView.as_view(), name='partner-update'),
+    path('partner/update/<int:job_id>', PartnerUpdateJobView.as_view(), name='partner-update-job'),
     path('partner/state', PartnerStateView.as_view(), name='partner-state'),
     path('partner/orders', PartnerOrdersView.as_view(), name='partner-orders'),
+
+    # Monitoring
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,27 +1,50 @@
+import hashlib
 import logging
 import os
-from typing import Any
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Any, Optional, Tuple
 
-import yaml
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    BooleanField, Count, DecimalField, ExpressionWrapper, F, IntegerField, Max, OuterRef, Prefetch, Q, Subquery, Sum,
+)
 from django.db.models.query import QuerySet
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from rest_framework import generics, permissions
-from rest_framework import serializers
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .models import User, Contact, Shop, Category, Product, Basket, Order
+from .cache import STOCK_SCOPE, CachedListMixin, basket_scope, catalog_signature, catalog_versions
+from .checkout import place_order
+from .conditional import ConditionalGetMixin, conditional_get
+from .facets import facet_counts
+from .filters import catalog_products, filter_products, sort_products
+from .metrics import CONTENT_TYPE, render_metrics
+from .models import AVAILABLE, User, Contact, Shop, Category, Product, Basket, Order, OrderItem, ImportJob
+from .pagination import OptionalCursorPagination
+from .reservations import InsufficientStockError, by_key, hold, release
+from .routers import ReplicaReadMixin
+from .rows import ValuesListMixin
+from .search import search_products
 from .serializers import (
     UserRegisterSerializer, EmailVerificationSerializer,
     UserLoginSerializer, PasswordResetSerializer,
     PasswordResetConfirmSerializer, UserEditSerializer,
     ContactSerializer, ShopSerializer, CategorySerializer,
-    ProductSerializer, BasketSerializer, OrderSerializer
+    ProductSerializer, BasketSerializer, OrderSerializer,
+    PartnerOrderSerializer, ImportJobSerializer, expanded, query_list
 )
+from .tasks import enqueue_import_job
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +58,7 @@ class UserRegisterView(generics.CreateAPIView):
 
     def perform_create(self, serializer: UserRegisterSerializer) -> None:
         user = serializer.save()
-        logger.info(f"Verification token sent to {user.email}: {user.email_verification_token}")
+        logger.info("Verification token sent to %s: %s", user.email, user.email_verification_token)
 
 
 class EmailVerificationView(APIView):
@@ -53,7 +76,7 @@ class EmailVerificationView(APIView):
                     user.email_verified = True
                     user.email_verification_token = None
                     user.save()
-                    logger.info(f"User {email} verified their email.")
+                    logger.info("User %s verified their email.", email)
                     return Response({"message": "Email verified successfully."}, status=200)
                 return Response({"error": "Invalid token."}, status=400)
             except User.DoesNotExist:
@@ -79,7 +102,7 @@ class PasswordResetView(APIView):
             try:
                 user = User.objects.get(email=email)
                 token = user.reset_password_token()
-                logger.info(f"Password reset token for {email}: {token}")
+                logger.info("Password reset token for %s: %s", email, token)
                 return Response({"message": "Password reset email sent."}, status=200)
             except User.DoesNotExist:
                 return Response({"error": "User not found."}, status=404)
@@ -102,7 +125,7 @@ class PasswordResetConfirmView(APIView):
                     user.set_password(password)
                     user.password_reset_token = None
                     user.save()
-                    logger.info(f"User {email} successfully reset their password.")
+                    logger.info("User %s successfully reset their password.", email)
                     return Response({"message": "Password reset successfully."}, status=200)
                 return Response({"error": "Invalid token."}, status=400)
             except User.DoesNotExist:
@@ -147,102 +170,267 @@ class ContactDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_object(self) -> Contact:
         obj = super().get_object()
-        if obj.user != self.request.user:
+        if obj.user_id != self.request.user.id:
             raise PermissionDenied("You do not have permission to access this contact.")
         return obj
 
 
+# Relations that ?expand= may pull in with select_related
+PRODUCT_RELATIONS = {'category', 'shop'}
+BASKET_RELATIONS = {'product', 'product__category', 'product__shop'}
+ORDER_ITEM_RELATIONS = {'product', 'shop', 'product__category', 'product__shop'}
+# Whether a basket line's product can still be ordered (not delisted, shop open)
+BASKET_AVAILABLE = ExpressionWrapper(Q(product__is_active=True, product__shop_active=True), output_field=BooleanField())
+# Aggregate over a user's basket rows that the basket validators are computed from
+BASKET_STATE = {
+    'items': Count('id'),
+    'basket_changed': Max('updated_at'),
+    'product_changed': Max('product__updated_at'),
+    'shop_changed': Max('product__shop__updated_at'),
+    'category_changed': Max('product__category__updated_at'),
+}
+
+
+def _expanded_relations(request: Any, allowed: set, prefix: str = '') -> list:
+    """
+    Return the `allowed` relations requested with ?expand=, so only
+    expanded objects are joined.
+    """
+    return sorted(
+        name[len(prefix):] for name in expanded(request)
+        if name.startswith(prefix) and name[len(prefix):] in allowed
+    )
+
+
+def _prefetch_items(request: Any, orders: QuerySet, items: QuerySet) -> QuerySet:
+    """
+    Prefetch the order lines in `items`, unless ?fields= leaves them out.
+    """
+    fields = query_list(request, 'fields')
+    if fields and 'items' not in fields:
+        return orders
+    return orders.prefetch_related(Prefetch('items', queryset=items.select_related(
+        *_expanded_relations(request, ORDER_ITEM_RELATIONS, prefix='items__')
+    )))
+
+
 # Shop Views
-class ShopListView(ListAPIView):
+class ShopListView(ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, ValuesListMixin, ListAPIView):
     """
     View for listing active shops.
     """
+    cache_scopes = ('shops',)
     queryset = Shop.objects.filter(state=True)
     serializer_class = ShopSerializer
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, ValuesListMixin, generics.ListAPIView):
     """
     View for listing product categories.
     """
+    cache_scopes = ('categories',)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, ValuesListMixin, generics.ListAPIView):
     """
-    View for listing products with optional filtering by shop and category.
+    View for listing products of active shops with optional filtering by
+    shop, category, price, stock and parameters, sorted by `ordering`
+    (see procurement.filters). Rows are rendered from `.values()`
+    (see procurement.rows).
     """
+    cache_scopes = ('products', 'shops', 'categories', STOCK_SCOPE)
     serializer_class = ProductSerializer
+    values_expressions = {'available': AVAILABLE}
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self) -> QuerySet:
-        queryset = Product.objects.all()
-        shop_id = self.request.query_params.get('shop_id')
-        category_id = self.request.query_params.get('category_id')
-        if shop_id:
-            queryset = queryset.filter(shop_id=shop_id)
-        if category_id:
-            queryset = queryset.filter(category_id=category_id)
-        return queryset
+        queryset = catalog_products().select_related(*_expanded_relations(self.request, PRODUCT_RELATIONS))
+        queryset = filter_products(queryset, self.request.query_params)
+        return sort_products(queryset, self.request.query_params)
+
+
+class ProductSearchView(ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
+    """
+    View for full-text search over product name, model and category name.
+
+    Every word of `q` must match as a prefix; results are ranked with
+    bm25 (SQLite FTS5) or ts_rank (PostgreSQL). Accepts the same filters as
+    the product list.
+    """
+    cache_scopes = ('products', 'shops', 'categories', STOCK_SCOPE)
+    serializer_class = ProductSerializer
+
+    def get_queryset(self) -> QuerySet:
+        queryset = catalog_products().select_related(*_expanded_relations(self.request, PRODUCT_RELATIONS))
+        queryset = filter_products(queryset, self.request.query_params)
+        return search_products(queryset, self.request.query_params.get('q', ''))
+
+
+class FacetListMixin:
+    """
+    List handler answering with facet counts instead of a page of rows.
+    """
+    def list(self, request: Any, *args, **kwargs) -> Response:
+        return Response(facet_counts(self.get_queryset()))
+
+
+class ProductFacetsView(ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, FacetListMixin, generics.ListAPIView):
+    """
+    View for facet counts per category, shop, price bucket and common
+    parameter, for the same filters as the product list.
+    """
+    cache_scopes = ('products', 'shops', 'categories')
+
+    def get_queryset(self) -> QuerySet:
+        return filter_products(catalog_products(), self.request.query_params)
 
 
 # Basket Views
+def basket_scopes(user: User) -> tuple:
+    """
+    Cache scopes of a basket: its own version, bumped on every change to the
+    basket and its holds, and the reserved stock its products show.
+    """
+    return basket_scope(user.id), STOCK_SCOPE
+
+
+def basket_validators(request: Any, state: dict, versions: dict) -> Tuple[str, int]:
+    """
+    ETag and Last-Modified of a basket from its BASKET_STATE aggregate and
+    the versions of its basket_scopes. The ETag also covers the query string.
+    """
+    changes = [value for key, value in state.items() if key != 'items' and value is not None]
+    etag = hashlib.md5(
+        f"{request.user.id}:{state['items']}:{[value.isoformat() for value in changes]}:"
+        f"{catalog_signature(request, versions)}".encode('utf-8')
+    ).hexdigest()
+    return etag, max([int(value.timestamp()) for value in changes] + [max(versions.values()) // 10 ** 9])
+
+
 class BasketView(APIView):
     """
     View for managing the user's basket.
     """
     permission_classes = [IsAuthenticated]
+    vary_headers = ('Authorization',)
 
+    def get_validators(self, request: Any) -> Tuple[str, int]:
+        """
+        Validators from the basket size, the newest change to its rows and to
+        the products, shops and categories they embed, and the basket and
+        stock versions, which also move when rows are deleted or holds change.
+        """
+        state = Basket.objects.filter(user=request.user).aggregate(**BASKET_STATE)
+        return basket_validators(request, state, catalog_versions(basket_scopes(request.user)))
+
+    @conditional_get
     def get(self, request: Any) -> Response:
-        basket = Basket.objects.filter(user=request.user)
-        serializer = BasketSerializer(basket, many=True)
+        basket = (
+            Basket.objects.filter(user=request.user)
+            .select_related(*_expanded_relations(request, BASKET_RELATIONS))
+            .annotate(available=BASKET_AVAILABLE)
+            .order_by('id')
+        )
+        serializer = BasketSerializer(basket, many=True, context={'request': request})
         return Response(serializer.data)
 
     def post(self, request: Any) -> Response:
-        try:
-            product_id = request.data.get('product')
-            quantity = request.data.get('quantity')
+        """
+        Add one `{product, quantity}` item, or a list of them, to the basket.
 
-            if not product_id or not quantity:
+        Existing rows are incremented in the database with F() expressions and
+        missing ones are inserted in one batch, all inside one transaction
+        that also holds the stock for the new basket quantities.
+        """
+        items = request.data if isinstance(request.data, list) else [request.data]
+        wanted = {}
+        for item in items:
+            try:
+                product_id = int(item.get('product') or 0)
+                quantity = int(item.get('quantity') or 0)
+            except (AttributeError, TypeError, ValueError):
+                return Response({"error": "Product and quantity must be integers."}, status=400)
+            if not product_id or quantity <= 0:
                 return Response({"error": "Product and quantity are required."}, status=400)
+            wanted[product_id] = wanted.get(product_id, 0) + quantity
 
-            product = Product.objects.get(id=product_id)
-
-            if quantity > product.quantity:
-                return Response({"error": f"Not enough stock for product {product.id}"}, status=400)
+        found = set(Product.objects.filter(id__in=wanted, is_active=True, shop_active=True).values_list('id', flat=True))
+        for product_id in wanted:
+            if product_id not in found:
+                return Response({"error": f"Product with id {product_id} not found."}, status=404)
 
-            basket_item, created = Basket.objects.get_or_create(
-                user=request.user,
-                product=product,
-                defaults={'quantity': quantity}
-            )
-
-            if not created:
-                basket_item.quantity += quantity
-                basket_item.save()
+        try:
+            self.add_items(request.user, wanted)
+        except InsufficientStockError as e:
+            return Response({"error": str(e)}, status=400)
+        message = "Items added to basket." if isinstance(request.data, list) else "Item added to basket."
+        return Response({"message": message}, status=201)
 
-            return Response({"message": "Item added to basket."}, status=201)
+    def add_items(self, user: User, wanted: dict, attempts: int = 3) -> None:
+        """
+        Increment or insert basket rows for {product_id: quantity}.
 
-        except Product.DoesNotExist:
-            return Response({"error": f"Product with id {product_id} not found."}, status=404)
+        A row inserted concurrently by another request violates the
+        (user, product) unique constraint; the batch is then retried and
+        that row is incremented instead.
+        """
+        for attempt in range(attempts):
+            try:
+                with transaction.atomic():
+                    basket = Basket.objects.filter(user=user, product_id__in=wanted)
+                    existing = set(basket.values_list('product_id', flat=True))
+                    if existing:
+                        basket.update(
+                            quantity=F('quantity') + by_key('product_id', {key: wanted[key] for key in existing}),
+                            updated_at=timezone.now(),
+                        )
+                    Basket.objects.bulk_create([
+                        Basket(user=user, product_id=product_id, quantity=quantity)
+                        for product_id, quantity in wanted.items() if product_id not in existing
+                    ])
+                    hold(user, dict(basket.values_list('product_id', 'quantity')))
+                return
+            except IntegrityError:
+                if attempt == attempts - 1:
+                    raise
 
     def put(self, request: Any) -> Response:
         """
         Update basket items quantity.
+
+        All rows are loaded with their products in one query and validated
+        before anything is written, so a bad item leaves the basket untouched.
         """
         items = request.data.get('items', [])
-        for item in items:
-            try:
-                basket_item = Basket.objects.get(id=item['id'], user=request.user)
-                product = basket_item.product
-
-                if item['quantity'] > product.quantity:
-                    return Response({"error": f"Not enough stock for product {product.id}"}, status=400)
+        try:
+            quantities = {int(item['id']): int(item['quantity']) for item in items}
+        except (KeyError, TypeError, ValueError):
+            return Response({"error": "Each item requires an integer 'id' and 'quantity'."}, status=400)
+
+        rows = {
+            row.id: row
+            for row in Basket.objects.filter(id__in=quantities, user=request.user).select_related('product')
+        }
+        now = timezone.now()
+        for item_id, quantity in quantities.items():
+            basket_item = rows.get(item_id)
+            if basket_item is None:
+                return Response({"error": f"Basket item with id {item_id} not found."}, status=404)
+            if quantity <= 0:
+                return Response({"error": "Quantity must be greater than zero."}, status=400)
+            if quantity > basket_item.product.quantity:
+                return Response({"error": f"Not enough stock for product {basket_item.product.id}"}, status=400)
+            basket_item.quantity = quantity
+            basket_item.updated_at = now
 
-                basket_item.quantity = item['quantity']
-                basket_item.save()
-            except Basket.DoesNotExist:
-                return Response({"error": f"Basket item with id {item['id']} not found."}, status=404)
+        try:
+            with transaction.atomic():
+                Basket.objects.bulk_update(rows.values(), ['quantity', 'updated_at'])
+                hold(request.user, {row.product_id: row.quantity for row in rows.values()})
+        except InsufficientStockError as e:
+            return Response({"error": str(e)}, status=400)
 
         return Response({"message": "Basket updated successfully."}, status=200)
 
@@ -252,11 +440,14 @@ class BasketView(APIView):
         """
         item_ids = request.data.get('items', [])
         basket_items = Basket.objects.filter(id__in=item_ids, user=request.user)
+        product_ids = list(basket_items.values_list('product_id', flat=True))
 
-        if not basket_items.exists():
+        if not product_ids:
             return Response({"error": "Basket items not found."}, status=400)
 
-        basket_items.delete()
+        with transaction.atomic():
+            release(request.user, product_ids)
+            basket_items.delete()
         return Response({"message": "Items removed from basket."}, status=200)
 
 
@@ -267,35 +458,42 @@ class OrderListView(generics.ListCreateAPIView):
     """
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self) -> QuerySet:
-        return Order.objects.filter(user=self.request.user)
+        return _prefetch_items(self.request, Order.objects.filter(user=self.request.user), OrderItem.objects.all())
 
     def perform_create(self, serializer: OrderSerializer) -> None:
         """
-        Create an order and clear the basket after reducing stock.
+        Create an order, reduce stock and clear the basket atomically.
         """
-        order = serializer.save(user=self.request.user)
-        basket_items = Basket.objects.filter(user=self.request.user)
+        serializer.instance = place_order(self.request.user, serializer.validated_data['contact'])
 
-        if not basket_items.exists():
-            raise serializers.ValidationError({"error": "Basket is empty, cannot create an order."})
 
-        for basket_item in basket_items:
-            product = basket_item.product
-            if basket_item.quantity > product.quantity:
-                raise serializers.ValidationError({"error": f"Not enough stock for product {product.name}."})
+# Partner Views
+def _flag(value: Any) -> bool:
+    """
+    Interpret a boolean option sent as JSON or form data.
+    """
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
 
-            product.quantity -= basket_item.quantity
-            product.save()
 
-        basket_items.delete()
+def _accepted(job: ImportJob) -> Response:
+    """
+    Respond to an import request that was handed to a background worker.
+    """
+    job.refresh_from_db()
+    return Response({
+        "message": "Price list import started.",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": reverse('partner-update-job', args=[job.id]),
+    }, status=202)
 
 
-# Partner Views
 class PartnerUpdateView(APIView):
     """
-    View for updating the partner's price list.
+    View for updating the partner's price list in a background import job.
     """
     permission_classes = [IsAuthenticated]
 
@@ -308,44 +506,23 @@ class PartnerUpdateView(APIView):
         if not os.path.exists(file_path):
             return Response({"error": "File not found."}, status=404)
 
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = yaml.safe_load(file)
-        except yaml.YAMLError as e:
-            logger.error(f"YAML parsing error: {e}")
-            return Response({"error": "Invalid YAML file format."}, status=400)
-
-        shop_name = data['shop']
-        categories = data['categories']
-        products = data['goods']
+        job = ImportJob.objects.create(
+            user=request.user, source=file_path, deactivate_missing=_flag(request.data.get('deactivate_missing'))
+        )
+        enqueue_import_job(job)
+        return _accepted(job)
 
-        shop, _ = Shop.objects.update_or_create(name=shop_name)
 
-        for category in categories:
-            Category.objects.update_or_create(
-                id=category['id'], defaults={"name": category['name']}
-            )
+class PartnerUpdateJobView(generics.RetrieveAPIView):
+    """
+    View for polling the status of a price-list import job.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ImportJobSerializer
+    lookup_url_kwarg = 'job_id'
 
-        for product in products:
-            try:
-                category = Category.objects.get(id=product['category'])
-                Product.objects.update_or_create(
-                    id=product['id'],
-                    defaults={
-                        "category": category,
-                        "shop": shop,
-                        "model": product['model'],
-                        "name": product['name'],
-                        "price": product['price'],
-                        "price_rrc": product['price_rrc'],
-                        "quantity": product['quantity'],
-                        "parameters": product.get('parameters', {}),
-                    },
-                )
-            except Category.DoesNotExist:
-                return Response({"error": f"Category with id {product['category']} not found."}, status=404)
-
-        return Response({"message": "Partner's price list updated successfully."}, status=200)
+    def get_queryset(self) -> QuerySet:
+        return ImportJob.objects.filter(user=self.request.user)
 
 
 class PartnerStateView(APIView):
@@ -354,11 +531,21 @@ class PartnerStateView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    def get_shop(self, request: Any) -> Optional[Shop]:
+        """
+        Return the caller's shop, optionally selected with `shop_id`.
+        """
+        shops = request.user.shops.all()
+        shop_id = request.query_params.get('shop_id') or request.data.get('shop_id')
+        if shop_id:
+            shops = shops.filter(id=shop_id)
+        return shops.first()
+
     def get(self, request: Any) -> Response:
         """
         Retrieve the partner's current state.
         """
-        shop = Shop.objects.first()
+        shop = self.get_shop(request)
         if not shop:
             return Response({"error": "No shop found."}, status=404)
         return Response({"name": shop.name, "state": shop.state})
@@ -371,7 +558,7 @@ class PartnerStateView(APIView):
         if state not in ['on', 'off']:
             return Response({"error": "Invalid state. Use 'on' or 'off'."}, status=400)
 
-        shop = Shop.objects.first()
+        shop = self.get_shop(request)
         if not shop:
             return Response({"error": "No shop found."}, status=404)
 
@@ -380,20 +567,61 @@ class PartnerStateView(APIView):
         return Response({"message": "Partner state updated successfully."}, status=200)
 
 
-class PartnerOrdersView(generics.ListAPIView):
+def _day_start(value: Optional[str], name: str, days: int = 0) -> Optional[datetime]:
+    """
+    Parse a YYYY-MM-DD query parameter into the start of that day (plus `days`).
+    """
+    if not value:
+        return None
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({"error": f"Invalid {name} '{value}', expected YYYY-MM-DD."})
+    return timezone.make_aware(datetime.combine(day + timedelta(days=days), time.min))
+
+
+class PartnerOrdersView(ReplicaReadMixin, generics.ListAPIView):
     """
-    View for listing partner's related orders.
+    View for listing orders that contain the partner's products.
+
+    Order lines carry the shop and the order date, so the orders are found
+    through the (shop, created_at) index on OrderItem. Supports `status`,
+    `date_from` and `date_to` (inclusive, YYYY-MM-DD) filters. Items and
+    totals only cover the partner's own lines.
     """
     permission_classes = [IsAuthenticated]
-    serializer_class = OrderSerializer
+    serializer_class = PartnerOrderSerializer
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self) -> QuerySet:
-        return Order.objects.filter(contact__isnull=False)
+        params = self.request.query_params
+        own_shops = Shop.objects.filter(owner=self.request.user).values('id')
+        lines = OrderItem.objects.filter(shop__in=own_shops)
+        date_from = _day_start(params.get('date_from'), 'date_from')
+        if date_from:
+            lines = lines.filter(created_at__gte=date_from)
+        date_to = _day_start(params.get('date_to'), 'date_to', days=1)
+        if date_to:
+            lines = lines.filter(created_at__lt=date_to)
+
+        own_lines = OrderItem.objects.filter(order=OuterRef('pk'), shop__in=own_shops).values('order')
+        queryset = Order.objects.filter(id__in=lines.values('order_id')).annotate(
+            shop_total_sum=Subquery(own_lines.annotate(
+                total=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+            ).values('total')),
+            shop_item_count=Subquery(own_lines.annotate(count=Sum('quantity')).values('count'),
+                                     output_field=IntegerField()),
+        )
+        queryset = _prefetch_items(self.request, queryset, OrderItem.objects.filter(shop__in=own_shops))
+        status = params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
 
 
 class SupplierUploadPricelistView(APIView):
     """
-    View for uploading supplier price lists.
+    View for uploading supplier price lists to a background import job.
     """
     permission_classes = [IsAuthenticated]
 
@@ -402,40 +630,35 @@ class SupplierUploadPricelistView(APIView):
             shop = Shop.objects.get(id=shop_id)
         except Shop.DoesNotExist:
             return Response({"error": f"Shop with id {shop_id} not found."}, status=404)
+        if shop.owner_id != request.user.id:
+            return Response({"error": "You are not the owner of this shop."}, status=403)
 
         if 'file' not in request.FILES:
             return Response({"error": "No file provided."}, status=400)
 
         uploaded_file = request.FILES['file']
+        file_name = default_storage.save(f"imports/{uuid.uuid4().hex}.yaml", uploaded_file)
 
-        try:
-            pricelist_data = yaml.safe_load(uploaded_file)
-        except yaml.YAMLError as e:
-            logger.error(f"Error parsing YAML: {e}")
-            return Response({"error": "Invalid YAML file format."}, status=400)
+        job = ImportJob.objects.create(
+            user=request.user, shop=shop, source=default_storage.path(file_name), delete_source=True,
+            deactivate_missing=_flag(request.data.get('deactivate_missing')),
+        )
+        enqueue_import_job(job)
+        return _accepted(job)
 
-        for item in pricelist_data:
-            try:
-                category_id = item.get('category')
-                if not category_id:
-                    return Response({"error": "Missing category ID in price list."}, status=400)
-
-                category = Category.objects.get(id=category_id)
-                Product.objects.update_or_create(
-                    id=item.get('id'),
-                    defaults={
-                        'category': category,
-                        'shop': shop,
-                        'name': item.get('name'),
-                        'model': item.get('model', ''),
-                        'price': item.get('price'),
-                        'price_rrc': item.get('price_rrc'),
-                        'quantity': item.get('quantity'),
-                        'parameters': item.get('parameters', {})
-                    }
-                )
-            except Category.DoesNotExist:
-                return Response({"error": f"Category with id {category_id} not found."}, status=404)
-
-        return Response({"message": "Price list uploaded successfully."}, status=200)
 
+class MetricsView(APIView):
+    """
+    Request metrics in the Prometheus text format, for scraping.
+
+    Requires ``Authorization: Bearer <METRICS_TOKEN>`` when METRICS_TOKEN is set.
+    """
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request: Any) -> HttpResponse:
+        if settings.METRICS_TOKEN and not constant_time_compare(
+            request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'
+        ):
+            return Response({"error": "Invalid metrics token."}, status=403)
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
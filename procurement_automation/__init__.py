@@ -0,0 +1,6 @@
+try:
+    from .celery import app as celery_app
+except ImportError:  # Celery is only needed with IMPORT_JOBS_BACKEND=celery
+    celery_app = None
+
+__all__ = ('celery_app',)
@@ -0,0 +1,17 @@
+"""
+Celery application for IMPORT_JOBS_BACKEND=celery.
+
+Runs price-list import jobs and, with beat, the expired reservation sweeper:
+
+    celery -A procurement_automation worker
+    celery -A procurement_automation beat
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'procurement_automation.settings')
+
+app = Celery('procurement_automation')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,111 @@
+"""
+Logging helpers referenced from settings.LOGGING.
+
+Records are put on an in-memory queue by the request thread and written by
+a single background QueueListener thread, so formatting and disk I/O stay
+off the request path.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import Full, Queue
+from typing import List, Optional
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line with the standard fields, `extra=` values and
+    the formatted traceback, if any.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    QueueHandler feeding the handlers of the `targets` logger from a
+    background thread.
+
+    The targets logger only holds the destination handlers, so dictConfig
+    builds and attaches them by name. The listener thread is started on the
+    first record of each process: workers forked after settings were loaded
+    (e.g. gunicorn --preload) start their own instead of filling a queue
+    nobody reads. Records are queued as they are, so messages are only
+    formatted by the listener. The queue is bounded; when the writer falls
+    behind, records are dropped and counted in `dropped` instead of
+    blocking requests.
+    """
+    def __init__(self, targets: str, queue_size: int = 10000) -> None:
+        super().__init__(Queue(queue_size))
+        self.targets = targets
+        self.dropped = 0
+        self.listener: Optional[QueueListener] = None
+        self.start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forked)
+        atexit.register(self.close)
+
+    def target_handlers(self) -> List[logging.Handler]:
+        return logging.getLogger(self.targets).handlers
+
+    def _forked(self) -> None:
+        # The listener thread does not survive a fork; start afresh in the child
+        self.queue = Queue(self.queue.maxsize)
+        self.listener = None
+        self.start_lock = threading.Lock()
+
+    def _start_listener(self) -> None:
+        with self.start_lock:
+            if self.listener is None:
+                listener = QueueListener(self.queue, *self.target_handlers(), respect_handler_level=True)
+                listener.start()
+                self.listener = listener
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.listener is None:
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """
+        Wait until every queued record has been handed to the targets.
+        """
+        with self.start_lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener.start()
+
+    def close(self) -> None:
+        with self.start_lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+        super().close()
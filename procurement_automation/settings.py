@@ -13,6 +13,8 @@ from dotenv import load_dotenv
 import os
 from pathlib import Path
 
+from .database import database_config
+
 # Load environment variables from .env
 load_dotenv()
 
@@ -40,7 +42,7 @@ APPEND_SLASH = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'procurement.authentication.JWTAuthentication',
     ],
 
     'DEFAULT_RENDERER_CLASSES': [
@@ -79,17 +81,22 @@ SPECTACULAR_SETTINGS = {
 
 
 MIDDLEWARE = [
+    'procurement.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'procurement.routers.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'procurement_automation.urls'
 
+# Serve the catalog lists and the basket with native async views (run under ASGI)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() == 'true'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -111,13 +118,45 @@ WSGI_APPLICATION = 'procurement_automation.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DATABASE_URL selects SQLite or PostgreSQL; see procurement_automation/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3'), BASE_DIR),
 }
 
+# Read replicas (comma-separated URLs) serving catalog and partner reporting reads;
+# tests read them through the primary
+DATABASE_REPLICAS = []
+for number, url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica_{number}'] = {**database_config(url.strip(), BASE_DIR), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{number}')
+DATABASE_ROUTERS = ['procurement.routers.ReplicaRouter']
+# round_robin or least_loaded
+REPLICA_SELECTION = os.getenv('REPLICA_SELECTION', 'round_robin')
+# Seconds a user's reads stay on the primary after a write
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+# Cache: Redis when REDIS_URL is set, in-process memory otherwise
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '300'))
+# Seconds product availability in cached lists may lag behind basket holds
+CATALOG_STOCK_TIMEOUT = int(os.getenv('CATALOG_STOCK_TIMEOUT', '10'))
+
+# Seconds a basket line holds its stock before the sweeper releases it
+RESERVATION_TTL = int(os.getenv('RESERVATION_TTL', '900'))
+
 # Email settings
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', '587'))
@@ -125,6 +164,21 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() == 'true'
 
+# Price-list import jobs: 'thread' (in-process pool), 'celery' or 'sync' (inline, for tests)
+IMPORT_JOBS_BACKEND = os.getenv('IMPORT_JOBS_BACKEND', 'thread')
+IMPORT_JOBS_WORKERS = int(os.getenv('IMPORT_JOBS_WORKERS', '2'))
+
+# Celery (procurement_automation/celery.py): the broker defaults to REDIS_URL; beat runs
+# the reservation sweeper every RESERVATION_SWEEP_SECONDS
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL') or REDIS_URL or 'redis://127.0.0.1:6379/0'
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_BEAT_SCHEDULE = {
+    'release-expired-reservations': {
+        'task': 'procurement.release_expired_reservations',
+        'schedule': int(os.getenv('RESERVATION_SWEEP_SECONDS', '60')),
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -167,36 +221,72 @@ STATIC_URL = '/static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Logging: records are queued on the request thread and written by a background
+# listener as JSON lines to a size-rotated file (and to the console in DEBUG)
+LOG_LEVEL = os.getenv('LOG_LEVEL') or ('DEBUG' if DEBUG else 'INFO')
+# DEBUG logs every SQL query, and only has an effect with DEBUG=True
+DJANGO_LOG_LEVEL = os.getenv('DJANGO_LOG_LEVEL') or 'INFO'
+LOG_FILE = os.getenv('LOG_FILE') or os.path.join(BASE_DIR, 'app.log')
+LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_FILE_BACKUP_COUNT = int(os.getenv('LOG_FILE_BACKUP_COUNT', '5'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
+        'json': {
+            '()': 'procurement_automation.log.JSONFormatter',
+        },
         'verbose': {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
-        },
     },
     'handlers': {
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(BASE_DIR, 'debug.log'),
+        'console': {
+            'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': LOG_FILE,
+            'maxBytes': LOG_FILE_MAX_BYTES,
+            'backupCount': LOG_FILE_BACKUP_COUNT,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
+        },
+        'queue': {
+            '()': 'procurement_automation.log.QueueListenerHandler',
+            'targets': 'procurement_automation.log.targets',
+        },
     },
     'loggers': {
+        # Holds the handlers the queue listener writes to; not logged to directly
+        'procurement_automation.log.targets': {
+            'handlers': ['file', 'console'] if DEBUG else ['file'],
+            'propagate': False,
+        },
         'django': {
-            'handlers': ['file'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'handlers': ['queue'],
+            'level': DJANGO_LOG_LEVEL,
+            'propagate': False,
+        },
+        'procurement': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
         },
     },
 }
 
+# Request metrics served at /api/v1/metrics. With several worker processes, point
+# METRICS_DIR at a directory shared by them (emptied on deploy) to aggregate all workers
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+# Bearer token required to read the metrics; open when empty
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 BATON = {
     'SITE_NAME': 'Procurement Admin',  # Name of the site
     'USER_ICON': 'fa fa-user',  # Icon of the user
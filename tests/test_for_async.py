@@ -0,0 +1,147 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import include, path, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from procurement.async_views import AsyncBasketView, AsyncCategoryListView, AsyncProductListView, AsyncShopListView
+from procurement.models import User, Shop, Category, Product, Basket
+
+# The async views under the paths and names of the sync ones
+urlpatterns = [
+    path('api/v1/', include([
+        path('shops', AsyncShopListView.as_view(), name='shop-list'),
+        path('categories', AsyncCategoryListView.as_view(), name='category-list'),
+        path('products', AsyncProductListView.as_view(), name='product-list'),
+        path('basket', AsyncBasketView.as_view(), name='basket'),
+    ])),
+]
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def catalog():
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    products = [
+        Product.objects.create(
+            id=number, shop=shop, category=category, name=f"Product {number}", price=100 + number,
+            price_rrc=150, quantity=number, parameters={"color": "red"},
+        )
+        for number in range(1, 13)
+    ]
+    return shop, category, products
+
+
+def async_get(url, token=None, etag=None):
+    """
+    Request `url` from the async views through the ASGI request handler.
+    """
+    headers = {}
+    if etag is not None:
+        headers['if-none-match'] = etag
+    if token is not None:
+        headers['authorization'] = f'Bearer {token}'
+    return async_to_sync(AsyncClient().get)(url, headers=headers)
+
+
+def sync_then_async(settings, api_client, name, query=''):
+    """
+    GET the `name` endpoint from the sync views, then uncached from their
+    async variants.
+    """
+    sync_response = api_client.get(reverse(name) + query)
+    cache.clear()
+    settings.ROOT_URLCONF = __name__
+    return sync_response, async_get(reverse(name) + query)
+
+
+# Test the async views are served by coroutines
+def test_async_views_are_async():
+    for view in (AsyncShopListView, AsyncCategoryListView, AsyncProductListView, AsyncBasketView):
+        assert view.view_is_async
+
+
+# Test the async catalog lists answer exactly like the sync views
+@pytest.mark.django_db
+@pytest.mark.parametrize('name, query', [
+    ('shop-list', ''), ('category-list', ''), ('product-list', ''), ('product-list', '?page=2'),
+    ('product-list', '?page_size=5&ordering=-price'), ('product-list', '?expand=shop,category'),
+    ('product-list', '?fields=id,name'), ('product-list', '?cursor=&page_size=5'),
+])
+def test_async_catalog_matches_sync(settings, api_client, catalog, name, query):
+    sync_response, async_response = sync_then_async(settings, api_client, name, query)
+
+    assert async_response.status_code == sync_response.status_code == 200
+    assert async_response.json() == sync_response.json()
+    assert async_response.has_header('ETag')
+
+
+# Test an unknown page is a 404 on the async path too
+@pytest.mark.django_db
+def test_async_catalog_invalid_page(settings, api_client, catalog):
+    sync_response, async_response = sync_then_async(settings, api_client, 'product-list', '?page=9')
+
+    assert async_response.status_code == sync_response.status_code == 404
+
+
+# Test the async catalog lists answer 304 to a matching ETag
+@pytest.mark.django_db
+def test_async_catalog_not_modified(settings, catalog):
+    settings.ROOT_URLCONF = __name__
+    etag = async_get(reverse('product-list'))['ETag']
+
+    response = async_get(reverse('product-list'), etag=etag)
+
+    assert response.status_code == 304
+
+
+# Test the async basket authenticates the JWT and lists the user's items
+@pytest.mark.django_db
+def test_async_basket(settings, api_client, catalog):
+    _, _, products = catalog
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    Basket.objects.create(user=user, product=products[0], quantity=2)
+    Basket.objects.create(user=user, product=products[1], quantity=1)
+    api_client.force_authenticate(user=user)
+    sync_response = api_client.get(reverse('basket') + '?expand=product')
+    settings.ROOT_URLCONF = __name__
+    token = AccessToken.for_user(user)
+
+    response = async_get(reverse('basket') + '?expand=product', token)
+
+    assert response.status_code == 200
+    assert response.json() == sync_response.json()
+    assert [item['product']['id'] for item in response.json()] == [products[0].id, products[1].id]
+    assert async_get(reverse('basket') + '?expand=product', token, etag=response['ETag']).status_code == 304
+
+
+# Test the async basket rejects missing and invalid tokens
+@pytest.mark.django_db
+def test_async_basket_requires_authentication(settings):
+    settings.ROOT_URLCONF = __name__
+
+    assert async_get(reverse('basket')).status_code == 401
+    assert async_get(reverse('basket'), 'not-a-token').status_code == 401
+
+
+# Test basket changes through the async view run the sync handlers
+@pytest.mark.django_db
+def test_async_basket_post(settings, catalog):
+    _, _, products = catalog
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    settings.ROOT_URLCONF = __name__
+    token = AccessToken.for_user(user)
+
+    response = async_to_sync(AsyncClient().post)(
+        reverse('basket'), {"product": products[2].id, "quantity": 2}, content_type='application/json',
+        headers={'authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == 201
+    assert Basket.objects.get(user=user, product=products[2]).quantity == 2
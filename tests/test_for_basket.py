@@ -1,7 +1,14 @@
+import io
+from datetime import timedelta
+
 import pytest
 from rest_framework.test import APIClient
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.urls import reverse
-from procurement.models import User, Shop, Category, Product, Basket
+from django.utils import timezone
+from procurement.models import User, Shop, Category, Product, Basket, Reservation
+from procurement.reservations import hold
 
 
 @pytest.fixture
@@ -127,7 +134,7 @@ def test_get_basket_content(api_client):
 
     Basket.objects.create(user=user, product=product, quantity=3)
 
-    response = api_client.get(reverse('basket'))
+    response = api_client.get(reverse('basket'), {'expand': 'product'})
 
     print("Response status:", response.status_code)
     print("Response data:", response.data)
@@ -175,3 +182,226 @@ def test_delete_nonexistent_basket_item(api_client):
     assert response.status_code == 400
     assert "Basket items not found" in response.data['error']
 
+
+
+@pytest.fixture
+def products():
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    return [
+        Product.objects.create(id=i, shop=shop, category=category, name=f"Product {i}", price=100, price_rrc=120,
+                               quantity=10)
+        for i in (1, 2, 3)
+    ]
+
+
+# Test adding a list of items increments existing rows and inserts the rest in a bounded number of queries
+@pytest.mark.django_db
+def test_add_to_basket_bulk(api_client, products, django_assert_max_num_queries):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    Basket.objects.create(user=user, product=products[0], quantity=1)
+
+    data = [{"product": 1, "quantity": 2}, {"product": 2, "quantity": 3}, {"product": 3, "quantity": 1},
+            {"product": 3, "quantity": 1}]
+    # Basket writes plus the matching stock holds
+    with django_assert_max_num_queries(10):
+        response = api_client.post(reverse('basket'), data, format='json')
+
+    assert response.status_code == 201
+    assert dict(Basket.objects.filter(user=user).values_list('product_id', 'quantity')) == {1: 3, 2: 3, 3: 2}
+
+
+# Test one bad item in a bulk add leaves the basket untouched
+@pytest.mark.django_db
+def test_add_to_basket_bulk_is_all_or_nothing(api_client, products):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post(reverse('basket'), [{"product": 1, "quantity": 2}, {"product": 999, "quantity": 1}],
+                               format='json')
+
+    assert response.status_code == 404
+    assert not Basket.objects.exists()
+
+
+# Test updating several items validates all of them before writing
+@pytest.mark.django_db
+def test_update_basket_is_all_or_nothing(api_client, products, django_assert_max_num_queries):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    first = Basket.objects.create(user=user, product=products[0], quantity=1)
+    second = Basket.objects.create(user=user, product=products[1], quantity=1)
+
+    response = api_client.put(reverse('basket'), {"items": [
+        {"id": first.id, "quantity": 4}, {"id": second.id, "quantity": 50},
+    ]}, format='json')
+
+    assert response.status_code == 400
+    first.refresh_from_db()
+    assert first.quantity == 1
+
+    with django_assert_max_num_queries(7):
+        response = api_client.put(reverse('basket'), {"items": [
+            {"id": first.id, "quantity": 4}, {"id": second.id, "quantity": 5},
+        ]}, format='json')
+
+    assert response.status_code == 200
+    assert dict(Basket.objects.values_list('id', 'quantity')) == {first.id: 4, second.id: 5}
+
+
+# Test the same product cannot appear twice in a user's basket
+@pytest.mark.django_db
+def test_basket_rows_are_unique_per_product(products):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    Basket.objects.create(user=user, product=products[0], quantity=1)
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Basket.objects.create(user=user, product=products[0], quantity=1)
+
+
+# Test a conflicting insert from a concurrent request is retried as an increment
+@pytest.mark.django_db(transaction=True)
+def test_add_to_basket_retries_on_conflict(api_client, products, monkeypatch):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    Basket.objects.create(user=user, product=products[1], quantity=1)
+    # Committed by another request after our first attempt read the basket
+    Basket.objects.create(user=user, product=products[0], quantity=5)
+    basket_filter = Basket.objects.filter
+    attempts = []
+
+    def stale_filter(*args, **kwargs):
+        attempts.append(kwargs)
+        queryset = basket_filter(*args, **kwargs)
+        # The first attempt does not see the concurrent row yet, so it tries to insert it
+        return queryset.exclude(product=products[0]) if len(attempts) == 1 else queryset
+
+    monkeypatch.setattr(Basket.objects, 'filter', stale_filter)
+    response = api_client.post(reverse('basket'), [{"product": 1, "quantity": 2}, {"product": 2, "quantity": 1}],
+                               format='json')
+    monkeypatch.undo()
+
+    assert response.status_code == 201
+    assert len(attempts) == 2
+    # The failed attempt is rolled back as a whole, so nothing is incremented twice
+    assert dict(Basket.objects.filter(user=user).values_list('product_id', 'quantity')) == {1: 7, 2: 2}
+
+
+# Test the merge command collapses duplicate rows left from before the constraint
+@pytest.mark.django_db(transaction=True)
+def test_merge_basket_duplicates_command(products, monkeypatch):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    constraint = Basket._meta.constraints[0]
+    # SQLite rebuilds the table from the model state, so drop the constraint there too
+    monkeypatch.setattr(Basket._meta, 'constraints', [])
+    with connection.schema_editor() as editor:
+        editor.remove_constraint(Basket, constraint)
+    try:
+        for quantity in (1, 2, 3):
+            Basket.objects.create(user=user, product=products[0], quantity=quantity)
+        Basket.objects.create(user=user, product=products[1], quantity=4)
+
+        call_command('merge_basket_duplicates', batch_size=1, stdout=io.StringIO())
+
+        assert sorted(Basket.objects.values_list('product_id', 'quantity')) == [(1, 6), (2, 4)]
+    finally:
+        Basket.objects.all().delete()
+        monkeypatch.undo()
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Basket, constraint)
+
+
+# Test basket items hold stock so other users cannot add it
+@pytest.mark.django_db
+def test_basket_holds_stock(api_client, products):
+    first = User.objects.create_user(email="first@example.com", password="password123")
+    second = User.objects.create_user(email="second@example.com", password="password123")
+
+    api_client.force_authenticate(user=first)
+    assert api_client.post(reverse('basket'), {"product": 1, "quantity": 8}, format='json').status_code == 201
+    api_client.force_authenticate(user=second)
+    response = api_client.post(reverse('basket'), {"product": 1, "quantity": 3}, format='json')
+
+    assert response.status_code == 400
+    assert "Not enough stock for product 1" in response.data['error']
+    product = Product.objects.get(id=1)
+    assert (product.reserved, product.available) == (8, 2)
+
+    # Lowering and removing the basket line gives the stock back
+    api_client.force_authenticate(user=first)
+    item = Basket.objects.get(user=first)
+    api_client.put(reverse('basket'), {"items": [{"id": item.id, "quantity": 5}]}, format='json')
+    assert Product.objects.get(id=1).reserved == 5
+    api_client.delete(reverse('basket'), data={"items": [item.id]}, format='json')
+    assert Product.objects.get(id=1).reserved == 0
+    assert not Reservation.objects.exists()
+
+
+# Test the sweeper releases expired holds in bulk
+@pytest.mark.django_db
+def test_release_expired_reservations(products):
+    users = [User.objects.create_user(email=f"user{i}@example.com", password="password123") for i in range(3)]
+    with transaction.atomic():
+        for user in users:
+            hold(user, {1: 2, 2: 1})
+    Reservation.objects.filter(user=users[0]).update(expires_at=timezone.now() - timedelta(seconds=1))
+    Reservation.objects.filter(user=users[1], product_id=1).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    out = io.StringIO()
+    call_command('release_expired_reservations', batch_size=1, stdout=out)
+
+    assert "Released 3 expired reservations." in out.getvalue()
+    assert dict(Product.objects.filter(id__in=[1, 2]).values_list('id', 'reserved')) == {1: 2, 2: 2}
+    assert Reservation.objects.count() == 3
+
+
+# Test deleting a user or a hold outside the basket gives the stock back
+@pytest.mark.django_db
+def test_deleted_reservations_release_stock(products):
+    buyer = User.objects.create_user(email="buyer@example.com", password="password123")
+    other = User.objects.create_user(email="other@example.com", password="password123")
+    with transaction.atomic():
+        hold(buyer, {1: 2, 2: 1})
+        hold(other, {1: 3})
+
+    buyer.delete()
+    assert dict(Product.objects.filter(id__in=[1, 2]).values_list('id', 'reserved')) == {1: 3, 2: 0}
+
+    Reservation.objects.filter(user=other).delete()
+    assert Product.objects.get(id=1).reserved == 0
+
+
+# Test basket rows keep the product ID unless it is expanded
+@pytest.mark.django_db
+def test_basket_fields_and_expand(api_client):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    product = Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=100,
+                                     price_rrc=120, quantity=10)
+    Basket.objects.create(user=user, product=product, quantity=3)
+
+    assert api_client.get(reverse('basket'), {"fields": "product,quantity"}).data == [
+        {'product': 1, 'quantity': 3}
+    ]
+    response = api_client.get(reverse('basket'), {"expand": "product.category"})
+    assert response.data[0]['product']['category']['name'] == "Category 1"
+
+
+# Test basket lines of delisted products and closed shops are flagged and cannot be added
+@pytest.mark.django_db
+def test_basket_flags_unavailable_products(api_client, products):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    for product in products:
+        Basket.objects.create(user=user, product=product, quantity=1)
+    Product.objects.filter(id=products[1].id).update(is_active=False)
+    Product.objects.filter(id=products[2].id).update(shop_active=False)
+
+    response = api_client.get(reverse('basket'))
+
+    assert [item['available'] for item in response.data] == [True, False, False]
+    response = api_client.post(reverse('basket'), {"product": products[2].id, "quantity": 1}, format='json')
+    assert response.status_code == 404
@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.admin.sites import AdminSite
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from procurement.admin import ShopAdmin, deactivate_shops
+from procurement.importers import PriceListImporter
+from procurement.models import User, Shop, Category, Product, Basket, Reservation
+from procurement.reservations import release_expired
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def catalog():
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=100, price_rrc=120,
+                           quantity=10)
+    return shop
+
+
+# Test repeated catalog reads are served from the cache
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ['shop-list', 'category-list', 'product-list'])
+def test_catalog_is_cached(api_client, catalog, name):
+    first = api_client.get(reverse(name))
+
+    with CaptureQueriesContext(connection) as queries:
+        second = api_client.get(reverse(name))
+
+    assert len(queries) == 0
+    assert second.data == first.data
+
+
+# Test query parameters are part of the cache key
+@pytest.mark.django_db
+def test_cache_key_includes_query_params(api_client, catalog):
+    api_client.get(reverse('product-list'))
+
+    response = api_client.get(reverse('product-list') + "?shop_id=999")
+
+    assert response.data['count'] == 0
+
+
+# Test an import invalidates cached product pages
+@pytest.mark.django_db
+def test_import_invalidates_products(api_client, catalog, django_capture_on_commit_callbacks):
+    api_client.get(reverse('product-list'))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        PriceListImporter(shop=catalog).run(goods=[
+            {"id": 1, "category": 1, "name": "Renamed", "price": 100, "price_rrc": 120, "quantity": 10},
+        ])
+
+    response = api_client.get(reverse('product-list'))
+    assert response.data['results'][0]['name'] == "Renamed"
+
+
+# Test toggling the partner state invalidates shops and hides their products
+@pytest.mark.django_db
+def test_partner_state_invalidates_shops(api_client, catalog, django_capture_on_commit_callbacks):
+    user = User.objects.create_user(email="partner@example.com", password="password123")
+    Shop.objects.filter(pk=catalog.pk).update(owner=user)
+    assert api_client.get(reverse('shop-list')).data['count'] == 1
+    api_client.get(reverse('product-list'))
+
+    api_client.force_authenticate(user=user)
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(reverse('partner-state'), {"state": "off"}, format='json')
+
+    assert api_client.get(reverse('shop-list')).data['count'] == 0
+    assert api_client.get(reverse('product-list')).data['count'] == 0
+
+
+# Test the admin deactivate action invalidates the shop list
+@pytest.mark.django_db
+def test_admin_deactivate_shops_invalidates_cache(api_client, catalog, django_capture_on_commit_callbacks):
+    assert api_client.get(reverse('shop-list')).data['count'] == 1
+    request = RequestFactory().post('/admin/')
+    request.session = {}
+    request._messages = FallbackStorage(request)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        deactivate_shops(ShopAdmin(Shop, AdminSite()), request, Shop.objects.all())
+
+    assert api_client.get(reverse('shop-list')).data['count'] == 0
+
+
+# Test deactivating shops from a changelist filtered on state also hides their products
+@pytest.mark.django_db
+def test_admin_deactivate_filtered_shops(api_client, catalog, django_capture_on_commit_callbacks):
+    request = RequestFactory().post('/admin/?state__exact=1')
+    request.session = {}
+    request._messages = FallbackStorage(request)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        deactivate_shops(ShopAdmin(Shop, AdminSite()), request, Shop.objects.filter(state=True))
+
+    assert not Shop.objects.get(pk=catalog.pk).state
+    assert not Product.objects.get(id=1).shop_active
+    assert api_client.get(reverse('product-list')).data['count'] == 0
+
+
+# Test basket holds keep the cached catalog until the stock timeout has passed
+@pytest.mark.django_db
+def test_reservations_keep_cached_catalog(api_client, catalog, settings, django_capture_on_commit_callbacks):
+    settings.CATALOG_STOCK_TIMEOUT = 60
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    products = api_client.get(reverse('product-list'))
+    facets = api_client.get(reverse('product-facets'))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(reverse('basket'), {"product": 1, "quantity": 4}, format='json')
+
+    assert api_client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=products['ETag']).status_code == 304
+    assert api_client.get(reverse('product-facets'), HTTP_IF_NONE_MATCH=facets['ETag']).status_code == 304
+
+
+# Test holding, releasing and expiring stock refreshes the product availability
+@pytest.mark.django_db
+def test_reservations_refresh_availability(api_client, catalog, settings, django_capture_on_commit_callbacks):
+    settings.CATALOG_STOCK_TIMEOUT = 0
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    first = api_client.get(reverse('product-list'))
+    assert first.data['results'][0]['available'] == 10
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(reverse('basket'), {"product": 1, "quantity": 4}, format='json')
+    response = api_client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=first['ETag'])
+    assert response.status_code == 200
+    assert response.data['results'][0]['available'] == 6
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.delete(reverse('basket'), {"items": [Basket.objects.get(user=user).id]}, format='json')
+    assert api_client.get(reverse('product-list')).data['results'][0]['available'] == 10
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(reverse('basket'), {"product": 1, "quantity": 3}, format='json')
+    assert api_client.get(reverse('product-list')).data['results'][0]['available'] == 7
+    Reservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+    with django_capture_on_commit_callbacks(execute=True):
+        assert release_expired() == 1
+    assert api_client.get(reverse('product-list')).data['results'][0]['available'] == 10
@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from procurement.models import User, Shop, Category, Product, Basket
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def product():
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    return Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=100, price_rrc=120,
+                                  quantity=10)
+
+
+# Test catalog endpoints answer If-None-Match with 304 without touching the database
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ['shop-list', 'category-list', 'product-list'])
+def test_catalog_etag_not_modified(api_client, product, name):
+    response = api_client.get(reverse(name))
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse(name), HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert len(queries) == 0
+
+
+# Test the ETag depends on query parameters and catalog changes
+@pytest.mark.django_db
+def test_catalog_etag_changes(api_client, product, django_capture_on_commit_callbacks):
+    etag = api_client.get(reverse('product-list')).headers['ETag']
+
+    assert api_client.get(reverse('product-list') + "?shop_id=1", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.price = 90
+        product.save()
+
+    response = api_client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['results'][0]['price'] == "90.00"
+
+
+# Test catalog endpoints honour If-Modified-Since
+@pytest.mark.django_db
+def test_catalog_if_modified_since(api_client, product):
+    last_modified = api_client.get(reverse('category-list')).headers['Last-Modified']
+
+    response = api_client.get(reverse('category-list'), HTTP_IF_MODIFIED_SINCE=last_modified)
+
+    assert response.status_code == 304
+
+
+# Test the basket answers 304 until its contents or products change
+@pytest.mark.django_db
+def test_basket_etag(api_client, product):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    item = Basket.objects.create(user=user, product=product, quantity=1)
+
+    response = api_client.get(reverse('basket'))
+    etag = response.headers['ETag']
+    assert 'Authorization' in response.headers['Vary']
+
+    with CaptureQueriesContext(connection) as queries:
+        assert api_client.get(reverse('basket'), HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert len(queries) == 1
+
+    item.quantity = 2
+    item.save()
+    response = api_client.get(reverse('basket'), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    product.name = "Renamed"
+    product.save()
+    assert api_client.get(reverse('basket'), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+# Test removing the newest basket row does not move Last-Modified back
+@pytest.mark.django_db
+def test_basket_last_modified_after_delete(api_client, product, django_capture_on_commit_callbacks):
+    other = Product.objects.create(id=2, shop=product.shop, category=product.category, name="Product 2", price=10,
+                                   price_rrc=12, quantity=10)
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    Basket.objects.create(user=user, product=product, quantity=1)
+    newest = Basket.objects.create(user=user, product=other, quantity=1)
+    Basket.objects.filter(product=product).update(updated_at=timezone.now() - timedelta(days=2))
+    Basket.objects.filter(product=other).update(updated_at=timezone.now() - timedelta(days=1))
+    Product.objects.update(updated_at=timezone.now() - timedelta(days=3))
+    Shop.objects.update(updated_at=timezone.now() - timedelta(days=3))
+    Category.objects.update(updated_at=timezone.now() - timedelta(days=3))
+    newest.refresh_from_db()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.delete(reverse('basket'), {"items": [newest.id]}, format='json')
+    response = api_client.get(reverse('basket'), HTTP_IF_MODIFIED_SINCE=http_date(newest.updated_at.timestamp()))
+
+    assert response.status_code == 200
+    assert [item['product'] for item in response.data] == [product.id]
+
+
+# Test the basket ETag depends on the requested representation
+@pytest.mark.django_db
+def test_basket_etag_covers_query(api_client, product):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    Basket.objects.create(user=user, product=product, quantity=1)
+
+    etag = api_client.get(reverse('basket'))['ETag']
+
+    assert api_client.get(reverse('basket'), {"expand": "product"}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    assert api_client.get(reverse('basket'), {"fields": "id"}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    assert api_client.get(reverse('basket'), HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+# Test other users' holds change the basket's expanded availability
+@pytest.mark.django_db
+def test_basket_etag_follows_stock(api_client, product, settings, django_capture_on_commit_callbacks):
+    settings.CATALOG_STOCK_TIMEOUT = 0
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    other = User.objects.create_user(email="other@example.com", password="password123")
+    Basket.objects.create(user=user, product=product, quantity=1)
+    api_client.force_authenticate(user=user)
+    etag = api_client.get(reverse('basket'), {"expand": "product"})['ETag']
+
+    api_client.force_authenticate(user=other)
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(reverse('basket'), {"product": 1, "quantity": 4}, format='json')
+    api_client.force_authenticate(user=user)
+    response = api_client.get(reverse('basket'), {"expand": "product"}, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert response.data[0]['product']['available'] == 6
+
+
+# Test baskets of different users have different validators
+@pytest.mark.django_db
+def test_basket_etag_is_per_user(api_client):
+    user1 = User.objects.create_user(email="user1@example.com", password="password123")
+    user2 = User.objects.create_user(email="user2@example.com", password="password123")
+
+    api_client.force_authenticate(user=user1)
+    etag = api_client.get(reverse('basket')).headers['ETag']
+    api_client.force_authenticate(user=user2)
+
+    assert api_client.get(reverse('basket'), HTTP_IF_NONE_MATCH=etag).status_code == 200
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from procurement_automation.database import database_config
+
+
+# Test SQLite paths are resolved against BASE_DIR and tuned for concurrent writers
+def test_sqlite_config():
+    config = database_config('sqlite:///db.sqlite3', Path('/app'), env={'SQLITE_MMAP_SIZE': '1024'})
+
+    assert config['NAME'] == Path('/app/db.sqlite3')
+    assert config['OPTIONS']['transaction_mode'] == 'IMMEDIATE'
+    assert config['OPTIONS']['timeout'] == 20
+    assert 'PRAGMA journal_mode=WAL' in config['OPTIONS']['init_command']
+    assert 'PRAGMA mmap_size=1024' in config['OPTIONS']['init_command']
+    assert database_config('sqlite:////var/db.sqlite3', Path('/app'), env={})['NAME'] == Path('/var/db.sqlite3')
+    assert database_config('sqlite://:memory:', Path('/app'), env={})['NAME'] == ':memory:'
+
+
+# Test PostgreSQL URLs keep persistent connections with health checks by default
+def test_postgres_config():
+    config = database_config('postgres://user:p%40ss@db:5433/shop?sslmode=require', Path('/app'), env={})
+
+    assert config['ENGINE'] == 'django.db.backends.postgresql'
+    assert (config['NAME'], config['USER'], config['PASSWORD'], config['HOST'], config['PORT']) == (
+        'shop', 'user', 'p@ss', 'db', '5433'
+    )
+    assert config['OPTIONS'] == {'sslmode': 'require'}
+    assert config['CONN_MAX_AGE'] == 60
+    assert config['CONN_HEALTH_CHECKS']
+
+
+# Test enabling the pool turns off persistent connections, which Django rejects together
+def test_postgres_pool_config():
+    config = database_config('postgresql://db/shop', Path('/app'), env={'DB_POOL': 'True', 'DB_POOL_MAX_SIZE': '20'})
+
+    assert config['OPTIONS']['pool'] == {'min_size': 2, 'max_size': 20, 'timeout': 10}
+    assert config['CONN_MAX_AGE'] == 0
+
+
+# Test unknown schemes are rejected
+def test_unsupported_database_url():
+    with pytest.raises(ImproperlyConfigured):
+        database_config('mysql://db/shop', Path('/app'), env={})
+
+
+# Test the SQLite PRAGMAs are applied to new connections
+@pytest.mark.django_db
+def test_sqlite_pragmas_applied():
+    if connection.vendor != 'sqlite':
+        pytest.skip("SQLite only")
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        assert cursor.fetchone()[0] == 1  # NORMAL
@@ -1,6 +1,8 @@
 import pytest
 from django.urls import reverse
-from procurement.models import Shop, Category, Product
+from procurement.filters import catalog_products
+from procurement.importers import PriceListImporter
+from procurement.models import Shop, Category, Product, ProductParameter
 from rest_framework.test import APIClient
 
 
@@ -132,4 +134,191 @@ def test_filter_products_with_invalid_params(api_client):
     response = api_client.get(reverse('product-list') + "?shop_id=999")
     assert response.status_code == 200
     assert response.data['count'] == 0
-    assert response.data['results'] == []
\ No newline at end of file
+    assert response.data['results'] == []
+
+@pytest.fixture
+def parameter_catalog():
+    PriceListImporter().run(
+        shop_name="Shop 1",
+        categories=[{"id": 1, "name": "Phones"}],
+        goods=[
+            {"id": 1, "category": 1, "name": "Phone A", "price": 1, "price_rrc": 2, "quantity": 3,
+             "parameters": {"color": "black", "Диагональ (дюйм)": 6.1, "memory": 128, "colors": ["red", "blue"]}},
+            {"id": 2, "category": 1, "name": "Phone B", "price": 1, "price_rrc": 2, "quantity": 3,
+             "parameters": {"color": "white", "Диагональ (дюйм)": "6.7", "memory": 256}},
+            {"id": 3, "category": 1, "name": "Phone C", "price": 1, "price_rrc": 2, "quantity": 3,
+             "parameters": {"color": "black", "Диагональ (дюйм)": 5.4, "memory": 64, "5g": True}},
+        ],
+    )
+
+
+def product_ids(api_client, params):
+    response = api_client.get(reverse('product-list'), params)
+    assert response.status_code == 200
+    return [product['id'] for product in response.data['results']]
+
+
+# Test filtering on parameter equality and numeric ranges
+@pytest.mark.django_db
+def test_filter_products_by_parameters(api_client, parameter_catalog):
+    assert product_ids(api_client, {"param": "color:black"}) == [1, 3]
+    assert product_ids(api_client, {"param": ["color:black", "memory:128"]}) == [1]
+    assert product_ids(api_client, {"param": "colors:blue"}) == [1]
+    assert product_ids(api_client, {"param": "5g:true"}) == [3]
+    assert product_ids(api_client, {"param_min": "Диагональ (дюйм):6"}) == [1, 2]
+    assert product_ids(api_client, {"param_min": "memory:100", "param_max": "memory:200"}) == [1]
+    assert product_ids(api_client, {"param": "color:black", "param_max": "Диагональ (дюйм):6"}) == [3]
+
+
+# Test malformed parameter filters are rejected
+@pytest.mark.django_db
+def test_filter_products_by_parameters_validation(api_client, parameter_catalog):
+    assert api_client.get(reverse('product-list'), {"param": "color"}).status_code == 400
+    assert api_client.get(reverse('product-list'), {"param_min": "memory:lots"}).status_code == 400
+
+
+# Test re-importing replaces the parameter rows of changed products
+@pytest.mark.django_db
+def test_parameters_follow_imports(parameter_catalog):
+    PriceListImporter().run(shop_name="Shop 1", goods=[
+        {"id": 1, "category": 1, "name": "Phone A", "price": 1, "price_rrc": 2, "quantity": 3,
+         "parameters": {"color": "green"}},
+    ])
+
+    assert list(ProductParameter.objects.filter(product_id=1).values_list('key', 'value')) == [("color", "green")]
+
+
+# Test facet counts follow the product list filters
+@pytest.mark.django_db
+def test_product_facets(api_client, parameter_catalog):
+    shop = Shop.objects.create(name="Shop 2")
+    Product.objects.create(id=4, shop=shop, category=Category.objects.create(id=2, name="Cases"), name="Case",
+                           price=150, price_rrc=200, quantity=1, parameters={"color": "black"})
+
+    response = api_client.get(reverse('product-facets'))
+
+    assert response.status_code == 200
+    assert response.data['count'] == 4
+    assert response.data['categories'] == [{"id": 1, "name": "Phones", "count": 3},
+                                           {"id": 2, "name": "Cases", "count": 1}]
+    assert [row['count'] for row in response.data['shops']] == [3, 1]
+    assert response.data['price'] == [{"min": 0, "max": 100, "count": 3}, {"min": 100, "max": 500, "count": 1}]
+    color = next(facet for facet in response.data['parameters'] if facet['key'] == "color")
+    assert color['values'] == [{"value": "black", "count": 3}, {"value": "white", "count": 1}]
+
+    response = api_client.get(reverse('product-facets'), {"param": "color:black", "category_id": 1})
+
+    assert response.data['count'] == 2
+    assert response.data['shops'] == [{"id": Shop.objects.get(name="Shop 1").id, "name": "Shop 1", "count": 2}]
+
+
+# Test facets are cached per filter set and refreshed after an import
+@pytest.mark.django_db
+def test_product_facets_are_cached(api_client, parameter_catalog, django_capture_on_commit_callbacks,
+                                   django_assert_num_queries):
+    api_client.get(reverse('product-facets'))
+    with django_assert_num_queries(0):
+        api_client.get(reverse('product-facets'))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        PriceListImporter().run(shop_name="Shop 1", goods=[
+            {"id": 5, "category": 1, "name": "Phone E", "price": 1, "price_rrc": 2, "quantity": 3},
+        ])
+
+    assert api_client.get(reverse('product-facets')).data['count'] == 4
+
+
+@pytest.fixture
+def priced_catalog():
+    active = Shop.objects.create(name="Active Shop", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    for i, (name, price, quantity) in enumerate([("Delta", 30, 5), ("Alpha", 10, 0), ("Charlie", 20, 2),
+                                                 ("Bravo", 20, 1)], start=1):
+        Product.objects.create(id=i, shop=active, category=category, name=name, price=price, price_rrc=price,
+                               quantity=quantity)
+    inactive = Shop.objects.create(name="Inactive Shop", state=True)
+    Product.objects.create(id=5, shop=inactive, category=category, name="Echo", price=15, price_rrc=15, quantity=1)
+    inactive.state = False
+    inactive.save()
+
+
+# Test price, stock and active-shop filters and sorting
+@pytest.mark.django_db
+def test_filter_and_sort_products(api_client, priced_catalog):
+    assert product_ids(api_client, {}) == [1, 2, 3, 4]
+    assert product_ids(api_client, {"min_price": "15", "max_price": "25"}) == [3, 4]
+    assert product_ids(api_client, {"in_stock": "true"}) == [1, 3, 4]
+    assert product_ids(api_client, {"ordering": "price"}) == [2, 3, 4, 1]
+    assert product_ids(api_client, {"ordering": "-name"}) == [1, 3, 4, 2]
+    assert api_client.get(reverse('product-list'), {"ordering": "quantity"}).status_code == 400
+    assert api_client.get(reverse('product-list'), {"min_price": "cheap"}).status_code == 400
+
+
+# Test keyset pages follow the requested sort order
+@pytest.mark.django_db
+def test_sorted_products_keyset_pages(api_client, priced_catalog):
+    response = api_client.get(reverse('product-list'), {"ordering": "-price", "cursor": "", "page_size": 2})
+    ids = [product['id'] for product in response.data['results']]
+    response = api_client.get(response.data['next'])
+    ids += [product['id'] for product in response.data['results']]
+
+    assert ids == [1, 4, 3, 2]
+
+
+# Test toggling a shop shows and hides its products without a join
+@pytest.mark.django_db
+def test_shop_state_is_copied_to_products(api_client, priced_catalog):
+    shop = Shop.objects.get(name="Inactive Shop")
+    assert not Product.objects.get(id=5).shop_active
+
+    shop.state = True
+    shop.save()
+
+    assert Product.objects.get(id=5).shop_active
+    assert "procurement_shop" not in str(catalog_products().query)
+
+
+# Test products created in or moved to a closed shop are hidden
+@pytest.mark.django_db
+def test_product_shop_active_follows_its_shop(api_client, priced_catalog):
+    inactive = Shop.objects.get(name="Inactive Shop")
+    category = Category.objects.get(id=1)
+    created = Product.objects.create(id=6, shop=inactive, category=category, name="Foxtrot", price=15,
+                                     price_rrc=15, quantity=1)
+    moved = Product.objects.get(id=1)
+    moved.shop_id = inactive.id
+    moved.save()
+
+    assert not created.shop_active
+    assert not Product.objects.get(id=1).shop_active
+    assert product_ids(api_client, {}) == [2, 3, 4]
+
+    moved.shop = Shop.objects.get(name="Active Shop")
+    moved.save()
+    assert Product.objects.get(id=1).shop_active
+
+
+# Test catalog payloads expose only public fields
+@pytest.mark.django_db
+def test_catalog_payloads_hide_bookkeeping_columns(api_client, priced_catalog):
+    product = api_client.get(reverse('product-list'), {"expand": "shop,category"}).data['results'][0]
+
+    assert set(product) == {
+        'id', 'category', 'shop', 'model', 'name', 'price', 'price_rrc', 'quantity', 'available', 'parameters',
+    }
+    assert set(product['shop']) == {'id', 'name', 'url', 'state'}
+    assert set(product['category']) == {'id', 'name'}
+
+
+# Test products render relation IDs by default and nest them on request
+@pytest.mark.django_db
+def test_product_fields_and_expand(api_client, priced_catalog):
+    product = api_client.get(reverse('product-list')).data['results'][0]
+    assert product['category'] == 1
+    assert isinstance(product['shop'], int)
+
+    response = api_client.get(reverse('product-list'), {"fields": "id,name,shop", "expand": "shop"})
+    product = response.data['results'][0]
+
+    assert set(product) == {'id', 'name', 'shop'}
+    assert product['shop']['name'] == "Active Shop"
@@ -0,0 +1,410 @@
+import io
+
+import pytest
+import yaml
+from django.urls import reverse
+from rest_framework.test import APIClient
+from procurement import parsers
+from procurement.checkout import place_order
+from procurement.importers import (
+    PriceListImporter, PriceListError, CategoryNotFoundError, ShopOwnershipError, feed_key,
+)
+from procurement.models import User, Shop, Category, Product, ImportJob, Basket, Contact
+
+
+PARTNER_PRICE_LIST = """
+shop: Partner Shop
+categories:
+  - id: 1
+    name: Category 1
+  - id: 2
+    name: Category 2
+goods:
+  - id: 10
+    category: 1
+    model: model/10
+    name: Product 10
+    price: 100
+    price_rrc: 120
+    quantity: 5
+    parameters:
+      color: red
+  - id: 11
+    category: 2
+    model: model/11
+    name: Product 11
+    price: 200.5
+    price_rrc: 220
+    quantity: 3
+"""
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+def make_goods(count, price=100):
+    return [
+        {"id": i, "category": 1, "model": f"model/{i}", "name": f"Product {i}",
+         "price": price, "price_rrc": price + 20, "quantity": 10, "parameters": {"n": i}}
+        for i in range(1, count + 1)
+    ]
+
+
+# Test importing new products reports inserted rows
+@pytest.mark.django_db
+def test_importer_inserts_products():
+    stats = PriceListImporter().run(
+        shop_name="Shop 1",
+        categories=[{"id": 1, "name": "Category 1"}],
+        goods=make_goods(5),
+    )
+
+    assert stats.inserted == 5
+    assert stats.updated == 0
+    assert stats.unchanged == 0
+    assert stats.rows_per_second > 0
+    assert Product.objects.filter(shop__name="Shop 1").count() == 5
+
+
+# Test re-importing diffs rows in memory and only writes changed products
+@pytest.mark.django_db
+def test_importer_detects_updated_and_unchanged_rows():
+    PriceListImporter().run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=make_goods(5))
+
+    goods = make_goods(6)
+    goods[0]['price'] = 150
+    goods[1]['parameters'] = {"n": 2, "color": "blue"}
+    stats = PriceListImporter().run(shop_name="Shop 1", categories=[{"id": 1, "name": "Renamed"}], goods=goods)
+
+    assert (stats.inserted, stats.updated, stats.unchanged) == (1, 2, 3)
+    assert Product.objects.get(id=1).price == 150
+    assert Product.objects.get(id=2).parameters == {"n": 2, "color": "blue"}
+    assert Category.objects.get(id=1).name == "Renamed"
+
+
+# Test the number of queries does not grow with the number of products
+@pytest.mark.django_db
+def test_importer_query_count_is_bounded(django_assert_max_num_queries):
+    Shop.objects.create(name="Shop 1")
+    Category.objects.create(id=1, name="Category 1")
+
+    # SQLite caps bound parameters per statement, so each batch of products and
+    # parameter rows is split into several inserts
+    with django_assert_max_num_queries(45):
+        PriceListImporter(batch_size=500).run(
+            shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=make_goods(1200)
+        )
+
+    assert Product.objects.count() == 1200
+
+    with django_assert_max_num_queries(8):
+        stats = PriceListImporter(batch_size=500).run(
+            shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=make_goods(1200)
+        )
+
+    assert stats.unchanged == 1200
+
+
+# Test an unknown category rolls back the whole import
+@pytest.mark.django_db
+def test_importer_unknown_category_rolls_back():
+    goods = make_goods(3)
+    goods[2]['category'] = 999
+
+    with pytest.raises(CategoryNotFoundError):
+        PriceListImporter(batch_size=2).run(
+            shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=goods
+        )
+
+    assert not Product.objects.exists()
+    assert not Shop.objects.filter(name="Shop 1").exists()
+
+
+# Test numeric strings are accepted for categories and quantities
+@pytest.mark.django_db
+def test_importer_converts_numeric_strings():
+    goods = make_goods(1)
+    goods[0].update(category="1", quantity="4")
+
+    PriceListImporter().run(shop_name="Shop 1", categories=[{"id": "1", "name": "Category 1"}], goods=goods)
+
+    assert Product.objects.filter(id=1).values_list('category_id', 'quantity').get() == (1, 4)
+
+
+# Test invalid or negative categories and quantities are price-list errors
+@pytest.mark.django_db
+@pytest.mark.parametrize('field, value', [
+    ('quantity', 'many'), ('quantity', -1), ('quantity', 2.5), ('category', 'phones'), ('category', -1),
+])
+def test_importer_rejects_invalid_integers(field, value):
+    goods = make_goods(1)
+    goods[0][field] = value
+
+    with pytest.raises(PriceListError, match=field):
+        PriceListImporter().run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=goods)
+
+    assert not Product.objects.exists()
+
+
+# Test missing categories can be created on the fly
+@pytest.mark.django_db
+def test_importer_creates_missing_categories():
+    goods = make_goods(1)
+    goods[0]['category'] = 7
+
+    PriceListImporter(create_missing_categories=True).run(shop_name="Shop 1", goods=goods)
+
+    assert Category.objects.get(id=7).name == "Unnamed"
+
+
+# Test products without a shop are rejected
+@pytest.mark.django_db
+def test_importer_requires_shop():
+    with pytest.raises(PriceListError):
+        PriceListImporter().run(goods=make_goods(1))
+
+
+# Test partner price list update through the API
+@pytest.mark.django_db
+def test_partner_update_success(api_client, settings, tmp_path):
+    settings.IMPORT_JOBS_BACKEND = 'sync'
+    settings.BASE_DIR = tmp_path
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'partner.yaml').write_text(PARTNER_PRICE_LIST, encoding='utf-8')
+
+    user = User.objects.create_user(email="partner@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post(reverse('partner-update'), {"url": "partner.yaml"}, format='json')
+
+    assert response.status_code == 202
+    job = ImportJob.objects.get(id=response.data['job_id'])
+    assert job.status == 'done'
+    assert job.inserted == 2
+    product = Product.objects.get(id=11)
+    assert product.shop.name == "Partner Shop"
+    assert str(product.price) == "200.50"
+    assert product.parameters == {}
+
+
+class CountingStream:
+    """
+    File-like wrapper recording how many bytes the parser has read.
+    """
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.data.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+# Test the streaming parser yields shop, categories and goods one at a time
+@pytest.mark.parametrize('loader', [yaml.SafeLoader, parsers.SafeLoader])
+def test_iter_price_list_entries(monkeypatch, loader):
+    monkeypatch.setattr(parsers, 'SafeLoader', loader)
+
+    entries = list(parsers.iter_price_list(io.BytesIO(PARTNER_PRICE_LIST.encode('utf-8'))))
+
+    assert entries == [
+        ('shop', 'Partner Shop'),
+        ('category', {'id': 1, 'name': 'Category 1'}),
+        ('category', {'id': 2, 'name': 'Category 2'}),
+        ('good', yaml.safe_load(PARTNER_PRICE_LIST)['goods'][0]),
+        ('good', yaml.safe_load(PARTNER_PRICE_LIST)['goods'][1]),
+    ]
+
+
+# Test the supplier format (a plain list of goods) and anchors are supported
+def test_iter_price_list_supplier_format():
+    content = b"- &base {id: 1, category: 1, name: A, price: 1, price_rrc: 2, quantity: 3}\n- *base\n"
+
+    entries = list(parsers.iter_price_list(io.BytesIO(content)))
+
+    assert [kind for kind, _ in entries] == ['good', 'good']
+    assert entries[0][1] == entries[1][1]
+
+
+# Test the parser does not read the whole file before yielding the first product
+def test_iter_price_list_is_lazy():
+    goods = "".join(
+        f"  - {{id: {i}, category: 1, name: Product {i}, price: 1, price_rrc: 2, quantity: 3}}\n"
+        for i in range(20000)
+    )
+    stream = CountingStream(f"shop: Big Shop\ngoods:\n{goods}".encode('utf-8'))
+
+    entries = parsers.iter_price_list(stream)
+    assert next(entries) == ('shop', 'Big Shop')
+    assert next(entries)[0] == 'good'
+
+    assert stream.bytes_read < len(stream.data.getvalue()) / 2
+
+
+# Test malformed documents are reported as price list errors
+def test_iter_price_list_rejects_scalars():
+    with pytest.raises(PriceListError):
+        list(parsers.iter_price_list(io.BytesIO(b"just a string")))
+
+
+# Test a streamed import writes products in batches
+@pytest.mark.django_db
+def test_importer_run_stream():
+    stats = PriceListImporter(batch_size=1).run_stream(
+        parsers.iter_price_list(io.BytesIO(PARTNER_PRICE_LIST.encode('utf-8')))
+    )
+
+    assert stats.inserted == 2
+    assert Product.objects.filter(shop__name="Partner Shop").count() == 2
+
+
+# Test only products whose content changed are written on re-import
+@pytest.mark.django_db
+def test_importer_writes_only_changed_rows():
+    PriceListImporter().run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=make_goods(50))
+
+    goods = make_goods(50)
+    goods[0]['quantity'] = 3
+    stats = PriceListImporter().run(shop_name="Shop 1", goods=goods)
+
+    assert (stats.inserted, stats.updated, stats.unchanged) == (0, 1, 49)
+    assert Product.objects.get(id=1).quantity == 3
+
+
+# Test re-importing a feed restores stock sold since the last import
+@pytest.mark.django_db
+def test_importer_restocks_after_checkout():
+    PriceListImporter().run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=make_goods(3))
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    contact = Contact.objects.create(user=user, city="City", street="Street", house="1", phone="1234567890")
+    Basket.objects.create(user=user, product_id=1, quantity=7)
+    place_order(user, contact)
+    assert Product.objects.get(id=1).quantity == 3
+
+    # The feed changed elsewhere, so it is not skipped, but still lists 10 for product 1
+    goods = make_goods(3)
+    goods[1]['price'] = 150
+    stats = PriceListImporter().run(shop_name="Shop 1", goods=goods)
+
+    assert (stats.updated, stats.unchanged) == (2, 1)
+    assert Product.objects.get(id=1).quantity == 10
+
+
+# Test an unchanged feed is skipped entirely
+@pytest.mark.django_db
+def test_importer_skips_unchanged_feed():
+    PriceListImporter(feed_hash="abc").run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}],
+                                           goods=make_goods(3))
+    assert Shop.objects.get(name="Shop 1").price_list_hash == feed_key("abc", False)
+
+    goods = make_goods(3)
+    goods[0]['price'] = 999
+    stats = PriceListImporter(feed_hash="abc").run(shop_name="Shop 1", goods=goods)
+
+    assert stats.skipped
+    assert stats.processed == 0
+    assert Product.objects.get(id=1).price == 100
+
+
+# Test an unchanged feed is imported again after checkouts or edits changed its products
+@pytest.mark.django_db
+def test_importer_reimports_unchanged_feed_after_changes():
+    PriceListImporter(feed_hash="abc").run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}],
+                                           goods=make_goods(3))
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    contact = Contact.objects.create(user=user, city="City", street="Street", house="1", phone="1234567890")
+    Basket.objects.create(user=user, product_id=1, quantity=7)
+    place_order(user, contact)
+
+    stats = PriceListImporter(feed_hash="abc").run(shop_name="Shop 1", goods=make_goods(3))
+    assert not stats.skipped
+    assert Product.objects.get(id=1).quantity == 10
+
+    product = Product.objects.get(id=2)
+    product.price = 1
+    product.save()
+    stats = PriceListImporter(feed_hash="abc").run(shop_name="Shop 1", goods=make_goods(3))
+    assert (stats.skipped, stats.updated) == (False, 1)
+    assert PriceListImporter(feed_hash="abc").run(shop_name="Shop 1", goods=make_goods(3)).skipped
+
+
+# Test an unchanged feed is not skipped when deactivate_missing is switched on
+@pytest.mark.django_db
+def test_importer_feed_hash_covers_deactivate_missing():
+    PriceListImporter().run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=make_goods(3))
+    PriceListImporter(feed_hash="abc").run(shop_name="Shop 1", goods=make_goods(2))
+
+    stats = PriceListImporter(feed_hash="abc", deactivate_missing=True).run(shop_name="Shop 1", goods=make_goods(2))
+
+    assert not stats.skipped
+    assert stats.deactivated == 1
+
+
+# Test products that disappeared from the feed can be deactivated and come back
+@pytest.mark.django_db
+def test_importer_deactivates_missing_products(api_client):
+    PriceListImporter().run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}], goods=make_goods(3))
+
+    stats = PriceListImporter(deactivate_missing=True).run(shop_name="Shop 1", goods=make_goods(2))
+
+    assert stats.deactivated == 1
+    assert not Product.objects.get(id=3).is_active
+    response = api_client.get(reverse('product-list'))
+    assert response.data['count'] == 2
+
+    stats = PriceListImporter().run(shop_name="Shop 1", goods=make_goods(3))
+
+    assert stats.updated == 1
+    assert Product.objects.get(id=3).is_active
+
+
+# Test re-uploading the same file through a job is short-circuited
+@pytest.mark.django_db
+def test_partner_update_same_file_is_skipped(api_client, settings, tmp_path):
+    settings.IMPORT_JOBS_BACKEND = 'sync'
+    settings.BASE_DIR = tmp_path
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'partner.yaml').write_text(PARTNER_PRICE_LIST, encoding='utf-8')
+    user = User.objects.create_user(email="partner@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+
+    api_client.post(reverse('partner-update'), {"url": "partner.yaml"}, format='json')
+    response = api_client.post(reverse('partner-update'), {"url": "partner.yaml"}, format='json')
+
+    job = ImportJob.objects.get(id=response.data['job_id'])
+    assert job.status == 'done'
+    assert job.skipped
+    assert job.processed_rows == 0
+
+
+# Test partners own the shops they create and cannot import into another partner's shop
+@pytest.mark.django_db
+def test_importer_enforces_shop_owner():
+    partner = User.objects.create_user(email="partner@example.com", password="password123")
+    other = User.objects.create_user(email="other@example.com", password="password123")
+
+    PriceListImporter(owner=partner).run(shop_name="Shop 1", categories=[{"id": 1, "name": "Category 1"}],
+                                         goods=make_goods(1))
+    assert Shop.objects.get(name="Shop 1").owner == partner
+
+    with pytest.raises(ShopOwnershipError):
+        PriceListImporter(owner=other).run(shop_name="Shop 1", goods=make_goods(2))
+    assert Product.objects.count() == 1
+
+
+# Test shops without an owner are not claimed by whoever imports into them
+@pytest.mark.django_db
+def test_importer_rejects_unowned_shop():
+    partner = User.objects.create_user(email="partner@example.com", password="password123")
+    shop = Shop.objects.create(name="Shop 1")
+
+    with pytest.raises(ShopOwnershipError):
+        PriceListImporter(owner=partner).run(shop_name="Shop 1", goods=[])
+    with pytest.raises(ShopOwnershipError):
+        PriceListImporter(shop=shop, owner=partner).run(goods=[])
+
+    shop.refresh_from_db()
+    assert shop.owner is None
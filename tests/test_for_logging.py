@@ -0,0 +1,137 @@
+import io
+import json
+import logging
+import os
+import sys
+from logging.handlers import QueueListener
+
+import pytest
+from django.core.management import call_command
+from procurement_automation.log import JSONFormatter, QueueListenerHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, name):
+        super().__init__()
+        self.records = []
+        self.set_name(name)
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def target():
+    handler = ListHandler('test-target')
+    holder = logging.getLogger('test.targets')
+    holder.addHandler(handler)
+    yield handler
+    holder.removeHandler(handler)
+    handler.close()
+
+
+@pytest.fixture
+def queue_logger(target):
+    handler = QueueListenerHandler('test.targets')
+    logger = logging.getLogger('test.queue')
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield logger, handler
+    logger.removeHandler(handler)
+    handler.close()
+
+
+# Test records reach the target handlers from the listener thread, still unformatted
+def test_queue_handler_delivers_records(target, queue_logger):
+    logger, handler = queue_logger
+
+    logger.info("Order %s placed", 42)
+    logger.debug("Filtered out")
+    handler.flush()
+
+    assert [(record.msg, record.args) for record in target.records] == [("Order %s placed", (42,))]
+    assert target.records[0].getMessage() == "Order 42 placed"
+
+
+# Test a full queue drops records instead of blocking the caller
+def test_queue_handler_drops_when_full(target):
+    handler = QueueListenerHandler('test.targets', queue_size=1)
+    # A listener that never reads, like a writer stuck on slow disk I/O
+    handler.listener = QueueListener(handler.queue)
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, "message", (), None)
+
+    handler.handle(record)
+    handler.handle(record)
+
+    assert handler.dropped == 1
+    handler.listener = None
+    handler.close()
+
+
+# Test the listener thread is only started by the first record, after targets are configured
+def test_queue_handler_starts_listener_lazily():
+    handler = QueueListenerHandler('test.lazy-targets')
+    assert handler.listener is None
+    late_target = ListHandler('late-target')
+    logging.getLogger('test.lazy-targets').addHandler(late_target)
+
+    handler.handle(logging.LogRecord('test', logging.INFO, __file__, 1, "message", (), None))
+    handler.flush()
+
+    assert [record.msg for record in late_target.records] == ["message"]
+    handler.close()
+    logging.getLogger('test.lazy-targets').removeHandler(late_target)
+
+
+# Test a forked worker starts its own listener instead of queueing to the parent's
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork()")
+def test_queue_handler_restarts_listener_after_fork(tmp_path, target):
+    handler = QueueListenerHandler('test.targets')
+    handler.handle(logging.LogRecord('test', logging.INFO, __file__, 1, "parent", (), None))
+    handler.flush()
+    result = tmp_path / 'child'
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            fresh = handler.listener is None
+            handler.handle(logging.LogRecord('test', logging.INFO, __file__, 1, "child", (), None))
+            handler.flush()
+            result.write_text(f"{fresh} {[record.msg for record in target.records]}")
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert result.read_text() == "True ['parent', 'child']"
+    handler.close()
+
+
+# Test the JSON formatter emits one object with extra fields and the traceback
+def test_json_formatter():
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        exc_info = sys.exc_info()
+    record = logging.getLogger('test').makeRecord(
+        'test', logging.ERROR, __file__, 10, "Job %s failed", (7,), exc_info, extra={'job_id': 7}
+    )
+
+    data = json.loads(JSONFormatter().format(record))
+
+    assert data['level'] == 'ERROR'
+    assert data['message'] == "Job 7 failed"
+    assert data['job_id'] == 7
+    assert "RuntimeError: boom" in data['exception']
+
+
+# Test the logging benchmark reports every mode
+@pytest.mark.django_db
+def test_benchmark_logging_command():
+    out = io.StringIO()
+
+    call_command('benchmark_logging', '--requests', '3', stdout=out)
+
+    for mode in ('off', 'queue', 'sync'):
+        assert f"{mode}: mean" in out.getvalue()
+    assert logging.getLogger('django').handlers[0].__class__ is QueueListenerHandler
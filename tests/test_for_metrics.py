@@ -0,0 +1,144 @@
+import re
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import include, path, reverse
+from rest_framework.test import APIClient
+from procurement import metrics
+from procurement.async_views import AsyncProductListView
+from procurement.metrics import Registry
+from procurement.models import User, Shop, Category, Product, Basket
+
+urlpatterns = [
+    path('api/v1/', include([path('products', AsyncProductListView.as_view(), name='product-list')])),
+]
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch, settings):
+    settings.METRICS_DIR = ''
+    settings.METRICS_TOKEN = ''
+    registry = Registry()
+    monkeypatch.setattr(metrics, 'registry', registry)
+    return registry
+
+
+@pytest.fixture
+def product():
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    return Product.objects.create(
+        id=1, shop=shop, category=category, name="Product 1", price=100, price_rrc=120, quantity=5,
+    )
+
+
+def sample(text, name, **labels):
+    """
+    Value of the `name` sample with exactly `labels` in a metrics page.
+    """
+    rendered = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}{{{re.escape(rendered)}}} (\S+)$', text, re.MULTILINE)
+    assert match, f"{name}{{{rendered}}} not found"
+    return float(match.group(1))
+
+
+# Test requests are recorded per view and exposed in the Prometheus format
+@pytest.mark.django_db
+def test_metrics_endpoint(api_client, product):
+    api_client.get(reverse('product-list'))
+    api_client.get(reverse('product-list'))
+
+    response = api_client.get(reverse('metrics'))
+    text = response.content.decode()
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert '# TYPE procurement_http_request_duration_seconds histogram' in text
+    duration = 'procurement_http_request_duration_seconds'
+    assert sample(text, duration + '_count', view='product-list', method='GET', status='200') == 2
+    assert sample(text, duration + '_bucket', view='product-list', method='GET', status='200', le='+Inf') == 2
+    # The second request is served from the cache
+    assert sample(text, 'procurement_http_db_queries_sum', view='product-list', method='GET') == 2
+    assert sample(text, 'procurement_http_db_queries_bucket', view='product-list', method='GET', le='0') == 1
+    assert sample(text, 'procurement_http_serializer_duration_seconds_sum', view='product-list', method='GET') > 0
+    assert sample(text, 'procurement_http_render_duration_seconds_sum', view='product-list', method='GET') > 0
+    assert sample(text, 'procurement_http_response_size_bytes_sum', view='product-list', method='GET') > 0
+
+
+# Test every status, method and unresolved paths get their own series
+@pytest.mark.django_db
+def test_metrics_labels(api_client, product):
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    api_client.get(reverse('basket'))
+    api_client.force_authenticate(user=user)
+    api_client.post(reverse('basket'), {"product": product.id, "quantity": 1}, format='json')
+    api_client.get('/no-such-page')
+
+    text = api_client.get(reverse('metrics')).content.decode()
+
+    duration = 'procurement_http_request_duration_seconds_count'
+    assert sample(text, duration, view='basket', method='GET', status='401') == 1
+    assert sample(text, duration, view='basket', method='POST', status='201') == 1
+    assert sample(text, duration, view='unmatched', method='GET', status='404') == 1
+    assert Basket.objects.filter(user=user).exists()
+
+
+# Test requests to the async views are recorded too
+@pytest.mark.django_db
+def test_metrics_async_request(settings, api_client, product):
+    settings.ROOT_URLCONF = __name__
+    async_to_sync(AsyncClient().get)(reverse('product-list'))
+
+    text = metrics.render_metrics()
+
+    assert sample(text, 'procurement_http_db_queries_sum', view='product-list', method='GET') == 2
+
+
+# Test the Server-Timing header is only sent in debug mode
+@pytest.mark.django_db
+def test_server_timing_header(settings, api_client, product):
+    assert not api_client.get(reverse('product-list')).has_header('Server-Timing')
+
+    settings.DEBUG = True
+    header = api_client.get(reverse('product-list') + '?page_size=5')['Server-Timing']
+
+    assert re.fullmatch(
+        r'db;dur=[\d.]+;desc="2 queries", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+', header,
+    )
+
+
+# Test the metrics token is enforced when configured
+@pytest.mark.django_db
+def test_metrics_token(settings, api_client):
+    settings.METRICS_TOKEN = 'secret'
+
+    assert api_client.get(reverse('metrics')).status_code == 403
+    assert api_client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code == 403
+    assert api_client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').status_code == 200
+
+
+# Test series of several processes sharing METRICS_DIR are summed
+def test_metrics_shared_directory(settings, tmp_path, registry):
+    settings.METRICS_DIR = str(tmp_path)
+    settings.METRICS_FLUSH_SECONDS = 60
+    labels = (('view', 'shop-list'), ('method', 'GET'))
+    worker = Registry()
+    worker.observe('procurement_http_db_queries', labels, 1)
+    worker.observe('procurement_http_db_queries', labels, 30)
+    worker.flush()
+    registry.observe('procurement_http_db_queries', labels, 2)
+
+    text = metrics.render_metrics()
+
+    assert len(list(tmp_path.glob('*.json'))) == 2
+    assert sample(text, 'procurement_http_db_queries_count', view='shop-list', method='GET') == 3
+    assert sample(text, 'procurement_http_db_queries_sum', view='shop-list', method='GET') == 33
+    assert sample(text, 'procurement_http_db_queries_bucket', view='shop-list', method='GET', le='1') == 1
+    assert sample(text, 'procurement_http_db_queries_bucket', view='shop-list', method='GET', le='2') == 2
+    assert sample(text, 'procurement_http_db_queries_bucket', view='shop-list', method='GET', le='50') == 3
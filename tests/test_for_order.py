@@ -1,6 +1,15 @@
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
 import pytest
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from procurement.models import User, Shop, Category, Product, Basket, Contact, Order
+from rest_framework.exceptions import ValidationError
+from procurement.checkout import place_order
+from procurement.models import User, Shop, Category, Product, Basket, Contact, Order, OrderItem, Reservation
 from rest_framework.test import APIClient
 
 
@@ -48,6 +57,28 @@ def test_create_order_without_contact(api_client):
     assert "contact" in response.data
 
 
+# Test products delisted or in a closed shop since they were added to the basket cannot be ordered
+@pytest.mark.django_db
+@pytest.mark.parametrize('field', ['is_active', 'shop_active'])
+def test_order_rejects_unavailable_product(field):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    contact = Contact.objects.create(user=user, city="City", street="Street", house="1", phone="1234567890")
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    product = Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=100, price_rrc=120,
+                                     quantity=10)
+    Basket.objects.create(user=user, product=product, quantity=3)
+    Product.objects.filter(id=product.id).update(**{field: False})
+
+    with pytest.raises(ValidationError) as error:
+        place_order(user, contact)
+
+    assert "no longer available" in str(error.value.detail)
+    product.refresh_from_db()
+    assert product.quantity == 10
+    assert not Order.objects.exists()
+
+
 # Test order creation with insufficient stock
 @pytest.mark.django_db
 def test_create_order_insufficient_stock(api_client):
@@ -104,3 +135,262 @@ def test_get_orders_of_other_user(api_client):
     # Проверяем, что раздел results пуст
     assert len(response.data['results']) == 0
 
+
+
+# Test a failed checkout leaves stock, orders and the basket untouched
+@pytest.mark.django_db
+def test_create_order_rolls_back_on_insufficient_stock(api_client):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    contact = Contact.objects.create(user=user, city="City", street="Street", house="1", phone="1234567890")
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    first = Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=100, price_rrc=120,
+                                   quantity=10)
+    second = Product.objects.create(id=2, shop=shop, category=category, name="Product 2", price=100, price_rrc=120,
+                                    quantity=1)
+    Basket.objects.create(user=user, product=first, quantity=3)
+    Basket.objects.create(user=user, product=second, quantity=2)
+
+    response = api_client.post(reverse('order'), {"contact": contact.id}, format='json')
+
+    assert response.status_code == 400
+    assert response.data['error'] == "Not enough stock for product Product 2."
+    assert not Order.objects.exists()
+    assert Basket.objects.filter(user=user).count() == 2
+    first.refresh_from_db()
+    assert first.quantity == 10
+
+
+# Test concurrent checkouts of the last items never oversell
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_checkouts_do_not_oversell():
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    product = Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=100, price_rrc=120,
+                                     quantity=5)
+    buyers = []
+    for i in range(12):
+        user = User.objects.create_user(email=f"buyer{i}@example.com", password="password123")
+        contact = Contact.objects.create(user=user, city="City", street="Street", house="1", phone="1234567890")
+        Basket.objects.create(user=user, product=product, quantity=1)
+        buyers.append((user, contact))
+
+    barrier = threading.Barrier(len(buyers))
+    outcomes = []
+
+    def checkout(user, contact):
+        barrier.wait()
+        try:
+            for _ in range(50):
+                try:
+                    place_order(user, contact)
+                    outcomes.append('ordered')
+                    return
+                except OperationalError:
+                    # SQLite reports lock contention instead of waiting; the client retries
+                    time.sleep(0.01)
+                except ValidationError:
+                    outcomes.append('rejected')
+                    return
+            outcomes.append('gave up')
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=checkout, args=buyer) for buyer in buyers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    product.refresh_from_db()
+    assert outcomes.count('ordered') == 5
+    assert outcomes.count('rejected') == 7
+    assert product.quantity == 0
+    assert Order.objects.count() == 5
+    assert Basket.objects.count() == 7
+
+
+# Test an order keeps its lines and totals after the basket is cleared
+@pytest.mark.django_db
+def test_create_order_stores_items_and_totals(api_client):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    contact = Contact.objects.create(user=user, city="City", street="Street", house="1", phone="1234567890")
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    first = Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=100, price_rrc=120,
+                                   quantity=10)
+    second = Product.objects.create(id=2, shop=shop, category=category, name="Product 2", price="2.50",
+                                    price_rrc=3, quantity=10)
+    Basket.objects.create(user=user, product=first, quantity=2)
+    Basket.objects.create(user=user, product=second, quantity=4)
+
+    response = api_client.post(reverse('order'), {"contact": contact.id}, format='json')
+
+    assert response.status_code == 201
+    assert response.data['total_sum'] == "210.00"
+    assert response.data['item_count'] == 6
+    order = Order.objects.get(id=response.data['id'])
+    assert sorted(order.items.values_list('product_id', 'shop_id', 'quantity', 'price')) == [
+        (1, shop.id, 2, Decimal("100.00")), (2, shop.id, 4, Decimal("2.50")),
+    ]
+
+    # Later price changes do not alter the stored order
+    Product.objects.filter(id=1).update(price=500)
+    response = api_client.get(reverse('order'))
+
+    assert response.data['results'][0]['total_sum'] == "210.00"
+    assert len(response.data['results'][0]['items']) == 2
+
+
+def make_order(user, shop, product, created_at, status="created"):
+    order = Order.objects.create(user=user, status=status, total_sum=product.price, item_count=1)
+    OrderItem.objects.create(order=order, product=product, shop=shop, quantity=1, price=product.price,
+                             created_at=created_at)
+    return order
+
+
+# Test partners only see orders with their own products, filtered by status and date
+@pytest.mark.django_db
+def test_partner_orders_are_scoped_to_own_shop(api_client):
+    partner = User.objects.create_user(email="partner@example.com", password="password123")
+    other = User.objects.create_user(email="other@example.com", password="password123")
+    buyer = User.objects.create_user(email="buyer@example.com", password="password123")
+    category = Category.objects.create(id=1, name="Category 1")
+    own_shop = Shop.objects.create(name="Own Shop", owner=partner)
+    other_shop = Shop.objects.create(name="Other Shop", owner=other)
+    own = Product.objects.create(id=1, shop=own_shop, category=category, name="Own", price=10, price_rrc=12,
+                                 quantity=5)
+    foreign = Product.objects.create(id=2, shop=other_shop, category=category, name="Foreign", price=20,
+                                     price_rrc=22, quantity=5)
+    early = make_order(buyer, own_shop, own, datetime(2024, 1, 10, 12, tzinfo=dt_timezone.utc))
+    late = make_order(buyer, own_shop, own, datetime(2024, 2, 10, 12, tzinfo=dt_timezone.utc), status="delivered")
+    make_order(buyer, other_shop, foreign, datetime(2024, 1, 10, 12, tzinfo=dt_timezone.utc))
+    api_client.force_authenticate(user=partner)
+
+    response = api_client.get(reverse('partner-orders'))
+    assert sorted(order['id'] for order in response.data['results']) == [early.id, late.id]
+
+    response = api_client.get(reverse('partner-orders'), {"status": "delivered"})
+    assert [order['id'] for order in response.data['results']] == [late.id]
+
+    response = api_client.get(reverse('partner-orders'), {"date_from": "2024-01-01", "date_to": "2024-01-10"})
+    assert [order['id'] for order in response.data['results']] == [early.id]
+
+    response = api_client.get(reverse('partner-orders'), {"date_from": "yesterday"})
+    assert response.status_code == 400
+
+
+# Test a mixed order only shows the partner's own lines
+@pytest.mark.django_db
+def test_partner_orders_hide_other_shops_lines(api_client):
+    partner = User.objects.create_user(email="partner@example.com", password="password123")
+    buyer = User.objects.create_user(email="buyer@example.com", password="password123")
+    category = Category.objects.create(id=1, name="Category 1")
+    own_shop = Shop.objects.create(name="Own Shop", owner=partner)
+    other_shop = Shop.objects.create(name="Other Shop")
+    own = Product.objects.create(id=1, shop=own_shop, category=category, name="Own", price=10, price_rrc=12,
+                                 quantity=5)
+    foreign = Product.objects.create(id=2, shop=other_shop, category=category, name="Foreign", price=20,
+                                     price_rrc=22, quantity=5)
+    order = make_order(buyer, own_shop, own, datetime(2024, 1, 10, 12, tzinfo=dt_timezone.utc))
+    OrderItem.objects.create(order=order, product=foreign, shop=other_shop, quantity=1, price=20)
+    api_client.force_authenticate(user=partner)
+
+    response = api_client.get(reverse('partner-orders'))
+
+    assert [item['product'] for item in response.data['results'][0]['items']] == [own.id]
+
+
+# Test a mixed order's totals only cover the partner's own lines
+@pytest.mark.django_db
+def test_partner_orders_totals_cover_own_lines(api_client):
+    partner = User.objects.create_user(email="partner@example.com", password="password123")
+    buyer = User.objects.create_user(email="buyer@example.com", password="password123")
+    category = Category.objects.create(id=1, name="Category 1")
+    own_shop = Shop.objects.create(name="Own Shop", owner=partner)
+    other_shop = Shop.objects.create(name="Other Shop")
+    own = Product.objects.create(id=1, shop=own_shop, category=category, name="Own", price=10, price_rrc=12,
+                                 quantity=5)
+    foreign = Product.objects.create(id=2, shop=other_shop, category=category, name="Foreign", price=20,
+                                     price_rrc=22, quantity=5)
+    order = make_order(buyer, own_shop, own, datetime(2024, 1, 10, 12, tzinfo=dt_timezone.utc))
+    OrderItem.objects.create(order=order, product=own, shop=own_shop, quantity=2, price=10)
+    OrderItem.objects.create(order=order, product=foreign, shop=other_shop, quantity=3, price=20)
+    Order.objects.filter(pk=order.pk).update(total_sum=90, item_count=6)
+    api_client.force_authenticate(user=partner)
+
+    result = api_client.get(reverse('partner-orders')).data['results'][0]
+
+    assert sum(item['quantity'] for item in result['items']) == result['item_count'] == 3
+    assert result['total_sum'] == '30.00'
+
+
+# Test checkout consumes the buyer's own holds while respecting other baskets' holds
+@pytest.mark.django_db
+def test_checkout_consumes_own_reservations(api_client):
+    buyer = User.objects.create_user(email="buyer@example.com", password="password123")
+    other = User.objects.create_user(email="other@example.com", password="password123")
+    contact = Contact.objects.create(user=buyer, city="City", street="Street", house="1", phone="1234567890")
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    product = Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=100, price_rrc=120,
+                                     quantity=5)
+    api_client.force_authenticate(user=buyer)
+    api_client.post(reverse('basket'), {"product": 1, "quantity": 3}, format='json')
+    api_client.force_authenticate(user=other)
+    api_client.post(reverse('basket'), {"product": 1, "quantity": 2}, format='json')
+
+    api_client.force_authenticate(user=buyer)
+    response = api_client.post(reverse('order'), {"contact": contact.id}, format='json')
+
+    assert response.status_code == 201
+    product.refresh_from_db()
+    assert (product.quantity, product.reserved) == (2, 2)
+    assert list(Reservation.objects.values_list('user_id', flat=True)) == [other.id]
+
+
+# Test order lines can be expanded down to the product's shop
+@pytest.mark.django_db
+def test_order_items_expand(api_client):
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    product = Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=10, price_rrc=12,
+                                     quantity=5)
+    make_order(user, shop, product, datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+
+    item = api_client.get(reverse('order')).data['results'][0]['items'][0]
+    assert item['product'] == product.id
+
+    response = api_client.get(reverse('order'), {"fields": "id,items", "expand": "items.product.shop"})
+    order = response.data['results'][0]
+
+    assert set(order) == {'id', 'items'}
+    assert order['items'][0]['product']['name'] == "Product 1"
+    assert order['items'][0]['product']['shop']['name'] == "Shop 1"
+    assert order['items'][0]['shop'] == shop.id
+
+
+# Test order lines are only prefetched when ?fields= selects them
+@pytest.mark.django_db
+def test_order_list_skips_unselected_items(api_client):
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    product = Product.objects.create(id=1, shop=shop, category=category, name="Product 1", price=10, price_rrc=12,
+                                     quantity=5)
+    make_order(user, shop, product, datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse('order'), {"fields": "id,total_sum"})
+    assert set(response.data['results'][0]) == {'id', 'total_sum'}
+    assert not any('procurement_orderitem' in query['sql'] for query in queries.captured_queries)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse('order'), {"fields": "id,items"})
+    assert response.data['results'][0]['items'][0]['product'] == product.id
+    assert any('procurement_orderitem' in query['sql'] for query in queries.captured_queries)
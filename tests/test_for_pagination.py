@@ -0,0 +1,86 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from procurement.models import User, Shop, Category, Product, Contact, Order
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def products():
+    shop = Shop.objects.create(name="Shop 1", state=True)
+    category = Category.objects.create(id=1, name="Category 1")
+    Product.objects.bulk_create([
+        Product(id=i, shop=shop, category=category, name=f"Product {i}", price=100, price_rrc=120, quantity=1)
+        for i in range(1, 26)
+    ])
+
+
+# Test walking the catalog with a cursor returns every product once in id order
+@pytest.mark.django_db
+def test_product_cursor_pagination(api_client, products):
+    url = reverse('product-list') + "?cursor=&page_size=10"
+    ids = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        assert 'count' not in response.data
+        ids += [product['id'] for product in response.data['results']]
+        url = response.data['next']
+
+    assert ids == list(range(1, 26))
+
+
+# Test keyset pages do not issue COUNT(*) or OFFSET queries
+@pytest.mark.django_db
+def test_product_cursor_pagination_queries(api_client, products):
+    first = api_client.get(reverse('product-list') + "?cursor=&page_size=10")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(first.data['next'])
+
+    assert [product['id'] for product in response.data['results']] == list(range(11, 21))
+    assert len(queries) == 1
+    assert 'COUNT' not in queries[0]['sql']
+    assert 'OFFSET' not in queries[0]['sql']
+
+
+# Test the client page size is capped server-side
+@pytest.mark.django_db
+def test_page_size_is_capped(api_client, products, monkeypatch):
+    monkeypatch.setattr('procurement.pagination.KeysetPagination.max_page_size', 5)
+
+    response = api_client.get(reverse('product-list') + "?cursor=&page_size=1000")
+    assert len(response.data['results']) == 5
+
+    response = api_client.get(reverse('product-list') + "?page_size=1000")
+    assert len(response.data['results']) == 25
+
+
+# Test page-number pagination stays the default
+@pytest.mark.django_db
+def test_product_page_number_pagination_is_default(api_client, products):
+    response = api_client.get(reverse('product-list') + "?page=3")
+
+    assert response.data['count'] == 25
+    assert [product['id'] for product in response.data['results']] == list(range(21, 26))
+
+
+# Test order history can be paged newest first with a cursor
+@pytest.mark.django_db
+def test_order_cursor_pagination(api_client):
+    user = User.objects.create_user(email="test@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    contact = Contact.objects.create(user=user, city="City", street="Street", house="1", phone="1234567890")
+    orders = [Order.objects.create(user=user, contact=contact) for _ in range(3)]
+
+    response = api_client.get(reverse('order') + "?cursor=&page_size=2")
+    next_page = api_client.get(response.data['next'])
+
+    ids = [order['id'] for order in response.data['results'] + next_page.data['results']]
+    assert ids == [order.id for order in reversed(orders)]
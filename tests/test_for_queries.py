@@ -0,0 +1,148 @@
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from procurement.models import User, Contact, Shop, Category, Product, Basket, Order, OrderItem, ImportJob
+from procurement.urls import urlpatterns
+
+
+PRICE_LIST = b"- {id: 1, name: Product 1, category: 1, price: 10, price_rrc: 12, quantity: 1}\n"
+
+# Endpoints whose payload grows with the data: the number of queries must not.
+LIST_BUDGETS = {
+    'shop-list': 2,
+    'category-list': 2,
+    'product-list': 2,
+    'basket': 2,  # validator aggregate + read
+    'order': 3,  # count + orders + prefetched items
+    'partner-orders': 3,
+    'contact-list': 2,
+}
+
+# Remaining endpoints: (method, request data, query budget).
+ENDPOINT_BUDGETS = {
+    'user-register': ('post', lambda ctx: {
+        "email": "new@example.com", "password": "securepassword123", "first_name": "John", "last_name": "Doe",
+    }, 4),
+    'email-verification': ('post', lambda ctx: {"email": ctx['user'].email, "token": "token"}, 2),
+    'user-login': ('post', lambda ctx: {"email": ctx['user'].email, "password": "password123"}, 2),
+    'password-reset': ('post', lambda ctx: {"email": ctx['user'].email}, 2),
+    'password-reset-confirm': ('post', lambda ctx: {
+        "email": ctx['user'].email, "token": "token", "password": "newpassword123",
+    }, 2),
+    'user-edit': ('get', None, 0),
+    'contact-detail': ('get', None, 1),
+    'upload-pricelist': ('post', None, 15),
+    'partner-update': ('post', lambda ctx: {"url": "partner.yaml"}, 18),
+    'partner-update-job': ('get', None, 1),
+    'partner-state': ('get', None, 1),
+    'product-search': ('get', lambda ctx: {"q": "product"}, 2),
+    'product-facets': ('get', lambda ctx: {"param": "color:red"}, 4),
+    'metrics': ('get', None, 0),
+}
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def context(api_client, settings, tmp_path):
+    settings.IMPORT_JOBS_BACKEND = 'sync'
+    settings.BASE_DIR = tmp_path
+    settings.MEDIA_ROOT = tmp_path
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'partner.yaml').write_text(
+        "shop: Partner Shop\ncategories: [{id: 1, name: Category 1}]\n"
+        "goods: [{id: 2, category: 1, name: Product 2, price: 1, price_rrc: 2, quantity: 3}]\n",
+        encoding='utf-8',
+    )
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    user.email_verification_token = "token"
+    user.password_reset_token = "token"
+    user.save()
+    return {'user': user, 'client': api_client}
+
+
+def populate(user, start, size):
+    """
+    Create `size` rows of every kind, each with its own shop and category so
+    that missing joins show up as extra queries.
+    """
+    for i in range(start, start + size):
+        shop = Shop.objects.create(name=f"Shop {i}", owner=user)
+        category = Category.objects.create(id=i, name=f"Category {i}")
+        product = Product.objects.create(
+            id=i, shop=shop, category=category, name=f"Product {i}", price=10, price_rrc=12, quantity=5
+        )
+        Basket.objects.create(user=user, product=product, quantity=1)
+        contact = Contact.objects.create(user=user, city="City", street="Street", house=str(i), phone="123")
+        order = Order.objects.create(user=user, contact=contact, total_sum=10, item_count=1)
+        OrderItem.objects.create(order=order, product=product, shop=shop, quantity=1, price=10)
+
+
+def assert_query_budget(request, budget):
+    """
+    Run a request and fail if it performs more than `budget` queries.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        response = request()
+    assert response.status_code < 500
+    assert len(queries) <= budget, "\n".join(query['sql'] for query in queries.captured_queries)
+    return len(queries)
+
+
+# Test every endpoint in procurement/urls.py declares a query budget
+def test_every_endpoint_has_query_budget():
+    names = {pattern.name for pattern in urlpatterns}
+
+    assert names == set(LIST_BUDGETS) | set(ENDPOINT_BUDGETS)
+
+
+# Test list endpoints run a constant number of queries regardless of page size
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', sorted(LIST_BUDGETS))
+def test_list_endpoint_query_count_is_constant(context, name):
+    client = context['client']
+    client.force_authenticate(user=context['user'])
+    url = reverse(name)
+
+    # Measure the uncached path of catalog endpoints
+    populate(context['user'], 1, 1)
+    cache.clear()
+    small = assert_query_budget(lambda: client.get(url), LIST_BUDGETS[name])
+    populate(context['user'], 2, 9)
+    cache.clear()
+    large = assert_query_budget(lambda: client.get(url), LIST_BUDGETS[name])
+
+    assert small == large
+
+
+# Test the remaining endpoints stay within their query budget
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', sorted(ENDPOINT_BUDGETS))
+def test_endpoint_query_budget(context, name):
+    client = context['client']
+    user = context['user']
+    method, data, budget = ENDPOINT_BUDGETS[name]
+    populate(user, 1, 3)
+    kwargs = {
+        'contact-detail': lambda: {'pk': Contact.objects.filter(user=user).first().pk},
+        'upload-pricelist': lambda: {'shop_id': Shop.objects.first().pk},
+        'partner-update-job': lambda: {'job_id': ImportJob.objects.create(user=user, source="partner.yaml").pk},
+    }.get(name, dict)()
+    if name not in ('user-register', 'email-verification', 'user-login', 'password-reset',
+                    'password-reset-confirm'):
+        client.force_authenticate(user=user)
+
+    url = reverse(name, kwargs=kwargs)
+    if name == 'upload-pricelist':
+        request = lambda: client.post(url, {'file': SimpleUploadedFile("p.yaml", PRICE_LIST)}, format='multipart')
+    else:
+        request = lambda: getattr(client, method)(url, data(context) if data else None, format='json')
+
+    assert_query_budget(request, budget)
@@ -0,0 +1,163 @@
+import copy
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connections
+from django.test import AsyncClient, RequestFactory
+from django.urls import include, path, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from procurement import routers
+from procurement.async_views import AsyncProductListView
+from procurement.models import User, Shop, Category, Product
+from procurement.routers import PIN_KEY, ReplicaMiddleware, ReplicaRouter, use_replica
+
+urlpatterns = [
+    path('api/v1/', include([path('products', AsyncProductListView.as_view(), name='product-list')])),
+]
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica_1', 'replica_2']
+    settings.REPLICA_SELECTION = 'round_robin'
+    routers._in_flight.clear()
+    return settings
+
+
+def in_request(view, user=None):
+    """
+    Run `view()` inside ReplicaMiddleware and return its result.
+    """
+    result = []
+    request = RequestFactory().get('/')
+    if user is not None:
+        request.user = user
+    ReplicaMiddleware(lambda request: result.append(view()) or None)(request)
+    return result[0]
+
+
+def read_alias():
+    return ReplicaRouter().db_for_read(Product)
+
+
+def read_only_alias():
+    use_replica()
+    return read_alias()
+
+
+# Test reads stay on the primary outside requests and in views that did not opt in
+def test_reads_default_to_primary(replicas):
+    assert read_alias() is None
+    assert in_request(read_alias) is None
+
+
+# Test opted-in requests take turns over the replicas and keep theirs for the whole request
+def test_round_robin_replicas(replicas):
+    def two_reads():
+        use_replica()
+        return read_alias(), read_alias()
+
+    picks = [in_request(two_reads) for _ in range(3)]
+
+    assert [first for first, _ in picks] in (['replica_1', 'replica_2', 'replica_1'],
+                                             ['replica_2', 'replica_1', 'replica_2'])
+    assert all(first == second for first, second in picks)
+
+
+# Test least-loaded selection avoids the replica serving a request in flight
+def test_least_loaded_replicas(replicas):
+    replicas.REPLICA_SELECTION = 'least_loaded'
+
+    first, second = in_request(lambda: (read_only_alias(), in_request(read_only_alias)))
+
+    assert first != second
+    assert in_request(read_only_alias) == 'replica_1'
+
+
+# Test a write sends the rest of the request to the primary
+def test_write_pins_request_to_primary(replicas):
+    def write_then_read():
+        use_replica()
+        assert ReplicaRouter().db_for_write(Product) == 'default'
+        return read_alias()
+
+    assert in_request(write_then_read) is None
+
+
+# Test a user who wrote keeps reading from the primary for REPLICA_PIN_SECONDS
+@pytest.mark.django_db
+def test_user_pinned_after_write(replicas):
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    other = User.objects.create_user(email="other@example.com", password="password123")
+
+    in_request(lambda: ReplicaRouter().db_for_write(Product), user=user)
+
+    assert in_request(lambda: use_replica(user) or read_alias(), user=user) is None
+    assert in_request(lambda: use_replica(other) or read_alias(), user=other) is not None
+
+
+@pytest.fixture
+def sqlite_replica(replicas, tmp_path):
+    """
+    A second SQLite file registered as replica_1, migrated but not replicated.
+    """
+    replicas.DATABASE_REPLICAS = ['replica_1']
+    settings_dict = {**copy.deepcopy(connections['default'].settings_dict), 'NAME': str(tmp_path / 'replica.sqlite3')}
+    connections['replica_1'] = connections['default'].__class__(settings_dict, 'replica_1')
+    call_command('migrate', database='replica_1', run_syncdb=True, verbosity=0)
+    yield 'replica_1'
+    connections['replica_1'].close()
+    del connections['replica_1']
+
+
+def create_product(database, pk, name):
+    shop = Shop.objects.using(database).create(name=f"Shop {pk}", state=True)
+    category = Category.objects.using(database).create(id=pk, name=f"Category {pk}")
+    return Product.objects.using(database).create(id=pk, shop=shop, category=category, name=name, price=10,
+                                                  price_rrc=12, quantity=5)
+
+
+# Test catalog views read the replica file and writes pin the user to the primary file
+@pytest.mark.django_db(transaction=True, databases=['default'])
+def test_catalog_reads_from_sqlite_replica(api_client, sqlite_replica):
+    create_product('default', 1, "Primary product")
+    create_product(sqlite_replica, 2, "Replica product")
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+
+    response = api_client.get(reverse('product-list'), {"fields": "name"})
+    assert response.data['results'] == [{'name': "Replica product"}]
+
+    response = api_client.post(reverse('basket'), {"product": 1, "quantity": 1}, format='json')
+    assert response.status_code == 201
+    response = api_client.get(reverse('category-list'))
+    assert [category['name'] for category in response.data['results']] == ["Category 1"]
+
+
+# Test async catalog views read the replica and check the user's pin without the sync cache API
+@pytest.mark.django_db(transaction=True, databases=['default'])
+def test_async_catalog_reads_from_sqlite_replica(settings, sqlite_replica, monkeypatch):
+    settings.ROOT_URLCONF = __name__
+    create_product('default', 1, "Primary product")
+    create_product(sqlite_replica, 2, "Replica product")
+    user = User.objects.create_user(email="buyer@example.com", password="password123")
+    headers = {'authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    def blocking_cache_read(*args, **kwargs):
+        raise AssertionError("use_replica() blocks the event loop")
+
+    monkeypatch.setattr(routers, 'use_replica', blocking_cache_read)
+    get = async_to_sync(AsyncClient().get)
+    response = get(reverse('product-list') + '?fields=name', headers=headers)
+    assert response.json()['results'] == [{'name': "Replica product"}]
+
+    routers.cache.set(PIN_KEY.format(user.pk), True)
+    response = get(reverse('product-list') + '?fields=name&page_size=5', headers=headers)
+    assert response.json()['results'] == [{'name': "Primary product"}]
@@ -0,0 +1,91 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from procurement.importers import PriceListImporter
+from procurement.models import Shop, Category, Product
+from procurement.search import SEARCH_TABLE
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def catalog():
+    PriceListImporter().run(
+        shop_name="Shop 1",
+        categories=[{"id": 1, "name": "Smartphones"}, {"id": 2, "name": "Accessories"}],
+        goods=[
+            {"id": 1, "category": 1, "model": "apple/iphone-15", "name": "Apple iPhone 15", "price": 900,
+             "price_rrc": 999, "quantity": 5},
+            {"id": 2, "category": 2, "model": "apple/case", "name": "Case for iPhone", "price": 20,
+             "price_rrc": 25, "quantity": 5},
+            {"id": 3, "category": 1, "model": "samsung/s24", "name": "Samsung Galaxy S24", "price": 800,
+             "price_rrc": 899, "quantity": 5},
+        ],
+    )
+
+
+def search(api_client, query):
+    response = api_client.get(reverse('product-search'), {"q": query})
+    assert response.status_code == 200
+    return [product['id'] for product in response.data['results']]
+
+
+# Test search matches words as prefixes across name, model and category, best match first
+@pytest.mark.django_db
+def test_search_ranks_products(api_client, catalog):
+    assert search(api_client, "iphone") == [1, 2]
+    assert search(api_client, "iph 15") == [1]
+    assert sorted(search(api_client, "smartphone")) == [1, 3]
+    assert search(api_client, "samsung") == [3]
+    assert search(api_client, "nokia") == []
+
+
+# Test query syntax in user input is ignored instead of failing
+@pytest.mark.django_db
+def test_search_sanitizes_input(api_client, catalog):
+    assert search(api_client, 'galaxy" (NEAR*') == []
+    assert search(api_client, 'galaxy" (*') == [3]
+    assert search(api_client, "") == []
+
+
+# Test re-imports and deactivation keep the index in sync
+@pytest.mark.django_db
+def test_search_index_follows_imports(api_client, catalog):
+    PriceListImporter(deactivate_missing=True).run(
+        shop_name="Shop 1",
+        categories=[{"id": 1, "name": "Phones"}],
+        goods=[
+            {"id": 1, "category": 1, "model": "apple/iphone-15", "name": "Apple iPhone 15 Pro", "price": 900,
+             "price_rrc": 999, "quantity": 5},
+            {"id": 3, "category": 1, "model": "samsung/s24", "name": "Samsung Galaxy S24", "price": 800,
+             "price_rrc": 899, "quantity": 5},
+        ],
+    )
+
+    assert search(api_client, "pro") == [1]
+    assert search(api_client, "smartphones") == []
+    assert search(api_client, "phones samsung") == [3]
+    assert search(api_client, "case") == []
+
+
+# Test the rebuild command indexes products created before the index existed
+@pytest.mark.django_db
+def test_rebuild_search_index(api_client, django_capture_on_commit_callbacks):
+    shop = Shop.objects.create(name="Shop 1")
+    category = Category.objects.create(id=1, name="Category 1")
+    Product.objects.create(id=1, shop=shop, category=category, name="Lamp", price=1, price_rrc=2, quantity=1)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    assert search(api_client, "lamp") == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('rebuild_search_index', batch_size=1, stdout=io.StringIO())
+
+    assert search(api_client, "lamp") == [1]
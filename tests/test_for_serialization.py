@@ -0,0 +1,115 @@
+import io
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from procurement import renderers
+from procurement.models import AVAILABLE, Shop, Category, Product
+from procurement.renderers import FastJSONRenderer
+from procurement.rows import ValuesRows
+from procurement.serializers import OrderSerializer, ProductSerializer
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def catalog():
+    shop = Shop.objects.create(name="Магазин 1", url="https://example.com", state=True)
+    category = Category.objects.create(id=1, name="Категория 1")
+    parameters = [
+        {"цвет": "красный", "weight": 0.5, "tags": ["a", "b"]},
+        {"density": 1e-05, "volume": 1e16, "note": "line\u2028break"},
+        {},
+    ]
+    for i, params in enumerate(parameters, start=1):
+        Product.objects.create(id=i, shop=shop, category=category, model=f"m/{i}", name=f"Товар {i}",
+                               price=f"{i}9.9", price_rrc=100, quantity=3 * i, parameters=params)
+    Product.objects.filter(id=1).update(reserved=5)
+
+
+def render_both(api_client, monkeypatch, name, params):
+    """
+    Return the response bodies of the values path and of the serializer path.
+    """
+    fast = api_client.get(reverse(name), params)
+    with monkeypatch.context() as patch:
+        patch.setattr(ValuesRows, 'compile', classmethod(lambda cls, serializer, expressions=None: None))
+        patch.setattr(renderers, 'orjson', None)
+        cache.clear()
+        slow = api_client.get(reverse(name), params)
+    return fast, slow
+
+
+# Test list endpoints built from .values() rows match the serializer output byte for byte
+@pytest.mark.django_db
+@pytest.mark.parametrize('name, params', [
+    ('product-list', {}),
+    ('product-list', {"ordering": "-price", "fields": "id,name,price,available,parameters"}),
+    ('product-list', {"expand": "shop,category"}),
+    ('product-list', {"cursor": "", "page_size": 2, "ordering": "name", "fields": "id"}),
+    ('category-list', {}),
+    ('shop-list', {"fields": "name,url"}),
+])
+def test_values_path_is_byte_identical(api_client, monkeypatch, catalog, name, params):
+    fast, slow = render_both(api_client, monkeypatch, name, params)
+
+    assert fast.status_code == slow.status_code == 200
+    assert fast.content == slow.content
+
+
+# Test keyset pages of the values path link to the same next page
+@pytest.mark.django_db
+def test_values_path_keyset_pages(api_client, catalog):
+    response = api_client.get(reverse('product-list'), {"cursor": "", "page_size": 2, "fields": "id"})
+    ids = [product['id'] for product in response.data['results']]
+    ids += [product['id'] for product in api_client.get(response.data['next']).data['results']]
+
+    assert ids == [1, 2, 3]
+
+
+# Test the computed availability matches Product.available
+@pytest.mark.django_db
+def test_values_path_available(api_client, catalog):
+    response = api_client.get(reverse('product-list'), {"fields": "id,available"})
+
+    assert response.data['results'] == [
+        {'id': product.id, 'available': product.available} for product in Product.objects.order_by('id')
+    ]
+
+
+# Test only serializers whose fields are all columns or expressions are compiled
+def test_values_rows_compile():
+    assert ValuesRows.compile(ProductSerializer(expand=['shop']), {'available': AVAILABLE}) is not None
+    assert ValuesRows.compile(ProductSerializer()) is None
+    assert ValuesRows.compile(OrderSerializer()) is None
+
+
+# Test the orjson renderer and the stdlib renderer produce the same bytes
+@pytest.mark.parametrize('data', [
+    {"name": "Товар", "price": "9.90", "ok": True, "none": None, "list": [1, 2.5, "x"]},
+    {"sep": "\u2028\u2029", "control": "\x00\x1f\t\n\"\\/"},
+    {"exp": [1e16, 1e-05, 2.5e-07]},
+    {"big": 2 ** 70, 1: "non-string key"},
+])
+def test_fast_renderer_is_byte_identical(data):
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+    assert FastJSONRenderer().render(data, 'application/json; indent=2') == JSONRenderer().render(
+        data, 'application/json; indent=2'
+    )
+
+
+# Test the benchmark command checks both paths and reports their throughput
+@pytest.mark.django_db
+def test_benchmark_serialization_command(catalog):
+    out = io.StringIO()
+
+    call_command('benchmark_serialization', '--repeat', '1', '--expand', 'shop', stdout=out)
+
+    assert "products: 3 rows" in out.getvalue()
+    assert "categories: 1 rows" in out.getvalue()
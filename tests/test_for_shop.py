@@ -1,5 +1,5 @@
 from django.urls import reverse
-from procurement.models import Shop
+from procurement.models import Shop, User
 import pytest
 from rest_framework.test import APIClient
 
@@ -24,3 +24,20 @@ def test_get_shop_list(api_client):
     assert "Shop 1" in shop_names
     assert "Shop 2" in shop_names
     assert "Inactive Shop" not in shop_names
+
+
+# Test the partner state endpoint works on the caller's own shop
+@pytest.mark.django_db
+def test_partner_state_uses_own_shop(api_client):
+    partner = User.objects.create_user(email="partner@example.com", password="password123")
+    Shop.objects.create(name="Someone Else's Shop", state=True)
+    shop = Shop.objects.create(name="Own Shop", state=True, owner=partner)
+    api_client.force_authenticate(user=partner)
+
+    response = api_client.post(reverse('partner-state'), {"state": "off"}, format='json')
+
+    assert response.status_code == 200
+    shop.refresh_from_db()
+    assert shop.state is False
+    assert Shop.objects.get(name="Someone Else's Shop").state is True
+    assert api_client.get(reverse('partner-state')).data == {"name": "Own Shop", "state": False}
@@ -1,7 +1,13 @@
+from types import SimpleNamespace
+
 import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from rest_framework.test import APIClient
-from procurement.models import Shop, Category, Product, User
+from procurement import tasks
+from procurement_automation import celery_app
+from procurement.models import Shop, Category, Product, User, ImportJob
 
 
 @pytest.fixture
@@ -9,13 +15,19 @@ def api_client():
     return APIClient()
 
 
+@pytest.fixture(autouse=True)
+def import_jobs(settings, tmp_path):
+    settings.IMPORT_JOBS_BACKEND = 'sync'
+    settings.MEDIA_ROOT = tmp_path
+
+
 # Test successful upload of pricelist
 @pytest.mark.django_db
 def test_upload_pricelist_success(api_client):
     user = User.objects.create_user(email="supplier@example.com", password="password123")
     api_client.force_authenticate(user=user)
 
-    shop = Shop.objects.create(name="Supplier Shop", state=True)
+    shop = Shop.objects.create(name="Supplier Shop", state=True, owner=user)
     category = Category.objects.create(id=1, name="Category 1")
 
     pricelist_content = """
@@ -40,7 +52,8 @@ def test_upload_pricelist_success(api_client):
     with open("pricelist.yaml", "rb") as file:
         response = api_client.post(reverse('upload-pricelist', args=[shop.id]), {'file': file}, format='multipart')
 
-    assert response.status_code == 200
+    assert response.status_code == 202
+    assert response.data['status'] == 'done'
     assert Product.objects.filter(name="Product 1").exists()
     assert Product.objects.filter(name="Product 2").exists()
 
@@ -50,7 +63,7 @@ def test_upload_pricelist_nonexistent_category(api_client):
     user = User.objects.create_user(email="supplier@example.com", password="password123")
     api_client.force_authenticate(user=user)
 
-    shop = Shop.objects.create(name="Supplier Shop", state=True)
+    shop = Shop.objects.create(name="Supplier Shop", state=True, owner=user)
 
     pricelist_content = """
     - id: 1
@@ -68,8 +81,10 @@ def test_upload_pricelist_nonexistent_category(api_client):
         response = api_client.post(reverse('upload-pricelist', args=[shop.id]), {'file': file}, format='multipart')
 
     # Проверяем ошибку
-    assert response.status_code == 404
-    assert "Category with id 999 not found" in response.data["error"]
+    assert response.status_code == 202
+    job_response = api_client.get(response.data['status_url'])
+    assert job_response.data['status'] == 'failed'
+    assert "Category with id 999 not found" in job_response.data["errors"][0]
 
 
 @pytest.mark.django_db
@@ -77,7 +92,7 @@ def test_upload_pricelist_update_existing_product(api_client):
     user = User.objects.create_user(email="supplier@example.com", password="password123")
     api_client.force_authenticate(user=user)
 
-    shop = Shop.objects.create(name="Supplier Shop", state=True)
+    shop = Shop.objects.create(name="Supplier Shop", state=True, owner=user)
     category = Category.objects.create(id=1, name="Category 1")
     product = Product.objects.create(
         id=1, name="Product 1", category=category, shop=shop,
@@ -100,8 +115,135 @@ def test_upload_pricelist_update_existing_product(api_client):
         response = api_client.post(reverse('upload-pricelist', args=[shop.id]), {'file': file}, format='multipart')
 
     # Проверяем обновление товара
-    assert response.status_code == 200
+    assert response.status_code == 202
     product.refresh_from_db()
     assert product.price == 150.00
     assert product.quantity == 15
     assert product.parameters["color"] == "green"
+
+
+# Test polling an import job reports processed rows
+@pytest.mark.django_db
+def test_upload_pricelist_job_status(api_client):
+    user = User.objects.create_user(email="supplier@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+
+    shop = Shop.objects.create(name="Supplier Shop", state=True, owner=user)
+    Category.objects.create(id=1, name="Category 1")
+    pricelist = SimpleUploadedFile(
+        "pricelist.yaml",
+        b"- {id: 1, name: Product 1, category: 1, price: 10, price_rrc: 12, quantity: 1}\n"
+        b"- {id: 2, name: Product 2, category: 1, price: 20, price_rrc: 22, quantity: 2}\n",
+    )
+
+    response = api_client.post(reverse('upload-pricelist', args=[shop.id]), {'file': pricelist}, format='multipart')
+    job_response = api_client.get(reverse('partner-update-job', args=[response.data['job_id']]))
+
+    assert job_response.status_code == 200
+    assert job_response.data['status'] == 'done'
+    assert job_response.data['processed_rows'] == 2
+    assert job_response.data['inserted'] == 2
+    assert job_response.data['shop'] == shop.id
+    assert job_response.data['errors'] == []
+
+
+# Test import jobs of other users are not visible
+@pytest.mark.django_db
+def test_import_job_of_other_user(api_client):
+    owner = User.objects.create_user(email="owner@example.com", password="password123")
+    other = User.objects.create_user(email="other@example.com", password="password123")
+    job = ImportJob.objects.create(user=owner, source="missing.yaml")
+    api_client.force_authenticate(user=other)
+
+    response = api_client.get(reverse('partner-update-job', args=[job.id]))
+
+    assert response.status_code == 404
+
+
+# Test jobs handed to the thread pool are deferred until commit
+@pytest.mark.django_db
+def test_import_job_thread_backend(api_client, settings, django_capture_on_commit_callbacks, monkeypatch):
+    settings.IMPORT_JOBS_BACKEND = 'thread'
+    submitted = []
+    monkeypatch.setattr(tasks, '_executor', SimpleNamespace(submit=lambda fn, job_id: submitted.append(job_id)))
+    user = User.objects.create_user(email="supplier@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    shop = Shop.objects.create(name="Supplier Shop", state=True, owner=user)
+    pricelist = SimpleUploadedFile("pricelist.yaml", b"[]")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(reverse('upload-pricelist', args=[shop.id]), {'file': pricelist},
+                                   format='multipart')
+
+    assert response.status_code == 202
+    assert response.data['status'] == 'pending'
+    assert submitted == [response.data['job_id']]
+
+
+# Test jobs are sent to the Celery app after commit, run eagerly here
+@pytest.mark.django_db
+def test_import_job_celery_backend(api_client, settings, django_capture_on_commit_callbacks, monkeypatch):
+    settings.IMPORT_JOBS_BACKEND = 'celery'
+    monkeypatch.setitem(celery_app.conf, 'task_always_eager', True)
+    user = User.objects.create_user(email="supplier@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    shop = Shop.objects.create(name="Supplier Shop", state=True, owner=user)
+    Category.objects.create(id=1, name="Category 1")
+    pricelist = SimpleUploadedFile(
+        "pricelist.yaml", b"- {id: 1, category: 1, name: P, price: 1, price_rrc: 1, quantity: 2}"
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(reverse('upload-pricelist', args=[shop.id]), {'file': pricelist},
+                                   format='multipart')
+
+    assert response.status_code == 202
+    assert ImportJob.objects.get(id=response.data['job_id']).status == 'done'
+    assert Product.objects.get(id=1).quantity == 2
+    assert 'procurement.release_expired_reservations' in celery_app.tasks
+
+
+# Test running jobs expose live progress published by the worker
+@pytest.mark.django_db
+def test_import_job_running_progress(api_client):
+    user = User.objects.create_user(email="supplier@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    job = ImportJob.objects.create(user=user, source="pricelist.yaml", status=ImportJob.STATUS_RUNNING)
+    cache.set(tasks.PROGRESS_KEY.format(job.id), {"processed_rows": 500, "rows_per_second": 250.0})
+
+    response = api_client.get(reverse('partner-update-job', args=[job.id]))
+
+    assert response.data['status'] == 'running'
+    assert response.data['processed_rows'] == 500
+    assert response.data['rows_per_second'] == 250.0
+
+
+# Test uploading into another partner's shop is forbidden
+@pytest.mark.django_db
+def test_upload_pricelist_foreign_shop(api_client):
+    owner = User.objects.create_user(email="owner@example.com", password="password123")
+    user = User.objects.create_user(email="supplier@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    shop = Shop.objects.create(name="Supplier Shop", owner=owner)
+
+    response = api_client.post(reverse('upload-pricelist', args=[shop.id]),
+                               {'file': SimpleUploadedFile("p.yaml", b"[]")}, format='multipart')
+
+    assert response.status_code == 403
+    assert not ImportJob.objects.exists()
+
+
+# Test uploading into a shop without an owner does not claim it
+@pytest.mark.django_db
+def test_upload_pricelist_unowned_shop(api_client):
+    user = User.objects.create_user(email="supplier@example.com", password="password123")
+    api_client.force_authenticate(user=user)
+    shop = Shop.objects.create(name="Supplier Shop")
+
+    response = api_client.post(reverse('upload-pricelist', args=[shop.id]),
+                               {'file': SimpleUploadedFile("p.yaml", b"[]")}, format='multipart')
+
+    assert response.status_code == 403
+    assert not ImportJob.objects.exists()
+    shop.refresh_from_db()
+    assert shop.owner is None